@@ -0,0 +1,36 @@
+"""Add admin_users table
+
+Revision ID: add_admin_users_table
+Revises: add_head_parent_function
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_admin_users_table'
+down_revision = 'add_head_parent_function'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 管理者アカウント（旧 admin_users.json）を保存するテーブル
+    op.create_table(
+        'admin_users',
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_date', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_by', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('email')
+    )
+    op.create_index(op.f('ix_admin_users_email'), 'admin_users', ['email'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_admin_users_email'), table_name='admin_users')
+    op.drop_table('admin_users')
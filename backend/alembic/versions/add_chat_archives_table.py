@@ -0,0 +1,45 @@
+"""Add chat_archives table and chat_history keyset index
+
+Revision ID: add_chat_archives_table
+Revises: add_test_result_ai_comment
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chat_archives_table'
+down_revision = 'add_test_result_ai_comment'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chat_archives',
+        sa.Column('archive_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('conversation_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('conversation_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.Text(), nullable=False),
+        sa.Column('messages', sa.LargeBinary(), nullable=False),
+        sa.Column('created_date', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('archive_id'),
+    )
+    op.create_index(
+        'ix_chat_archives_user_id_conversation_end', 'chat_archives', ['user_id', 'conversation_end'], unique=False
+    )
+    op.create_index(
+        'ix_chat_history_user_id_timestamp', 'chat_history', ['user_id', 'timestamp', 'chat_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_history_user_id_timestamp', table_name='chat_history')
+    op.drop_index('ix_chat_archives_user_id_conversation_end', table_name='chat_archives')
+    op.drop_table('chat_archives')
@@ -0,0 +1,83 @@
+"""Add score_rollups table
+
+Revision ID: add_score_rollups_table
+Revises: add_test_result_submission_key
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_score_rollups_table'
+down_revision = 'add_test_result_submission_key'
+branch_labels = None
+depends_on = None
+
+
+SCORE_FIELDS = (
+    'self_determination', 'self_acceptance', 'self_worth', 'self_efficacy', 'self_esteem_total',
+    'commitment', 'result', 'steadiness', 'devotion', 'self_control',
+    'assertion', 'sensitivity', 'intuition', 'introspection', 'comparison',
+    'courage', 'resilience', 'cooperation', 'natural_acceptance', 'non_rationality',
+)
+
+
+def _period_start(value, period):
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    day = value.date()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def upgrade() -> None:
+    # テスト結果の期間別集計（ユーザー別・クラブ別 × 週・月）
+    table = op.create_table(
+        'score_rollups',
+        sa.Column('scope', sa.String(length=10), nullable=False),
+        sa.Column('scope_id', sa.String(length=100), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        *[sa.Column(f'sum_{field}', sa.Float(), nullable=False) for field in SCORE_FIELDS],
+        sa.Column('updated_date', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('scope', 'scope_id', 'period', 'period_start')
+    )
+
+    # 既存のテスト結果から集計を作成
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        'SELECT t.user_id, t.test_date, u.club_id, '
+        + ', '.join(f't.{field}' for field in SCORE_FIELDS)
+        + ' FROM test_results t JOIN users u ON u.user_id = t.user_id'
+    ))
+    totals = defaultdict(lambda: defaultdict(float))
+    for row in rows.mappings():
+        for period in ('week', 'month'):
+            start = _period_start(row['test_date'], period)
+            keys = [('user', str(row['user_id']), period, start)]
+            if row['club_id']:
+                keys.append(('club', row['club_id'], period, start))
+            for key in keys:
+                values = totals[key]
+                values['sample_count'] += 1
+                for field in SCORE_FIELDS:
+                    values[f'sum_{field}'] += row[field] or 0
+    if totals:
+        op.bulk_insert(table, [
+            {'scope': scope, 'scope_id': scope_id, 'period': period, 'period_start': start,
+             **{column: (int(value) if column == 'sample_count' else value) for column, value in values.items()}}
+            for (scope, scope_id, period, start), values in totals.items()
+        ])
+
+
+def downgrade() -> None:
+    op.drop_table('score_rollups')
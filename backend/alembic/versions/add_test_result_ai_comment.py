@@ -0,0 +1,27 @@
+"""Add rule-based result comment to test_results
+
+Revision ID: add_test_result_ai_comment
+Revises: add_test_result_category_totals
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_test_result_ai_comment'
+down_revision = 'add_test_result_category_totals'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 既存の結果のコメントは scripts/pregenerate_comments.py で作成する
+    op.add_column('test_results', sa.Column('ai_comment', sa.Text(), nullable=True))
+    op.add_column('test_results', sa.Column('ai_comment_version', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('test_results', 'ai_comment_version')
+    op.drop_column('test_results', 'ai_comment')
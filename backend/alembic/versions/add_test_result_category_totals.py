@@ -0,0 +1,54 @@
+"""Add persisted category totals to test_results
+
+Revision ID: add_test_result_category_totals
+Revises: add_score_rollups_table
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_test_result_category_totals'
+down_revision = 'add_score_rollups_table'
+branch_labels = None
+depends_on = None
+
+
+SPORTSMANSHIP_FIELDS = ('courage', 'resilience', 'cooperation', 'natural_acceptance', 'non_rationality')
+ATHLETE_MIND_FIELDS = (
+    'commitment', 'result', 'steadiness', 'devotion', 'self_control',
+    'assertion', 'sensitivity', 'intuition', 'introspection', 'comparison',
+)
+SELF_ESTEEM_FIELDS = ('self_determination', 'self_acceptance', 'self_worth', 'self_efficacy')
+
+
+def _sum(fields):
+    return ' + '.join(f'COALESCE({field}, 0)' for field in fields)
+
+
+def upgrade() -> None:
+    op.add_column('test_results', sa.Column('sportsmanship_total', sa.Float(), nullable=True))
+    op.add_column('test_results', sa.Column('athlete_mind_total', sa.Float(), nullable=True))
+    op.add_column('test_results', sa.Column('total_score', sa.Float(), nullable=True))
+
+    # 既存の結果のカテゴリ合計を計算（self_esteem_total が未設定の行も補完）
+    op.execute(
+        f'UPDATE test_results SET '
+        f'self_esteem_total = COALESCE(self_esteem_total, ROUND(CAST({_sum(SELF_ESTEEM_FIELDS)} AS NUMERIC), 1)), '
+        f'sportsmanship_total = ROUND(CAST({_sum(SPORTSMANSHIP_FIELDS)} AS NUMERIC), 1), '
+        f'athlete_mind_total = ROUND(CAST({_sum(ATHLETE_MIND_FIELDS)} AS NUMERIC), 1)'
+    )
+    op.execute('UPDATE test_results SET total_score = ROUND(CAST(self_esteem_total + sportsmanship_total AS NUMERIC), 1)')
+
+    op.create_index('ix_test_results_user_id_test_date', 'test_results', ['user_id', 'test_date'], unique=False)
+    op.create_index('ix_test_results_user_id_total_score', 'test_results', ['user_id', 'total_score'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_test_results_user_id_total_score', table_name='test_results')
+    op.drop_index('ix_test_results_user_id_test_date', table_name='test_results')
+    op.drop_column('test_results', 'total_score')
+    op.drop_column('test_results', 'athlete_mind_total')
+    op.drop_column('test_results', 'sportsmanship_total')
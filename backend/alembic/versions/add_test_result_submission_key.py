@@ -0,0 +1,27 @@
+"""Add submission_key to test_results
+
+Revision ID: add_test_result_submission_key
+Revises: add_admin_users_table
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_test_result_submission_key'
+down_revision = 'add_admin_users_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 一括提出・再送時の重複登録を防ぐためのキー
+    op.add_column('test_results', sa.Column('submission_key', sa.String(length=200), nullable=True))
+    op.create_index(op.f('ix_test_results_submission_key'), 'test_results', ['submission_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_test_results_submission_key'), table_name='test_results')
+    op.drop_column('test_results', 'submission_key')
@@ -0,0 +1,31 @@
+"""Allow anonymous test results (nullable test_results.user_id)
+
+Revision ID: allow_anonymous_test_results
+Revises: add_chat_archives_table
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'allow_anonymous_test_results'
+down_revision = 'add_chat_archives_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # テスト画面から未認証で提出された結果は user_id を NULL で保存する
+    op.alter_column('test_results', 'user_id',
+               existing_type=sa.UUID(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    # 匿名の結果は元のスキーマでは保存できないため削除する
+    op.execute("DELETE FROM test_results WHERE user_id IS NULL")
+    op.alter_column('test_results', 'user_id',
+               existing_type=sa.UUID(),
+               nullable=False)
@@ -1,22 +1,30 @@
-import json
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from uuid import UUID
 from jose import JWTError, jwt
 from pydantic import BaseModel
-from passlib.context import CryptContext
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.club import Club
 from app.models.test_result import TestResult
 from app.schemas.user import User as UserSchema
 from app.dependencies import get_current_active_user
 from app.config import settings
+from app.core.instrumentation import request_metrics
+from app.core.principal import principal_cache
+from app.services.password_service import password_hasher
+from app.services.admin_service import admin_store
+from app.services.user_import_service import UserImportService, read_import_request
+from app.services.trend_service import ScoreTrendService
+from app.services.percentile_service import percentile_index
+from app.services.ai_service import coaching_context_cache
+from app.schemas.user import BulkImportRequest, BulkImportResponse
 
 router = APIRouter()
 
@@ -27,12 +35,6 @@ admin_security = HTTPBearer()
 ADMIN_TOKEN_EXPIRE_MINUTES = 60  # 1時間
 ADMIN_SECRET_KEY = settings.SECRET_KEY + "_admin"  # 管理者用の別シークレット
 
-# パスワードハッシュ化の設定
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# 管理者情報を保存するファイル（本番環境ではデータベースを使用すべき）
-ADMIN_STORAGE_FILE = "admin_users.json"
-
 
 class AdminLoginRequest(BaseModel):
     email: str
@@ -61,30 +63,6 @@ class UpdateUserClubRequest(BaseModel):
     new_club_id: str
 
 
-def load_admin_users() -> Dict[str, dict]:
-    """管理者ユーザー情報を読み込む"""
-    try:
-        with open(ADMIN_STORAGE_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        # ファイルが存在しない場合は、環境変数の管理者を初期データとして作成
-        initial_admin = {
-            settings.ADMIN_EMAIL: {
-                "password_hash": pwd_context.hash(settings.ADMIN_PASSWORD),
-                "created_date": datetime.utcnow().isoformat(),
-                "last_login": None
-            }
-        }
-        save_admin_users(initial_admin)
-        return initial_admin
-
-
-def save_admin_users(admin_users: Dict[str, dict]):
-    """管理者ユーザー情報を保存"""
-    with open(ADMIN_STORAGE_FILE, 'w') as f:
-        json.dump(admin_users, f, indent=2)
-
-
 def create_admin_access_token(data: dict):
     """管理者用アクセストークンの作成"""
     to_encode = data.copy()
@@ -127,29 +105,31 @@ def get_admin_user(
 
 
 @router.post("/login", response_model=AdminToken)
-def admin_login(request: AdminLoginRequest):
+async def admin_login(request: AdminLoginRequest):
     """
     管理者ログイン
     """
-    admin_users = load_admin_users()
+    admin = await run_in_threadpool(admin_store.get, request.email)
     
     # 管理者ユーザーの確認
-    if request.email not in admin_users:
+    if admin is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid admin credentials"
         )
     
-    # パスワードの検証
-    if not pwd_context.verify(request.password, admin_users[request.email]["password_hash"]):
+    # パスワードの検証（コスト変更時は再ハッシュ）
+    valid, new_hash = await password_hasher.averify_and_update(request.password, admin.password_hash)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid admin credentials"
         )
+    if new_hash:
+        await run_in_threadpool(admin_store.update_password_hash, request.email, new_hash)
     
-    # 最終ログイン日時を更新
-    admin_users[request.email]["last_login"] = datetime.utcnow().isoformat()
-    save_admin_users(admin_users)
+    # 最終ログイン日時を記録（DBへはバックグラウンドでまとめて書き込む）
+    admin_store.record_login(request.email)
     
     # 管理者トークンを作成
     access_token = create_admin_access_token({"sub": "admin", "email": request.email})
@@ -165,15 +145,13 @@ def list_admin_users(
     admin_data = Depends(get_current_admin)
 ):
     """管理者ユーザー一覧を取得"""
-    admin_users = load_admin_users()
-    
     return [
         {
-            "email": email,
-            "created_date": info.get("created_date"),
-            "last_login": info.get("last_login")
+            "email": admin.email,
+            "created_date": admin.created_date.isoformat() if admin.created_date else None,
+            "last_login": admin.last_login.isoformat() if admin.last_login else None
         }
-        for email, info in admin_users.items()
+        for admin in admin_store.list_admins()
     ]
 
 
@@ -183,24 +161,20 @@ def create_admin_user(
     admin_data = Depends(get_current_admin)
 ):
     """新規管理者ユーザーを作成"""
-    admin_users = load_admin_users()
-    
-    # 既存チェック
-    if request.email in admin_users:
+    # 既存チェック（キャッシュ済みの一覧で確認し、同時作成はDBの一意制約で検出）
+    created = None
+    if request.email not in {admin.email for admin in admin_store.list_admins()}:
+        created = admin_store.create(
+            request.email,
+            password_hasher.hash(request.password),
+            created_by=admin_data.get("email")
+        )
+    if created is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Admin user already exists"
         )
     
-    # 新規管理者を追加
-    admin_users[request.email] = {
-        "password_hash": pwd_context.hash(request.password),
-        "created_date": datetime.utcnow().isoformat(),
-        "last_login": None
-    }
-    
-    save_admin_users(admin_users)
-    
     return {"message": "Admin user created successfully", "email": request.email}
 
 
@@ -210,7 +184,7 @@ def delete_admin_user(
     admin_data = Depends(get_current_admin)
 ):
     """管理者ユーザーを削除"""
-    admin_users = load_admin_users()
+    admin_users = {admin.email for admin in admin_store.list_admins()}
     
     # 存在チェック
     if email not in admin_users:
@@ -233,12 +207,32 @@ def delete_admin_user(
             detail="Cannot delete yourself"
         )
     
-    del admin_users[email]
-    save_admin_users(admin_users)
+    admin_store.delete(email)
     
     return {"message": "Admin user deleted successfully"}
 
 
+@router.get("/performance/endpoints")
+def get_endpoint_performance(
+    admin_data = Depends(get_current_admin)
+):
+    """エンドポイント別の処理時間・DB時間・SQL発行数（直近ウィンドウ）を取得"""
+    return {
+        "query_count_threshold": settings.QUERY_COUNT_WARN_THRESHOLD,
+        "window": request_metrics.window,
+        "endpoints": request_metrics.snapshot()
+    }
+
+
+@router.delete("/performance/endpoints")
+def reset_endpoint_performance(
+    admin_data = Depends(get_current_admin)
+):
+    """エンドポイント別の計測値をリセット"""
+    request_metrics.reset()
+    return {"message": "Endpoint performance stats reset"}
+
+
 class ClubCreateRequest(BaseModel):
     club_id: str
     club_name: str
@@ -273,7 +267,7 @@ def create_club(
 
 @router.get("/clubs")
 def list_clubs(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin_data = Depends(get_current_admin)
 ):
     clubs = db.query(Club).all()
@@ -303,15 +297,37 @@ def delete_club(
     
     db.delete(club)
     db.commit()
+    # 所属ユーザーも削除されるため、キャッシュ全体を破棄
+    principal_cache.clear()
     
     return {"message": "Club deleted successfully"}
 
 
+@router.post("/clubs/{club_id}/members/import", response_model=BulkImportResponse)
+async def import_club_members(
+    club_id: str,
+    payload: BulkImportRequest = Depends(read_import_request),
+    db: Session = Depends(get_db),
+    admin_data = Depends(get_current_admin)
+):
+    """
+    クラブメンバーを一括登録（JSON または Content-Type: text/csv）
+    """
+    service = UserImportService(db)
+    if not await run_in_threadpool(service.club_exists, club_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Club not found"
+        )
+    
+    return await run_in_threadpool(service.import_for_club, club_id, payload)
+
+
 @router.get("/users")
 def list_all_users(
     limit: int = 100,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """すべてのユーザーを取得（ページネーション付き）"""
     users = db.query(User).offset(offset).limit(limit).all()
@@ -394,8 +410,12 @@ def delete_user(
             detail="User not found"
         )
     
+    ScoreTrendService(db).remove_results(user.test_results)
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user_id)
+    coaching_context_cache.invalidate(user_id)
+    percentile_index.invalidate()
     
     return {"message": "User deleted successfully"}
 
@@ -416,6 +436,7 @@ def toggle_head_coach(
     
     user.head_coach_function = request.is_head_coach
     db.commit()
+    principal_cache.invalidate(user_id)
     
     return {"message": f"Head coach function {'enabled' if request.is_head_coach else 'disabled'}"}
 
@@ -436,6 +457,7 @@ def toggle_head_parent(
     
     user.head_parent_function = request.is_head_parent
     db.commit()
+    principal_cache.invalidate(user_id)
     
     return {"message": f"Head parent function {'enabled' if request.is_head_parent else 'disabled'}"}
 
@@ -453,8 +475,14 @@ def delete_test_result(
             detail="Test result not found"
         )
     
+    owner_id = result.user_id
+    ScoreTrendService(db).remove_results([result])
     db.delete(result)
     db.commit()
+    percentile_index.invalidate()
+    # 匿名の結果（user_id なし）にはコーチング用コンテキストが無い
+    if owner_id is not None:
+        coaching_context_cache.invalidate(owner_id)
     
     return {"message": "Test result deleted successfully"}
 
@@ -462,7 +490,7 @@ def delete_test_result(
 @router.get("/users/statistics/summary")
 def get_user_statistics(
     club_id: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """ユーザー統計情報を取得"""
     query = db.query(User)
@@ -521,6 +549,8 @@ def update_user_role(
     
     user.role = role_data["new_role"]
     db.commit()
+    principal_cache.invalidate(user_id)
+    coaching_context_cache.invalidate(user_id)
     
     return {"message": "User role updated successfully", "new_role": user.role}
 
@@ -553,6 +583,8 @@ def update_user_club(
     old_club_id = user.club_id
     user.club_id = request.new_club_id
     db.commit()
+    principal_cache.invalidate(user_id)
+    coaching_context_cache.invalidate(user_id)
     db.refresh(user)
     
     return {
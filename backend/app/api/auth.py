@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from uuid import UUID, uuid4
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -12,7 +13,9 @@ from app.schemas.auth import Token, LoginRequest, RegisterRequest, UserResponse,
 from app.dependencies import get_current_active_user_required, get_current_active_user
 from app.config import settings
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from app.services.password_service import password_hasher
+from app.core.principal import principal_cache
+from app.services.ai_service import coaching_context_cache
 
 # エラーハンドリング用のインポート
 from app.exceptions import (
@@ -25,14 +28,28 @@ from app.schemas.error import ErrorDetail
 
 router = APIRouter()
 
-# パスワードコンテキストの設定
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """
+    メールアドレスとパスワードで認証（bcryptは専用プールで実行）
+    コストファクターが変更されている場合は新しいコストで再ハッシュして保存する
+    """
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.email == email).first())
+    if not user:
+        return None
+    valid, new_hash = await password_hasher.averify_and_update(password, user.password_hash)
+    if not valid:
+        return None
+    if new_hash:
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
+        await run_in_threadpool(db.refresh, user)
+    return user
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None):
     if expires_delta:
@@ -45,13 +62,43 @@ def create_access_token(subject: str, expires_delta: Optional[timedelta] = None)
 
 
 @router.post("/register", response_model=Token)
-def register(
+async def register(
     request: RegisterRequest,
     db: Session = Depends(get_db)
 ):
     """
     ユーザー登録 - 個人利用とクラブ利用の両方に対応
     """
+    club_id_to_set = await run_in_threadpool(_validate_registration, request, db)
+    
+    # Create new user
+    hashed_password = await password_hasher.ahash(request.password)
+    db_user = await run_in_threadpool(_create_user, request, club_id_to_set, hashed_password, db)
+    
+    # Create access token
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        subject=str(db_user.user_id), expires_delta=access_token_expires
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": {
+            "user_id": str(db_user.user_id),
+            "email": db_user.email,
+            "name": db_user.name,
+            "role": db_user.role,
+            "club_id": db_user.club_id,
+            "is_individual": db_user.is_individual,
+            "usage_type": db_user.usage_type,
+            "can_access_club_features": db_user.can_access_club_features
+        }
+    }
+
+
+def _validate_registration(request: RegisterRequest, db: Session) -> Optional[str]:
+    """登録内容の検証。クラブ利用の場合はクラブIDを返す"""
     # Check if user already exists
     existing_user = db.query(User).filter(User.email == request.email).first()
     if existing_user:
@@ -68,11 +115,12 @@ def register(
         if not club:
             raise ResourceNotFound(resource_type="クラブ", resource_id=request.club_id)
         club_id_to_set = request.club_id
-    
-    # Create new user
-    hashed_password = get_password_hash(request.password)
+    return club_id_to_set
+
+
+def _create_user(request: RegisterRequest, club_id: Optional[str], hashed_password: str, db: Session) -> User:
     db_user = User(
-        club_id=club_id_to_set,
+        club_id=club_id,
         email=request.email,
         password_hash=hashed_password,
         name=request.name,
@@ -84,31 +132,11 @@ def register(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=str(db_user.user_id), expires_delta=access_token_expires
-    )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "user_id": str(db_user.user_id),
-            "email": db_user.email,
-            "name": db_user.name,
-            "role": db_user.role,
-            "club_id": db_user.club_id,
-            "is_individual": db_user.is_individual,
-            "usage_type": db_user.usage_type,
-            "can_access_club_features": db_user.can_access_club_features
-        }
-    }
+    return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -116,8 +144,8 @@ def login(
     ユーザーログイン
     """
     # Authenticate user
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await authenticate_user(db, form_data.username, form_data.password)
+    if not user:
         raise InvalidCredentials()
     
     # Create access token
@@ -146,7 +174,7 @@ def login(
 
 
 @router.post("/login-json", response_model=Token)
-def login_json(
+async def login_json(
     request: LoginRequest,
     db: Session = Depends(get_db)
 ):
@@ -154,8 +182,8 @@ def login_json(
     JSON形式でのユーザーログイン（フロントエンド用）
     """
     # Authenticate user
-    user = db.query(User).filter(User.email == request.email).first()
-    if not user or not verify_password(request.password, user.password_hash):
+    user = await authenticate_user(db, request.email, request.password)
+    if not user:
         raise InvalidCredentials()
     
     # Create access token
@@ -215,6 +243,8 @@ def change_usage_type(
     
     current_user.updated_date = func.now()
     db.commit()
+    principal_cache.invalidate(current_user.user_id)
+    coaching_context_cache.invalidate(current_user.user_id)
     db.refresh(current_user)
     
     return {
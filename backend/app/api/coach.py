@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
+from uuid import UUID
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User
 from app.models.test_result import TestResult
-from app.dependencies import get_current_active_user
+from app.dependencies import get_current_principal
+from app.core.principal import Principal
 from app.schemas.coach import PlayerInfo, PlayerTestResult
+from app.schemas.test import ScoreTrend
+from app.services.trend_service import ScoreTrendService
+from app.services.percentile_service import percentile_index
+from app.core.etag import conditional_response, make_etag
+from app.core.responses import json_response
 
 router = APIRouter()
 
 
 @router.get("/players", response_model=List[PlayerInfo])
 def get_players(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッドコーチが所属選手一覧を取得"""
     
@@ -61,8 +68,8 @@ def get_players(
 
 @router.get("/players-for-comparison", response_model=List[dict])
 def get_players_for_comparison(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッドコーチが比較用の選手一覧を取得"""
     
@@ -109,9 +116,11 @@ def get_players_for_comparison(
 
 @router.get("/players/{player_id}/results", response_model=List[PlayerTestResult])
 def get_player_test_results(
-    player_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    player_id: UUID,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッドコーチが特定選手のテスト結果を取得"""
     
@@ -140,25 +149,38 @@ def get_player_test_results(
         TestResult.user_id == player_id
     ).order_by(TestResult.test_date.desc()).all()
     
+    # 結果の並び・選手名・順位の母集団が前回と同じなら304
+    etag = make_etag(
+        player_id, player.name,
+        percentile_index.fingerprint(db, player.club_id, player.role, player.age),
+        *(result.result_id for result in test_results)
+    )
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    
     # 結果を変換
     result_list = []
     for result in test_results:
-        # 自己肯定感合計を計算
-        self_esteem_total = (
-            result.self_determination +
-            result.self_acceptance +
-            result.self_worth +
-            result.self_efficacy
-        )
+        # 保存済みのカテゴリ合計を使用（未設定の古い結果のみ計算）
+        self_esteem_total = result.self_esteem_total
+        if self_esteem_total is None:
+            self_esteem_total = (
+                result.self_determination +
+                result.self_acceptance +
+                result.self_worth +
+                result.self_efficacy
+            )
         
-        # スポーツマンシップ合計を計算
-        sportsmanship_total = (
-            result.courage +
-            result.resilience +
-            result.cooperation +
-            result.natural_acceptance +
-            result.non_rationality
-        )
+        sportsmanship_total = result.sportsmanship_total
+        if sportsmanship_total is None:
+            sportsmanship_total = (
+                result.courage +
+                result.resilience +
+                result.cooperation +
+                result.natural_acceptance +
+                result.non_rationality
+            )
         
         # strengthsとweaknessesをリストに変換（文字列の場合は空リストに）
         strengths_list = []
@@ -210,8 +232,30 @@ def get_player_test_results(
             athlete_type=result.athlete_type,
             strengths=strengths_list,
             weaknesses=weaknesses_list,
-            sportsmanship_total=sportsmanship_total
+            sportsmanship_total=sportsmanship_total,
+            percentile_ranks=percentile_index.ranks(db, player.club_id, player.role, player.age, result)
         )
         result_list.append(player_result)
     
-    return result_list 
\ No newline at end of file
+    # 構築時に検証済みのため、response_model での再検証を行わずにシリアライズ
+    return json_response([player_result.dict() for player_result in result_list], response)
+
+
+@router.get("/club/trends", response_model=ScoreTrend)
+def get_club_score_trend(
+    period: str = Query("month", regex="^(week|month)$"),
+    limit: int = Query(12, ge=1, le=104),
+    window: int = Query(3, ge=1, le=12),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """ヘッドコーチが所属クラブ全体のスコア推移を取得"""
+    
+    # ヘッドコーチ権限チェック
+    if not current_user.head_coach_function or not current_user.club_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Head coach function required"
+        )
+    
+    return ScoreTrendService(db).club_trend(current_user.club_id, period, limit, window)
@@ -1,89 +1,216 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from uuid import UUID
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models.user import User
-from app.models.test_result import TestResult
-from app.models.chat_history import ChatHistory
-from app.schemas.coaching import ChatMessage, ChatResponse, ChatHistory as ChatHistorySchema
-from app.dependencies import get_current_active_user
-from app.services.ai_service import AIService
+from app.models.chat_history import ChatArchive, ChatHistory
+from app.schemas.coaching import (
+    ChatMessage, ChatResponse, ChatHistory as ChatHistorySchema, ChatHistoryPage,
+    ChatArchiveSummary, ChatArchiveDetail
+)
+from app.dependencies import get_current_principal_required
+from app.core.principal import Principal
+from app.services.chat_archive_service import ChatArchiveService
+from app.services.ai_service import (
+    AIService, CoachingContext, CompletionError, coaching_context_cache, completion_client
+)
 
 router = APIRouter()
 
 
+def _prepare_chat(db: Session, user_id) -> CoachingContext:
+    """
+    コーチング用コンテキストを取得し、DBセッションを解放する
+    最新の結果・会話のIDだけを確認し、キャッシュと一致すればそれを使う
+    """
+    try:
+        service = AIService(db)
+        result_id, chat_cursor = service.latest_ids(user_id)
+        context = coaching_context_cache.get(user_id, result_id, chat_cursor) if result_id else None
+        if context is None:
+            user = db.query(User).filter(User.user_id == user_id).first()
+            context = service.load_context(user) if user and result_id else None
+            
+            # Check if user has completed at least one test
+            if context is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="You must complete at least one test before using the coaching feature"
+                )
+            coaching_context_cache.set(context)
+        
+        return context
+    finally:
+        # モデルの応答を待つ間はDB接続を保持しない
+        db.close()
+
+
+def _save_chat(user_id, message: str, response: str):
+    """会話を保存（モデル呼び出し後に新しいセッションで書き込む）"""
+    # 同じ時刻にならないよう応答を1マイクロ秒後にする（履歴の並び順を保つため）
+    # 応答のIDは新しいチャットのカーソルとしてキャッシュにも記録する
+    now = datetime.now(timezone.utc)
+    reply_id = uuid.uuid4()
+    with SessionLocal() as db:
+        db.add(ChatHistory(
+            user_id=user_id,
+            message=message,
+            message_type="user",
+            timestamp=now
+        ))
+        db.add(ChatHistory(
+            chat_id=reply_id,
+            user_id=user_id,
+            message=response,
+            message_type="assistant",
+            timestamp=now + timedelta(microseconds=1)
+        ))
+        db.commit()
+    coaching_context_cache.append_messages(user_id, reply_id, ("user", message), ("assistant", response))
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/chat", response_model=ChatResponse)
-def chat_with_ai(
+async def chat_with_ai(
     message: ChatMessage,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
-    # Check if user has completed at least one test
-    test_result = db.query(TestResult).filter(
-        TestResult.user_id == current_user.user_id
-    ).first()
-    
-    if not test_result:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You must complete at least one test before using the coaching feature"
-        )
-    
-    # Get AI service
-    ai_service = AIService(db)
+    user_id = current_user.user_id
+    context = await run_in_threadpool(_prepare_chat, db, user_id)
     
     # Get AI response
-    response = ai_service.get_coaching_response(
-        user=current_user,
-        message=message.message
-    )
+    response = context.cached_response(message.message)
+    if response is None and not completion_client.enabled:
+        response = context.fallback_message
+    if response is None:
+        try:
+            response = await completion_client.complete(context.build_messages(message.message))
+        except CompletionError:
+            response = context.fallback_message
+        else:
+            context.cache_response(message.message, response)
     
     # Save chat history
-    user_msg = ChatHistory(
-        user_id=current_user.user_id,
-        message=message.message,
-        message_type="user"
-    )
-    ai_msg = ChatHistory(
-        user_id=current_user.user_id,
-        message=response,
-        message_type="assistant"
-    )
-    
-    db.add(user_msg)
-    db.add(ai_msg)
-    db.commit()
+    await run_in_threadpool(_save_chat, user_id, message.message, response)
     
     return ChatResponse(message=response)
 
 
-@router.get("/history")
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    message: ChatMessage,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal_required)
+):
+    """
+    AIコーチングの応答をServer-Sent Eventsで逐次返す
+    
+    - event: delta  … {"content": 差分テキスト}
+    - event: done   … {"message": 応答全文}
+    - event: error  … {"message": エラー時の応答}
+    """
+    user_id = current_user.user_id
+    context = await run_in_threadpool(_prepare_chat, db, user_id)
+    cached = context.cached_response(message.message)
+    if cached is None and not completion_client.enabled:
+        cached = context.fallback_message
+    
+    async def events():
+        if cached is not None:
+            yield _sse("delta", {"content": cached})
+            yield _sse("done", {"message": cached})
+            await run_in_threadpool(_save_chat, user_id, message.message, cached)
+            return
+        
+        parts = []
+        try:
+            async for delta in completion_client.stream(context.build_messages(message.message)):
+                parts.append(delta)
+                yield _sse("delta", {"content": delta})
+        except CompletionError:
+            yield _sse("error", {"message": context.fallback_message})
+            parts = [context.fallback_message]
+        else:
+            yield _sse("done", {"message": "".join(parts)})
+            context.cache_response(message.message, "".join(parts))
+        await run_in_threadpool(_save_chat, user_id, message.message, "".join(parts))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/history", response_model=ChatHistoryPage)
 def get_chat_history(
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[UUID] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
-    messages = db.query(ChatHistory).filter(
-        ChatHistory.user_id == current_user.user_id
-    ).order_by(ChatHistory.timestamp.desc()).offset(offset).limit(limit).all()
+    """
+    直近の会話履歴（時系列順）
+    続きは next_cursor を before に指定して取得する。保存期間を過ぎた会話は /history/archives を参照
+    """
+    messages, next_cursor = ChatArchiveService(db).recent_messages(current_user.user_id, limit, before)
+    return ChatHistoryPage(
+        messages=[ChatHistorySchema.from_orm(message) for message in messages],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/history/archives", response_model=List[ChatArchiveSummary])
+def get_chat_archives(
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal_required)
+):
+    """アーカイブ済みの会話の要約（新しい順）。before には前のページの最後の conversation_end を指定"""
+    return ChatArchiveService(db).archives(current_user.user_id, limit, before)
+
+
+@router.get("/history/archives/{archive_id}", response_model=ChatArchiveDetail)
+def get_chat_archive(
+    archive_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal_required)
+):
+    archive = db.query(ChatArchive).filter(
+        ChatArchive.archive_id == archive_id,
+        ChatArchive.user_id == current_user.user_id
+    ).first()
+    if not archive:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat archive not found"
+        )
     
-    return {
-        "messages": messages[::-1],  # Reverse to get chronological order
-        "total_count": db.query(ChatHistory).filter(
-            ChatHistory.user_id == current_user.user_id
-        ).count()
-    }
+    return ChatArchiveDetail(
+        **ChatArchiveSummary.from_orm(archive).dict(),
+        messages=ChatArchiveService(db).archived_messages(archive)
+    )
 
 
 @router.delete("/history")
 def clear_chat_history(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
-    db.query(ChatHistory).filter(
-        ChatHistory.user_id == current_user.user_id
-    ).delete()
-    db.commit()
+    ChatArchiveService(db).clear(current_user.user_id)
+    coaching_context_cache.invalidate(current_user.user_id)
     
-    return {"message": "Chat history cleared successfully"}
\ No newline at end of file
+    return {"message": "Chat history cleared successfully"}
@@ -3,7 +3,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.comparison import ComparisonResult
 from app.models.user import User
 from app.schemas.comparison import (
@@ -11,7 +11,8 @@ from app.schemas.comparison import (
     ComparisonResult as ComparisonResultSchema,
     ComparisonHistory
 )
-from app.dependencies import get_current_active_user, get_coach_or_parent_user
+from app.dependencies import get_current_principal, get_coach_or_parent_user
+from app.core.principal import Principal
 from app.services.comparison_service import ComparisonService
 
 router = APIRouter()
@@ -21,7 +22,7 @@ router = APIRouter()
 def create_comparison(
     request: ComparisonRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_coach_or_parent_user)
+    current_user: Principal = Depends(get_coach_or_parent_user)
 ):
     comparison_service = ComparisonService(db)
     
@@ -57,8 +58,8 @@ def create_comparison(
 def get_comparison_history(
     limit: int = 10,
     offset: int = 0,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     query = db.query(ComparisonResult)
     
@@ -103,8 +104,8 @@ def get_comparison_history(
 @router.get("/{comparison_id}", response_model=ComparisonResultSchema)
 def get_comparison(
     comparison_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     comparison = db.query(ComparisonResult).filter(
         ComparisonResult.comparison_id == comparison_id
@@ -7,13 +7,15 @@ from uuid import UUID
 import json
 import csv
 import io
+import time
 from datetime import datetime
 from typing import Dict, Any
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models.test_result import TestResult
 from app.models.question import Question
 from app.utils.athlete_type_algorithm import analyze_athlete_type
+from app.core.metrics import EXPORT_RENDER_SECONDS
 
 # Import libraries for advanced exports
 try:
@@ -42,10 +44,11 @@ router = APIRouter()
 @router.get("/pdf/{result_id}")
 async def export_pdf(
     result_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """PDF形式でテスト結果をエクスポート"""
     try:
+        render_started = time.perf_counter()
         # テスト結果を取得
         test_result = db.query(TestResult).filter(
             TestResult.result_id == result_id
@@ -187,6 +190,7 @@ async def export_pdf(
         doc.build(story)
         buffer.seek(0)
         
+        EXPORT_RENDER_SECONDS.observe(time.perf_counter() - render_started, format="pdf")
         return StreamingResponse(
             io.BytesIO(buffer.read()),
             media_type="application/pdf",
@@ -203,10 +207,11 @@ async def export_pdf(
 @router.get("/excel/{result_id}")
 async def export_excel(
     result_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Excel形式でテスト結果をエクスポート"""
     try:
+        render_started = time.perf_counter()
         # テスト結果を取得
         test_result = db.query(TestResult).filter(
             TestResult.result_id == result_id
@@ -328,6 +333,7 @@ async def export_excel(
         workbook.save(buffer)
         buffer.seek(0)
         
+        EXPORT_RENDER_SECONDS.observe(time.perf_counter() - render_started, format="excel")
         return StreamingResponse(
             io.BytesIO(buffer.read()),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -344,10 +350,11 @@ async def export_excel(
 @router.get("/csv/{result_id}")
 async def export_csv(
     result_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """CSV形式でテスト結果をエクスポート"""
     try:
+        render_started = time.perf_counter()
         # テスト結果を取得
         test_result = db.query(TestResult).filter(
             TestResult.result_id == result_id
@@ -408,6 +415,7 @@ async def export_csv(
         
         output.seek(0)
         
+        EXPORT_RENDER_SECONDS.observe(time.perf_counter() - render_started, format="csv")
         return StreamingResponse(
             io.StringIO(output.getvalue()),
             media_type="text/csv",
@@ -424,10 +432,11 @@ async def export_csv(
 @router.get("/json/{result_id}")
 async def export_json(
     result_id: UUID,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """JSON形式でテスト結果をエクスポート"""
     try:
+        render_started = time.perf_counter()
         # テスト結果を取得
         test_result = db.query(TestResult).filter(
             TestResult.result_id == result_id
@@ -503,6 +512,7 @@ async def export_json(
         
         json_str = json.dumps(export_data, ensure_ascii=False, indent=2)
         
+        EXPORT_RENDER_SECONDS.observe(time.perf_counter() - render_started, format="json")
         return StreamingResponse(
             io.StringIO(json_str),
             media_type="application/json",
@@ -8,7 +8,8 @@ from app.database import get_db
 from app.models.user import User
 from app.models.test_result import TestResult
 from app.models.family_relation import FamilyRelation
-from app.dependencies import get_current_active_user, get_head_parent_user
+from app.dependencies import get_current_principal
+from app.core.principal import Principal
 from app.schemas.coach import FamilyMemberInfo, FamilyMemberTestResult
 
 router = APIRouter()
@@ -22,7 +23,7 @@ class AddFamilyRequest(BaseModel):
 def search_user_by_email(
     email: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """メールアドレスでユーザーを検索"""
     
@@ -81,7 +82,7 @@ def search_user_by_email(
 def add_family_member(
     request: AddFamilyRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """メールアドレスで家族メンバーを追加"""
     
@@ -138,7 +139,7 @@ def add_family_member(
 @router.get("/members", response_model=List[FamilyMemberInfo])
 def get_family_members(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッド親が家族メンバー一覧を取得"""
     
@@ -221,7 +222,7 @@ def get_family_members(
 @router.get("/members-for-comparison", response_model=List[dict])
 def get_family_members_for_comparison(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッド親が比較用の家族メンバー一覧を取得"""
     
@@ -295,7 +296,7 @@ def get_family_members_for_comparison(
 def get_family_member_test_results(
     member_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッド親が特定家族メンバーのテスト結果を取得"""
     
@@ -348,22 +349,25 @@ def get_family_member_test_results(
     # 結果を変換
     result_list = []
     for result in test_results:
-        # 自己肯定感合計を計算
-        self_esteem_total = (
-            result.self_determination +
-            result.self_acceptance +
-            result.self_worth +
-            result.self_efficacy
-        )
+        # 保存済みのカテゴリ合計を使用（未設定の古い結果のみ計算）
+        self_esteem_total = result.self_esteem_total
+        if self_esteem_total is None:
+            self_esteem_total = (
+                result.self_determination +
+                result.self_acceptance +
+                result.self_worth +
+                result.self_efficacy
+            )
         
-        # スポーツマンシップ合計を計算
-        sportsmanship_total = (
-            result.courage +
-            result.resilience +
-            result.cooperation +
-            result.natural_acceptance +
-            result.non_rationality
-        )
+        sportsmanship_total = result.sportsmanship_total
+        if sportsmanship_total is None:
+            sportsmanship_total = (
+                result.courage +
+                result.resilience +
+                result.cooperation +
+                result.natural_acceptance +
+                result.non_rationality
+            )
         
         # strengthsとweaknessesをリストに変換（文字列の場合は空リストに）
         strengths_list = []
@@ -426,7 +430,7 @@ def get_family_member_test_results(
 def add_child_to_family(
     child_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッド親が家族に子供を追加"""
     
@@ -469,7 +473,7 @@ def add_child_to_family(
 def remove_child_from_family(
     child_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """ヘッド親が家族から子供を削除"""
     
@@ -1,7 +1,7 @@
 # ファイル: backend/app/api/questions.py
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from uuid import UUID
 from datetime import datetime
@@ -16,6 +16,9 @@ from app.schemas.question import (
     TargetType
 )
 from app.api.admin import get_current_admin  # 管理者認証をインポート
+from app.services.question_catalog import question_catalog
+from app.core.etag import CACHE_CONTROL_PUBLIC, conditional_response, make_etag
+from app.core.responses import json_response
 
 router = APIRouter()
 
@@ -98,6 +101,7 @@ def create_question(
     db_question = Question(**question_data.dict())
     db.add(db_question)
     db.commit()
+    question_catalog.invalidate()
     db.refresh(db_question)
     
     return db_question
@@ -146,6 +150,7 @@ def update_question(
         setattr(question, field, value)
     
     db.commit()
+    question_catalog.invalidate()
     db.refresh(question)
     
     return question
@@ -170,6 +175,7 @@ def delete_question(
     
     db.delete(question)
     db.commit()
+    question_catalog.invalidate()
     
     return {"message": "Question deleted successfully"}
 
@@ -177,11 +183,47 @@ def delete_question(
 @router.get("/for-user/{user_target}")  # response_modelを一時的に削除
 def get_questions_for_user(
     user_target: TargetType,
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     is_active: bool = True,
     db: Session = Depends(get_db)
 ):
-    """特定ユーザー向けの質問を取得"""
+    """
+    特定ユーザー向けの質問を取得
+    
+    有効な質問は共有カタログから返し、カタログのバージョンをETagにする
+    （If-None-Match が一致すれば304）
+    """
+    if is_active:
+        catalog = question_catalog.get(db)
+        target = user_target.value if hasattr(user_target, 'value') else user_target
+        not_modified = conditional_response(
+            request, response, make_etag(catalog.version, target, category), CACHE_CONTROL_PUBLIC
+        )
+        if not_modified is not None:
+            return not_modified
+        
+        questions = [q for q in catalog.for_target(target) if not category or q.category == category]
+        return json_response({
+            "questions": [
+                {
+                    "question_id": q.question_id,
+                    "question_number": q.question_number,
+                    "question_text": q.question_text,
+                    "category": q.category,
+                    "subcategory": q.subcategory,
+                    "target": q.target,
+                    "is_reverse_score": q.is_reverse_score,
+                    "is_active": True,
+                    "created_date": q.created_date.isoformat() if q.created_date else None,
+                    "updated_date": q.updated_date.isoformat() if q.updated_date else None
+                }
+                for q in questions
+            ],
+            "total_count": len(questions)
+        }, response)
+    
     try:
         # sportsmanshipはtargetを問わず全件、それ以外はtargetでフィルタ
         sportsmanship_query = db.query(Question).filter(
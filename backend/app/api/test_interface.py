@@ -1,39 +1,89 @@
 # ファイル: backend/app/api/test_interface.py
 
-from fastapi import APIRouter, Request, Depends, HTTPException, status
+import json
+import logging
+
+from fastapi import APIRouter, Request, Response, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from typing import Dict, Any
-from pydantic import BaseModel
+from typing import Dict, Optional
+from pydantic import BaseModel, ValidationError as PydanticValidationError
+from datetime import datetime, timezone
 from uuid import UUID
-import uuid
 
 from app.database import get_db
-from app.models.question import Question
+from app.dependencies import get_current_principal
+from app.core.principal import Principal
 from app.models.test_result import TestResult
-from app.models.user import User
 from app.schemas.question import TargetType
-from app.utils.athlete_type_algorithm import analyze_athlete_type
+from app.schemas.test import TestInterfaceSubmit
+from app.services.test_service import TestService
+from app.services.comment_engine import FIELD_LABELS
+from app.core.metrics import TEST_SUBMISSIONS
+from app.core.etag import conditional_response, make_etag
+from app.core.templating import cached_page, fragment_cache, render_template, templates
+from app.services.question_catalog import QuestionCatalog, question_catalog
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="backend/templates")
+
+TARGET_NAMES = {
+    TargetType.PLAYER: "選手",
+    TargetType.COACH: "指導者",
+    TargetType.MOTHER: "母親",
+    TargetType.FATHER: "父親",
+    TargetType.ADULT: "大人・一般"
+}
 
 
 class TestSubmission(BaseModel):
-    target_selection: str
-    answers: Dict[str, int]
+    target_selection: TargetType
+    answers: Dict[str, int]  # 質問ID -> 回答値
 
 
 @router.get("/", response_class=HTMLResponse)
 def target_selection(request: Request):
     """対象選択画面"""
-    return templates.TemplateResponse("enhanced_target_selection.html", {"request": request})
+    return cached_page(request, ("page", "enhanced_target_selection.html"),
+                       lambda: render_template("enhanced_target_selection.html", {}))
 
 @router.get("/enhanced", response_class=HTMLResponse)
 def enhanced_target_selection(request: Request):
     """強化版対象選択画面"""
-    return templates.TemplateResponse("enhanced_target_selection.html", {"request": request})
+    return cached_page(request, ("page", "enhanced_target_selection.html"),
+                       lambda: render_template("enhanced_target_selection.html", {}))
+
+
+def _questions_json(catalog: QuestionCatalog, target: str) -> str:
+    """対象の質問一覧（画面に埋め込むJSON）。対象・カタログのバージョンごとにキャッシュ"""
+    def render():
+        questions = [
+            {
+                "question_id": q.question_id,
+                "question_number": q.question_number,
+                "question_text": q.question_text,
+                "category": q.category,
+                "subcategory": q.subcategory,
+            }
+            for q in catalog.for_target(target)
+        ]
+        # <script> 内に埋め込むため "</" をエスケープ
+        return json.dumps(questions, ensure_ascii=False).replace("</", "<\\/")
+    return fragment_cache.get_or_render(("questions", target, catalog.version), render)
+
+
+def _test_interface_page(request: Request, target: TargetType, db: Session) -> Response:
+    catalog = question_catalog.get(db)
+    return cached_page(
+        request,
+        ("page", "enhanced_test_interface.html", target.value, catalog.version),
+        lambda: render_template("enhanced_test_interface.html", {
+            "target": target.value,
+            "target_name": TARGET_NAMES.get(target, target.value),
+            "questions_json": _questions_json(catalog, target.value)
+        })
+    )
 
 
 @router.get("/test/{target}", response_class=HTMLResponse)
@@ -42,20 +92,8 @@ def test_interface(
     target: TargetType,
     db: Session = Depends(get_db)
 ):
-    """テストインターフェース画面"""
-    target_names = {
-        TargetType.PLAYER: "選手",
-        TargetType.COACH: "指導者", 
-        TargetType.MOTHER: "母親",
-        TargetType.FATHER: "父親",
-        TargetType.ADULT: "大人・一般"
-    }
-    
-    return templates.TemplateResponse("enhanced_test_interface.html", {
-        "request": request,
-        "target": target.value,
-        "target_name": target_names.get(target, target.value)
-    })
+    """テストインターフェース画面（質問一覧を埋め込み、描画済みHTMLを使い回す）"""
+    return _test_interface_page(request, target, db)
 
 @router.get("/test/{target}/enhanced", response_class=HTMLResponse)
 def enhanced_test_interface(
@@ -64,185 +102,81 @@ def enhanced_test_interface(
     db: Session = Depends(get_db)
 ):
     """強化版テストインターフェース画面"""
-    target_names = {
-        TargetType.PLAYER: "選手",
-        TargetType.COACH: "指導者", 
-        TargetType.MOTHER: "母親",
-        TargetType.FATHER: "父親",
-        TargetType.ADULT: "大人・一般"
-    }
-    
-    return templates.TemplateResponse("enhanced_test_interface.html", {
-        "request": request,
-        "target": target.value,
-        "target_name": target_names.get(target, target.value)
-    })
+    return _test_interface_page(request, target, db)
 
 
 @router.post("/test/submit")
-async def submit_test(
+def submit_test(
     test_data: TestSubmission,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: Optional[Principal] = Depends(get_current_principal)
 ):
-    """テスト結果提出"""
+    """
+    テスト結果提出
+    
+    採点・分析・保存は /tests/submit と同じ TestService の処理で行う
+    （質問は共有カタログから取得。未認証の場合はユーザーなしの匿名の結果として保存）
+    """
+    if not test_data.answers:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Target selection and answers are required"
+        )
+    
+    user_id = current_user.user_id if current_user else None
+    target_selection = test_data.target_selection.value
     try:
-        target_selection = test_data.target_selection
-        answers = test_data.answers
-        
-        if not target_selection or not answers:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Target selection and answers are required"
-            )
-        
-        # 質問データを取得してスコア計算
-        questions = db.query(Question).filter(
-            (Question.target == TargetType.ALL) | 
-            (Question.target == target_selection)
-        ).all()
-        
-        # スコア計算
-        result_data = calculate_scores(questions, answers, target_selection)
-        
-        # アスリートタイプ情報を分離
-        athlete_type_result = result_data.pop('athlete_type', None)
-        scores = result_data
-        
-        # テスト結果を保存
-        test_result = TestResult(
-            result_id=uuid.uuid4(),
-            user_id=None,  # 匿名ユーザー
-            target_selection=target_selection,
-            **scores
+        submission = TestInterfaceSubmit(
+            user_id=user_id,
+            test_date=datetime.now(timezone.utc),
+            answers=[
+                {"question_id": question_id, "answer_value": value}
+                for question_id, value in test_data.answers.items()
+            ]
         )
-        
-        db.add(test_result)
-        db.commit()
-        db.refresh(test_result)
-        
-        return {
-            "result_id": test_result.result_id, 
-            "scores": scores,
-            "athlete_type": athlete_type_result
-        }
-        
+    except PydanticValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    try:
+        result = TestService(db).process_test_submission(user_id, submission, target_selection)
     except Exception as e:
         db.rollback()
+        logger.error(f"Error in test interface submission: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Test submission failed: {str(e)}"
+            detail="Test submission failed"
         )
-
-
-def calculate_scores(questions, answers, target_selection=None):
-    """スコア計算ロジック（アスリートタイプ分析付き）"""
-    scores = {
-        # 自己肯定感関連
-        "self_determination": 0,
-        "self_acceptance": 0, 
-        "self_worth": 0,
-        "self_efficacy": 0,
-        
-        # アスリートマインド
-        "introspection": 0,
-        "self_control": 0,
-        "devotion": 0,
-        "intuition": 0,
-        "sensitivity": 0,
-        "steadiness": 0,
-        "comparison": 0,
-        "result": 0,
-        "assertion": 0,
-        "commitment": 0,
-        
-        # スポーツマンシップ
-        "courage": 0,
-        "resilience": 0,
-        "cooperation": 0,
-        "natural_acceptance": 0,
-        "non_rationality": 0
-    }
-    
-    # カテゴリ別スコア計算
-    category_mapping = {
-        # スポーツマンシップのサブカテゴリ
-        "courage": "courage",
-        "resilience": "resilience", 
-        "cooperation": "cooperation",
-        "natural_acceptance": "natural_acceptance",
-        "non_rationality": "non_rationality",
-        
-        # アスリートマインドのサブカテゴリ
-        "commitment": "commitment",
-        "results_oriented": "result", 
-        "steady": "steadiness",
-        "devoted": "devotion",
-        "self_control": "self_control",
-        "assertive": "assertion",
-        "sensitive": "sensitivity",
-        "intuitive": "intuition",
-        "introspective": "introspection",
-        "comparative": "comparison",
-        
-        # 自己肯定感のサブカテゴリ
-        "self_determination": "self_determination",
-        "self_acceptance": "self_acceptance",
-        "self_worth": "self_worth",
-        "self_efficacy": "self_efficacy"
-    }
-    
-    # 質問ごとにスコア計算
-    for question in questions:
-        question_id = str(question.question_id)
-        if question_id in answers:
-            raw_score = answers[question_id]
-            
-            # 逆転スコア処理
-            if question.is_reverse_score:
-                final_score = 10 - raw_score
-            else:
-                final_score = raw_score
-            
-            # サブカテゴリに対応するスコアフィールドに加算
-            subcategory = question.subcategory
-            if subcategory in category_mapping:
-                score_field = category_mapping[subcategory]
-                scores[score_field] += final_score
-    
-    # アスリートタイプ分析
-    athlete_type_result = None
-    if target_selection:
-        # アスリートマインドスコアを抽出（正しいキー名にマッピング）
-        athlete_mind_scores = {
-            'commitment': scores['commitment'],
-            'results_oriented': scores['result_focus'],
-            'steady': scores['steadiness'],
-            'devoted': scores['dedication'],
-            'self_control': scores['self_control'],
-            'assertive': scores['assertion'],
-            'sensitive': scores['sensitivity'],
-            'intuitive': scores['intuition'],
-            'introspective': scores['introspection'],
-            'comparative': scores['comparison']
-        }
-        
-        # アスリートマインドスコアが存在する場合のみ分析実行
-        if any(score > 0 for score in athlete_mind_scores.values()):
-            try:
-                athlete_type_result = analyze_athlete_type(athlete_mind_scores, target_selection)
-            except Exception as e:
-                print(f"アスリートタイプ分析エラー: {e}")
-                athlete_type_result = None
+    TEST_SUBMISSIONS.inc(source="test_interface")
     
     return {
-        **scores,
-        "athlete_type": athlete_type_result
+        "result_id": result.result_id,
+        "scores": {field: getattr(result, field) for field in FIELD_LABELS},
+        "athlete_type": result.athlete_type
     }
 
 
+def _results_page(request: Request, response: Response, test_result: TestResult) -> Response:
+    """結果画面（結果は変更されないため、結果IDから作るETagで再検証させる）"""
+    not_modified = conditional_response(
+        request, response, make_etag("enhanced_test_results.html", test_result.result_id)
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    target_names = {target.value: name for target, name in TARGET_NAMES.items()}
+    page = templates.TemplateResponse("enhanced_test_results.html", {
+        "request": request,
+        "result": test_result,
+        "target_name": target_names.get(test_result.target_selection, test_result.target_selection)
+    })
+    page.headers.update(response.headers)
+    return page
+
+
 @router.get("/results/{result_id}", response_class=HTMLResponse)
 def test_results(
     request: Request,
+    response: Response,
     result_id: UUID,
     db: Session = Depends(get_db)
 ):
@@ -257,30 +191,19 @@ def test_results(
             detail="Test result not found"
         )
     
-    # 結果画面用のデータを準備
-    target_names = {
-        "player": "選手",
-        "coach": "指導者",
-        "mother": "母親", 
-        "father": "父親",
-        "adult": "大人・一般"
-    }
-    
-    return templates.TemplateResponse("enhanced_test_results.html", {
-        "request": request,
-        "result": test_result,
-        "target_name": target_names.get(test_result.target_selection, test_result.target_selection)
-    })
+    return _results_page(request, response, test_result)
 
 
 @router.get("/admin", response_class=HTMLResponse)
 def admin_dashboard(request: Request):
     """管理者ダッシュボード"""
-    return templates.TemplateResponse("admin_dashboard.html", {"request": request})
+    return cached_page(request, ("page", "admin_dashboard.html"),
+                       lambda: render_template("admin_dashboard.html", {}))
 
 @router.get("/results/{result_id}/enhanced", response_class=HTMLResponse)
 def enhanced_test_results(
     request: Request,
+    response: Response,
     result_id: UUID,
     db: Session = Depends(get_db)
 ):
@@ -295,23 +218,11 @@ def enhanced_test_results(
             detail="Test result not found"
         )
     
-    # 結果画面用のデータを準備
-    target_names = {
-        "player": "選手",
-        "coach": "指導者",
-        "mother": "母親", 
-        "father": "父親",
-        "adult": "大人・一般"
-    }
-    
-    return templates.TemplateResponse("enhanced_test_results.html", {
-        "request": request,
-        "result": test_result,
-        "target_name": target_names.get(test_result.target_selection, test_result.target_selection)
-    })
+    return _results_page(request, response, test_result)
 
 
 @router.get("/admin", response_class=HTMLResponse)
 def admin_dashboard_main(request: Request):
     """管理者ダッシュボード"""
-    return templates.TemplateResponse("admin_dashboard.html", {"request": request})
\ No newline at end of file
+    return cached_page(request, ("page", "admin_dashboard.html"),
+                       lambda: render_template("admin_dashboard.html", {}))
\ No newline at end of file
@@ -1,7 +1,7 @@
 # ファイル: backend/app/api/tests.py
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Header, Query
 from app.exceptions import (
     InternalError,
     ResourceNotFound,
@@ -28,15 +28,28 @@ from app.schemas.test import (
     TestSubmit, 
     TestResult as TestResultSchema,
     TestResultWithAnalysis,
-    TestHistory
+    TestHistory,
+    TestBatchSubmit,
+    TestBatchResponse,
+    ScoreTrend
 )
-from app.dependencies import get_current_active_user, get_current_active_user_required
-from app.services.test_service import TestService
+from app.dependencies import get_current_active_user_required, get_current_principal, get_current_principal_required
+from app.core.principal import Principal
+from app.services.test_service import TestService, make_submission_key
+from app.services.trend_service import ScoreTrendService
+from app.services.percentile_service import percentile_index
+from app.core.idempotency import submission_store
+from app.core.etag import conditional_response, make_etag
+from app.core.responses import json_response
 from app.config import settings
+from app.core.metrics import TEST_SUBMISSIONS
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# 履歴一覧で返す項目（response_model の TestResult と同じ）
+HISTORY_FIELDS = set(TestResultSchema.__fields__)
+
 router = APIRouter()
 
 
@@ -44,8 +57,14 @@ router = APIRouter()
 def submit_test(
     test_data: TestSubmit,
     db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_active_user)
+    current_user: Optional[Principal] = Depends(get_current_principal),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100)
 ):
+    """
+    テスト回答を提出
+    
+    Idempotency-Key ヘッダーを付けた再送では、採点・登録を行わず最初の結果を返す
+    """
     logger.info(f"Received test submission: {len(test_data.answers)} answers")
     logger.info(f"Test data user_id: {test_data.user_id if hasattr(test_data, 'user_id') else 'None'}")
     logger.info(f"Test data test_date: {test_data.test_date if hasattr(test_data, 'test_date') else 'None'}")
@@ -76,13 +95,28 @@ def submit_test(
         logger.info(f"Final User ID: {user_id}, Target selection: {target_selection}")
         
         test_service = TestService(db)
+        
+        # 再送の検出（プロセス内ストア → DBの一意キーの順に確認）
+        submission_key = None
+        if idempotency_key and (current_user or test_data.user_id):
+            submission_key = make_submission_key(user_id, idempotency_key)
+            previous = submission_store.get(submission_key) or test_service.find_submission(submission_key)
+            if previous is not None:
+                logger.info(f"Duplicate submission detected: {previous.result_id}")
+                submission_store.set(submission_key, previous)
+                return previous
+        
         # test_dataにtest_dateが含まれている
         result = test_service.process_test_submission(
             user_id, 
             test_data, 
-            target_selection
+            target_selection,
+            submission_key
         )
+        if submission_key:
+            submission_store.set(submission_key, result)
         logger.info(f"Test submission successful: {result.result_id}")
+        TEST_SUBMISSIONS.inc(source="api")
         return result
     except Exception as e:
         logger.error(f"Error in submit_test: {str(e)}")
@@ -90,8 +124,45 @@ def submit_test(
         raise InternalError(error=e)
 
 
+@router.post("/submit-batch", response_model=TestBatchResponse)
+def submit_test_batch(
+    batch: TestBatchSubmit,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal_required)
+):
+    """
+    オフラインで回答した複数のテストを一括提出
+    
+    各回答にはクライアントで生成した client_submission_id を付与する。
+    同じユーザー・同じキーの再送は登録せず、既存の結果を duplicate として返す。
+    他ユーザーの回答は、本人・家族（親）・同じクラブのヘッドコーチのみ提出できる。
+    """
+    if len(batch.submissions) > settings.TEST_BATCH_MAX_SUBMISSIONS:
+        raise ValidationError(details=[ErrorDetail(
+            message=f"一度に提出できるのは{settings.TEST_BATCH_MAX_SUBMISSIONS}件までです", field="submissions"
+        )])
+    
+    test_service = TestService(db)
+    results = test_service.process_batch_submission(current_user, batch.submissions)
+    
+    created = sum(1 for r in results if r.status == "created")
+    duplicates = sum(1 for r in results if r.status == "duplicate")
+    if created:
+        TEST_SUBMISSIONS.inc(created, source="batch")
+    logger.info(f"Batch submission: {len(results)} items, {created} created, {duplicates} duplicates")
+    
+    return TestBatchResponse(
+        created=created,
+        duplicates=duplicates,
+        failed=len(results) - created - duplicates,
+        results=results
+    )
+
+
 @router.get("/history", response_model=TestHistory)
 def get_test_history(
+    request: Request,
+    response: Response,
     limit: int = 10,
     offset: int = 0,
     sort_by: Optional[str] = "date",
@@ -100,10 +171,11 @@ def get_test_history(
     score_min: Optional[int] = None,
     score_max: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user_required)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
     """
     テスト履歴を取得（フィルタリング・ソート機能付き）
+    結果は変更されないため、件数とページ内の結果IDの並びからETagを作る
     
     Parameters:
     - limit: 取得件数
@@ -137,20 +209,11 @@ def get_test_history(
     
     # スコア範囲フィルタリング
     if score_min is not None or score_max is not None:
-        # 総合スコアを計算（SQLAlchemy式として）
-        total_score = (
-            TestResult.self_esteem_total +
-            TestResult.courage +
-            TestResult.resilience +
-            TestResult.cooperation +
-            TestResult.natural_acceptance +
-            TestResult.non_rationality
-        )
-        
+        # 保存済みの総合スコア（自己肯定感合計 + スポーツマンシップ合計）で絞り込み
         if score_min is not None:
-            query = query.filter(total_score >= score_min)
+            query = query.filter(TestResult.total_score >= score_min)
         if score_max is not None:
-            query = query.filter(total_score <= score_max)
+            query = query.filter(TestResult.total_score <= score_max)
     
     # 総件数を取得（ページネーション前）
     total = query.count()
@@ -158,16 +221,7 @@ def get_test_history(
     # ソート
     if sort_by == "score":
         # スコアでソート（降順）
-        query = query.order_by(
-            desc(
-                TestResult.self_esteem_total +
-                TestResult.courage +
-                TestResult.resilience +
-                TestResult.cooperation +
-                TestResult.natural_acceptance +
-                TestResult.non_rationality
-            )
-        )
+        query = query.order_by(desc(TestResult.total_score))
     else:
         # 日付でソート（降順）
         query = query.order_by(desc(TestResult.test_date))
@@ -175,6 +229,12 @@ def get_test_history(
     # ページネーション
     results = query.offset(offset).limit(limit).all()
     
+    # 前回と同じ結果の並びなら分析を行わずに304
+    etag = make_etag(current_user.user_id, total, *(result.result_id for result in results))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    
     # TestServiceを使用して分析情報を追加
     test_service = TestService(db)
     results_with_analysis = []
@@ -186,12 +246,15 @@ def get_test_history(
         except Exception as e:
             logger.error(f"Error analyzing result {result.result_id}: {str(e)}")
             # 分析に失敗した場合は基本情報のみ返す
-            results_with_analysis.append(result)
+            results_with_analysis.append(TestResultSchema.validate(
+                {name: getattr(result, name) for name in HISTORY_FIELDS}
+            ))
     
-    return {
-        "results": results_with_analysis,
+    # 分析結果は検証済みのため、response_model での再検証を行わずにシリアライズ
+    return json_response({
+        "results": [analysis.dict(include=HISTORY_FIELDS) for analysis in results_with_analysis],
         "total_count": total
-    }
+    }, response)
 
 
 @router.get("/export")
@@ -358,6 +421,8 @@ def export_to_pdf(results: List[TestResult], user: User) -> Response:
         
         # 総合スコアの計算
         def calc_total_score(r):
+            if r.total_score is not None:
+                return r.total_score
             return r.self_esteem_total + r.courage + r.resilience + r.cooperation + r.natural_acceptance + r.non_rationality
         
         latest_score = calc_total_score(latest_result)
@@ -437,7 +502,7 @@ def export_to_pdf(results: List[TestResult], user: User) -> Response:
 @router.get("/latest", response_model=TestResultWithAnalysis)
 def get_latest_test(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user_required)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
     latest_result = db.query(TestResult).filter(
         TestResult.user_id == current_user.user_id
@@ -448,15 +513,51 @@ def get_latest_test(
     
     test_service = TestService(db)
     analysis = test_service.analyze_test_result(latest_result)
+    analysis.percentile_ranks = percentile_index.ranks_for_user(db, current_user.user_id, latest_result)
     
     return analysis
 
 
+@router.get("/trends/me", response_model=ScoreTrend)
+def get_my_score_trend(
+    period: str = Query("month", regex="^(week|month)$"),
+    limit: int = Query(12, ge=1, le=104),
+    window: int = Query(3, ge=1, le=12),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal_required)
+):
+    """
+    自分のスコア推移（期間別の平均・前期間との差・移動平均・変化率）
+    
+    Parameters:
+    - period: 集計単位 ("week" または "month")
+    - limit: 取得する期間数（新しい順に数えて、古い順で返す）
+    - window: 移動平均の期間数
+    """
+    return ScoreTrendService(db).user_trend(current_user.user_id, period, limit, window)
+
+
+@router.get("/trends/user/{user_id}", response_model=ScoreTrend)
+def get_user_score_trend(
+    user_id: UUID,
+    period: str = Query("month", regex="^(week|month)$"),
+    limit: int = Query(12, ge=1, le=104),
+    window: int = Query(3, ge=1, le=12),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal_required)
+):
+    # 履歴と同じく本人またはヘッドコーチのみ
+    if str(user_id) != str(current_user.user_id) and not current_user.head_coach_function:
+        raise PermissionDenied(details=[ErrorDetail(message="このユーザーのテスト履歴を閲覧する権限がありません")])
+    
+    return ScoreTrendService(db).user_trend(user_id, period, limit, window)
+
+
 @router.get("/{result_id}", response_model=TestResultWithAnalysis)
 def get_test_result(
     result_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user_required)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
     result = db.query(TestResult).filter(
         TestResult.result_id == result_id
@@ -471,6 +572,7 @@ def get_test_result(
     
     test_service = TestService(db)
     analysis = test_service.analyze_test_result(result)
+    analysis.percentile_ranks = percentile_index.ranks_for_user(db, result.user_id, result)
     
     return analysis
 
@@ -478,10 +580,12 @@ def get_test_result(
 @router.get("/user/{user_id}/history", response_model=TestHistory)
 def get_user_test_history(
     user_id: UUID,
+    request: Request,
+    response: Response,
     limit: int = 10,
     offset: int = 0,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user_required)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
     # Check permissions - only head coach or the user themselves
     if str(user_id) != str(current_user.user_id) and not current_user.head_coach_function:
@@ -495,6 +599,11 @@ def get_user_test_history(
         TestResult.user_id == user_id
     ).count()
     
+    etag = make_etag(user_id, total, *(result.result_id for result in results))
+    not_modified = conditional_response(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    
     return {
         "results": results,
         "total_count": total
@@ -1,6 +1,7 @@
 # backend/app/api/users.py
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from uuid import UUID
 from pydantic import BaseModel
@@ -8,10 +9,23 @@ from pydantic import BaseModel
 from app.database import get_db
 from app.models.user import User
 from app.models.family_relation import FamilyRelation
-from app.schemas.user import User as UserSchema, UserUpdate, UserWithRelations
-from app.dependencies import get_current_active_user_required, get_head_coach_user
+from app.schemas.user import (
+    User as UserSchema,
+    UserUpdate,
+    UserWithRelations,
+    BulkImportRequest,
+    BulkImportResponse,
+)
+from app.dependencies import (
+    get_current_active_user_required,
+    get_current_principal_required,
+    get_head_coach_principal,
+)
+from app.core.principal import Principal, principal_cache
 from app.core.security import get_password_hash
 from app.models.club import Club
+from app.services.user_import_service import UserImportService, read_import_request
+from app.services.ai_service import coaching_context_cache
 
 
 router = APIRouter()
@@ -53,6 +67,8 @@ def update_user_me(
         current_user.password_hash = get_password_hash(user_update.password)
     
     db.commit()
+    principal_cache.invalidate(current_user.user_id)
+    coaching_context_cache.invalidate(current_user.user_id)
     db.refresh(current_user)
     
     return current_user
@@ -104,7 +120,7 @@ def read_current_user_club_members(
 def read_club_users(
     club_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_head_coach_user)
+    current_user: Principal = Depends(get_head_coach_principal)
 ):
     if current_user.club_id != club_id:
         raise HTTPException(
@@ -115,6 +131,23 @@ def read_club_users(
     users = db.query(User).filter(User.club_id == club_id).all()
     return users
 
+@router.post("/club/{club_id}/members/import", response_model=BulkImportResponse)
+async def import_club_members(
+    club_id: str,
+    payload: BulkImportRequest = Depends(read_import_request),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_head_coach_principal)
+):
+    """ヘッドコーチが自分のクラブのメンバーを一括登録（JSON または Content-Type: text/csv）"""
+    if current_user.club_id != club_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Can only import users into your own club"
+        )
+    
+    service = UserImportService(db)
+    return await run_in_threadpool(service.import_for_club, club_id, payload)
+
 @router.put("/join-club")
 def join_club(
     request: JoinClubRequest,
@@ -140,6 +173,8 @@ def join_club(
     # クラブに参加
     current_user.club_id = request.club_id
     db.commit()
+    principal_cache.invalidate(current_user.user_id)
+    coaching_context_cache.invalidate(current_user.user_id)
     db.refresh(current_user)
     
     return {
@@ -164,6 +199,8 @@ def leave_club(
     old_club_id = current_user.club_id
     current_user.club_id = None
     db.commit()
+    principal_cache.invalidate(current_user.user_id)
+    coaching_context_cache.invalidate(current_user.user_id)
     db.refresh(current_user)
     
     return {
@@ -176,7 +213,7 @@ def leave_club(
 def read_user(
     user_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user_required)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
     # Check permissions
     if str(current_user.user_id) != str(user_id) and not current_user.head_coach_function:
@@ -219,7 +256,7 @@ def add_child_relation(
     user_id: UUID,
     child_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user_required)
+    current_user: Principal = Depends(get_current_principal_required)
 ):
     # Only the parent themselves or head coach can add relations
     if str(current_user.user_id) != str(user_id) and not current_user.head_coach_function:
@@ -1,5 +1,6 @@
 ## backend/app/config.py
 import os
+import tempfile
 from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 from urllib.parse import urlparse
@@ -19,14 +20,87 @@ class Settings(BaseModel):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24時間
     
-    # OpenAI
-    OPENAI_API_KEY: Optional[str] = None
+    # OpenAI（OpenAI互換の Chat Completions API）
+    OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
+    OPENAI_API_BASE: str = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # AIコーチングの応答待ち上限（秒）と同時呼び出し数の上限
+    AI_COACHING_TIMEOUT_SECONDS: float = float(os.getenv("AI_COACHING_TIMEOUT_SECONDS", "30"))
+    AI_COACHING_MAX_CONCURRENCY: int = int(os.getenv("AI_COACHING_MAX_CONCURRENCY", "20"))
+    # ユーザーごとのコーチング用コンテキスト（スコア・直近の会話）のキャッシュ有効秒数と件数
+    COACHING_CONTEXT_TTL_SECONDS: int = int(os.getenv("COACHING_CONTEXT_TTL_SECONDS", "300"))
+    COACHING_CONTEXT_MAX_ENTRIES: int = int(os.getenv("COACHING_CONTEXT_MAX_ENTRIES", "10000"))
+    # よくある質問への応答キャッシュ（役割・スコア帯ごと。類似度はしきい値以上で同じ質問とみなす）
+    COACHING_RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("COACHING_RESPONSE_CACHE_TTL_SECONDS", "86400"))
+    COACHING_RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("COACHING_RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    COACHING_RESPONSE_CACHE_SIMILARITY: float = float(os.getenv("COACHING_RESPONSE_CACHE_SIMILARITY", "0.85"))
+    COACHING_RESPONSE_CACHE_MAX_SCAN: int = int(os.getenv("COACHING_RESPONSE_CACHE_MAX_SCAN", "200"))
+    COACHING_RESPONSE_SCORE_BUCKET: int = int(os.getenv("COACHING_RESPONSE_SCORE_BUCKET", "20"))
+    # 知識源の検索インデックス（scripts/build_knowledge_index.py で作成）と、プロンプトに含める件数
+    KNOWLEDGE_INDEX_DIR: str = os.getenv(
+        "KNOWLEDGE_INDEX_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "knowledge_index")
+    )
+    KNOWLEDGE_TOP_K: int = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
+    KNOWLEDGE_MIN_SCORE: float = float(os.getenv("KNOWLEDGE_MIN_SCORE", "0.05"))
+    KNOWLEDGE_HINT_WEIGHT: float = float(os.getenv("KNOWLEDGE_HINT_WEIGHT", "0.5"))
+    # この日数より古い会話はアーカイブ（要約 + 圧縮）へ移す / 会話の区切りとみなす間隔（分）
+    CHAT_ARCHIVE_AFTER_DAYS: int = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "30"))
+    CHAT_CONVERSATION_GAP_MINUTES: int = int(os.getenv("CHAT_CONVERSATION_GAP_MINUTES", "60"))
     
     # Application
     APP_NAME: str = "Sportsmanship App"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
     
+    # Performance instrumentation
+    # 1リクエストあたりのSQL発行数がこの値を超えた場合に警告を出す
+    QUERY_COUNT_WARN_THRESHOLD: int = int(os.getenv("QUERY_COUNT_WARN_THRESHOLD", "20"))
+    # エンドポイントごとに保持する直近リクエスト数（パーセンタイル計算用）
+    REQUEST_METRICS_WINDOW: int = int(os.getenv("REQUEST_METRICS_WINDOW", "500"))
+    
+    # Password hashing
+    # bcryptのコストファクター（変更後はログイン時に自動で再ハッシュされる）
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # ハッシュ計算の同時実行数（既定: CPUコア数）
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    
+    # 認証済みユーザー（Principal）キャッシュ。TTLを0にすると無効
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+    
+    # 管理者アカウントの読み取りキャッシュ有効秒数と、last_loginの一括書き込み間隔
+    ADMIN_CACHE_TTL_SECONDS: int = int(os.getenv("ADMIN_CACHE_TTL_SECONDS", "30"))
+    ADMIN_LAST_LOGIN_FLUSH_SECONDS: int = int(os.getenv("ADMIN_LAST_LOGIN_FLUSH_SECONDS", "10"))
+    
+    # メンバー一括登録の1リクエストあたりの最大件数
+    BULK_IMPORT_MAX_ROWS: int = int(os.getenv("BULK_IMPORT_MAX_ROWS", "1000"))
+    
+    # 質問カタログ（採点用）の再読み込み間隔（秒）
+    QUESTION_CATALOG_TTL_SECONDS: int = int(os.getenv("QUESTION_CATALOG_TTL_SECONDS", "300"))
+    # テスト一括提出の1リクエストあたりの最大件数
+    TEST_BATCH_MAX_SUBMISSIONS: int = int(os.getenv("TEST_BATCH_MAX_SUBMISSIONS", "5000"))
+    # Idempotency-Key 付きテスト提出の結果をプロセス内に保持する秒数と件数
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    
+    # パーセンタイル順位用のグループ別スコア配列の再読み込み間隔（秒）と年齢帯の幅（歳）
+    PERCENTILE_INDEX_TTL_SECONDS: int = int(os.getenv("PERCENTILE_INDEX_TTL_SECONDS", "300"))
+    PERCENTILE_AGE_BAND_YEARS: int = int(os.getenv("PERCENTILE_AGE_BAND_YEARS", "3"))
+    
+    # この大きさ（バイト）未満のレスポンスは圧縮しない
+    RESPONSE_COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("RESPONSE_COMPRESSION_MINIMUM_SIZE", "1000"))
+    
+    # HTMLテンプレート: 変更の自動検知（開発時のみ true）、バイトコードキャッシュの場所、描画済みHTMLのキャッシュ件数
+    TEMPLATE_AUTO_RELOAD: bool = os.getenv("TEMPLATE_AUTO_RELOAD", "false").lower() == "true"
+    TEMPLATE_BYTECODE_CACHE_DIR: str = os.getenv(
+        "TEMPLATE_BYTECODE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sportsmanship-jinja-cache")
+    )
+    TEMPLATE_FRAGMENT_CACHE_MAX_ENTRIES: int = int(os.getenv("TEMPLATE_FRAGMENT_CACHE_MAX_ENTRIES", "200"))
+    
+    # 起動時のDBスキーマのリビジョン確認（error: 最新でなければ起動しない / warn: 警告のみ / off）
+    SCHEMA_VERSION_CHECK: str = os.getenv("SCHEMA_VERSION_CHECK", "warn").lower()
+    
     # Frontend
     REACT_APP_API_URL: str = "http://localhost:8000"
     REACT_APP_APP_NAME: str = "Sportsmanship App"
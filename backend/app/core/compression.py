@@ -0,0 +1,23 @@
+# app/core/compression.py
+"""
+レスポンス圧縮（GZip）
+
+Server-Sent Events（パスが /stream で終わるもの）は
+圧縮するとイベントがバッファリングされて届かなくなるため圧縮しない。
+"""
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+STREAMING_PATH_SUFFIXES = ("/stream",)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000):
+        self.app = app
+        self.compressed_app = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not scope["path"].endswith(STREAMING_PATH_SUFFIXES):
+            await self.compressed_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
@@ -0,0 +1,61 @@
+# app/core/etag.py
+"""
+ETag による条件付きGET
+
+レスポンス本体を作る前に、内容を決める値（質問カタログのバージョン、
+結果IDの並びなど）から弱いETagを計算する。If-None-Match が一致すれば
+本体を作らずに 304 を返す。
+圧縮の有無（Content-Encoding）で本体のバイト列が変わっても同じ値を返すため、
+強いETagではなく弱いETag（W/"..."）にする。
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+# 端末側でキャッシュしてよいが、使う前に必ず再検証させる
+CACHE_CONTROL_PRIVATE = "private, no-cache"
+CACHE_CONTROL_PUBLIC = "public, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """内容を決める値の並びから弱いETagを作る（デプロイで分析文などが変わるためアプリのバージョンも含める）"""
+    digest = hashlib.sha1(settings.APP_VERSION.encode("utf-8"))
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # GETの比較は弱い比較（W/ を無視）
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified_response(etag: str, cache_control: str = CACHE_CONTROL_PRIVATE) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = CACHE_CONTROL_PRIVATE
+) -> Optional[Response]:
+    """
+    一致すれば304レスポンスを返す。一致しなければ response にETagを設定して None を返す
+    （呼び出し側はそのまま本体を作って返す）
+    """
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, cache_control)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return None
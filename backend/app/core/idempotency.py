@@ -0,0 +1,16 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key による再送検出用の短期ストア
+
+キー -> 最初のレスポンス をプロセス内に一定時間保持する。
+プロセスをまたぐ再送や期限切れ後の再送は、DB側の一意キー
+（test_results.submission_key）で検出する。
+"""
+from app.config import settings
+from app.core.ttl_cache import TTLCache
+
+submission_store = TTLCache(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES,
+    name="submission_idempotency",
+)
@@ -0,0 +1,212 @@
+# app/core/instrumentation.py
+"""
+リクエスト単位の計測（処理時間・DB時間・SQL発行数）
+
+- SQLAlchemyのカーソルイベントでSQL発行数とDB時間を集計
+- レスポンスに Server-Timing ヘッダーを付与
+- エンドポイントごとの直近リクエストからヒストグラム/パーセンタイルを算出
+"""
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.core.metrics import REQUEST_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# ヒストグラムのバケット上限（ミリ秒）
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class RequestStats:
+    """1リクエスト分の計測値"""
+
+    __slots__ = ("query_count", "db_time", "started_at")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.started_at = time.perf_counter()
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def get_current_request_stats() -> Optional[RequestStats]:
+    """現在のリクエストの計測値（リクエスト外ではNone）"""
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += time.perf_counter() - started
+
+
+class EndpointStats:
+    """エンドポイントごとの累積値と直近ウィンドウ"""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.flagged_count = 0
+        self.error_count = 0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.recent_total_ms: Deque[float] = deque(maxlen=window)
+        self.recent_db_ms: Deque[float] = deque(maxlen=window)
+        self.recent_queries: Deque[int] = deque(maxlen=window)
+
+    def record(self, total_ms: float, db_ms: float, query_count: int, status_code: int, flagged: bool):
+        self.count += 1
+        if flagged:
+            self.flagged_count += 1
+        if status_code >= 500:
+            self.error_count += 1
+        for i, upper in enumerate(LATENCY_BUCKETS_MS):
+            if total_ms <= upper:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+        self.recent_total_ms.append(total_ms)
+        self.recent_db_ms.append(db_ms)
+        self.recent_queries.append(query_count)
+
+    def snapshot(self) -> dict:
+        totals = sorted(self.recent_total_ms)
+        window = len(totals)
+        return {
+            "count": self.count,
+            "error_count": self.error_count,
+            "flagged_count": self.flagged_count,
+            "window_size": window,
+            "latency_ms": {
+                "p50": _percentile(totals, 50),
+                "p95": _percentile(totals, 95),
+                "p99": _percentile(totals, 99),
+                "max": round(totals[-1], 2) if totals else 0.0,
+            },
+            "db_time_ms_avg": round(sum(self.recent_db_ms) / window, 2) if window else 0.0,
+            "queries_avg": round(sum(self.recent_queries) / window, 2) if window else 0.0,
+            "queries_max": max(self.recent_queries) if window else 0,
+            "histogram": {
+                **{f"le_{upper}": count for upper, count in zip(LATENCY_BUCKETS_MS, self.bucket_counts)},
+                "le_inf": self.bucket_counts[-1],
+            },
+        }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+class RequestMetricsRegistry:
+    """エンドポイント別の計測値を保持する（イベントループ上からのみ更新）"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def record(self, endpoint: str, total_ms: float, db_ms: float, query_count: int, status_code: int, flagged: bool):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats(self.window)
+        stats.record(total_ms, db_ms, query_count, status_code, flagged)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {endpoint: stats.snapshot() for endpoint, stats in sorted(self.endpoints.items())}
+
+    def reset(self):
+        self.endpoints.clear()
+
+
+request_metrics = RequestMetricsRegistry(window=settings.REQUEST_METRICS_WINDOW)
+
+
+def _endpoint_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', 'GET')} {path}"
+
+
+def _router_label(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    tags = getattr(route, "tags", None)
+    return tags[0] if tags else "root"
+
+
+class RequestTimingMiddleware:
+    """処理時間・DB時間・SQL発行数を計測し Server-Timing ヘッダーを付与するASGIミドルウェア"""
+
+    def __init__(self, app, query_count_threshold: Optional[int] = None):
+        self.app = app
+        self.query_count_threshold = (
+            query_count_threshold if query_count_threshold is not None else settings.QUERY_COUNT_WARN_THRESHOLD
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+                total_ms = (time.perf_counter() - stats.started_at) * 1000
+                server_timing = (
+                    f'app;dur={total_ms:.1f}, '
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"'
+                ).encode("latin-1")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            total_ms = (time.perf_counter() - stats.started_at) * 1000
+            endpoint = _endpoint_label(scope)
+            flagged = stats.query_count > self.query_count_threshold
+            if flagged:
+                logger.warning(
+                    f"{endpoint} issued {stats.query_count} queries "
+                    f"(threshold {self.query_count_threshold}, {total_ms:.1f}ms)"
+                )
+            request_metrics.record(
+                endpoint,
+                total_ms,
+                stats.db_time * 1000,
+                stats.query_count,
+                status_holder["status"],
+                flagged,
+            )
+            REQUEST_LATENCY.observe(
+                total_ms / 1000,
+                router=_router_label(scope),
+                method=scope.get("method", "GET"),
+                status=status_holder["status"],
+            )
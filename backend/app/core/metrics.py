@@ -0,0 +1,264 @@
+# app/core/metrics.py
+"""
+Prometheus テキスト形式のメトリクス収集
+
+同期エンドポイントはスレッドプールで並行に動くため、値の更新
+（読み出し→加算→書き込み）はメトリクスごとのロック内で行う。
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_OPERATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            cell = self._values.get(key)
+            if cell is None:
+                cell = self._values[key] = [0.0]
+            cell[0] += amount
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, cell[0]) for key, cell in self._values.items()]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 各ラベル組ごとに [バケット別件数..., +Inf件数, 合計値]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            cell = self._values.get(key)
+            if cell is None:
+                cell = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            cell[index] += 1
+            cell[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(cell)) for key, cell in self._values.items()]
+        lines = []
+        for key, cell in values:
+            cumulative = 0
+            for upper, count in zip(self.buckets, cell):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', repr(float(upper))))} {cumulative}")
+            cumulative += cell[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {cell[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    """スクレイプ時に値を取得するゲージ（callbackは {ラベル値タプル: 値} を返す）"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _render_samples(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        # キャッシュ名 -> (hits, misses) を返す関数
+        self._cache_stats: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = (),
+    ) -> GaugeCallback:
+        return self.register(GaugeCallback(name, documentation, callback, labelnames))
+
+    def register_cache(self, name: str, stats: Callable[[], Tuple[int, int]]):
+        """プロセス内キャッシュのヒット/ミス数の取得関数を登録"""
+        self._cache_stats[name] = stats
+
+    def _cache_values(self, index: Optional[int]) -> Dict[LabelValues, float]:
+        values = {}
+        for name, stats in list(self._cache_stats.items()):
+            hits, misses = stats()
+            if index is None:
+                total = hits + misses
+                values[(name,)] = round(hits / total, 4) if total else 0.0
+            else:
+                values[(name,)] = (hits, misses)[index]
+        return values
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "app_request_duration_seconds",
+    "HTTP request latency by router",
+    labelnames=("router", "method", "status"),
+)
+TEST_SUBMISSIONS = registry.counter(
+    "app_test_submissions_total",
+    "Number of processed test submissions",
+    labelnames=("source",),
+)
+DB_READ_SESSIONS = registry.counter(
+    "app_db_read_sessions_total",
+    "Read-only database sessions by target (replica or primary)",
+    labelnames=("target",),
+)
+EXPORT_RENDER_SECONDS = registry.histogram(
+    "app_export_render_seconds",
+    "Time spent rendering result exports",
+    labelnames=("format",),
+    buckets=SLOW_OPERATION_BUCKETS,
+)
+AI_COACHING_SECONDS = registry.histogram(
+    "app_ai_coaching_call_seconds",
+    "Latency of AI coaching completion calls",
+    labelnames=("outcome",),
+    buckets=SLOW_OPERATION_BUCKETS,
+)
+
+
+def _db_pool_values() -> Dict[LabelValues, float]:
+    from app.database import engine
+
+    pool = engine.pool
+    values = {}
+    for state in ("size", "checkedin", "checkedout", "overflow"):
+        getter = getattr(pool, state, None)
+        if callable(getter):
+            values[(state,)] = getter()
+    return values
+
+
+registry.gauge_callback(
+    "app_db_pool_connections",
+    "Database connection pool usage",
+    _db_pool_values,
+    labelnames=("state",),
+)
+registry.gauge_callback(
+    "app_cache_hits",
+    "In-process cache hits",
+    lambda: registry._cache_values(0),
+    labelnames=("cache",),
+)
+registry.gauge_callback(
+    "app_cache_misses",
+    "In-process cache misses",
+    lambda: registry._cache_values(1),
+    labelnames=("cache",),
+)
+registry.gauge_callback(
+    "app_cache_hit_ratio",
+    "In-process cache hit ratio",
+    lambda: registry._cache_values(None),
+    labelnames=("cache",),
+)
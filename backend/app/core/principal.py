@@ -0,0 +1,58 @@
+# app/core/principal.py
+"""
+認証済みユーザーの権限情報（Principal）とTTLキャッシュ
+
+権限チェックだけが必要なエンドポイントでは、リクエストごとに
+usersテーブルを読まずにキャッシュ済みのPrincipalを使用する。
+ユーザーの役割・クラブ・各種フラグを変更した場合は invalidate() を呼ぶこと。
+（プロセスごとのキャッシュのため、他プロセスへの反映はTTL経過後）
+"""
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from app.config import settings
+from app.core.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: UUID
+    role: str
+    club_id: Optional[str]
+    is_individual: bool
+    parent_function: bool
+    head_coach_function: bool
+    head_parent_function: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            user_id=user.user_id,
+            role=user.role,
+            club_id=user.club_id,
+            is_individual=bool(user.is_individual),
+            parent_function=bool(user.parent_function),
+            head_coach_function=bool(user.head_coach_function),
+            head_parent_function=bool(user.head_parent_function),
+        )
+
+
+class PrincipalCache(TTLCache):
+    """user_id -> Principal のTTLキャッシュ"""
+
+    def set(self, principal: Principal):
+        super().set(principal.user_id, principal)
+
+    def invalidate(self, user_id):
+        """ユーザーの権限情報を変更・削除した際に呼び出す"""
+        if not isinstance(user_id, UUID):
+            user_id = UUID(str(user_id))
+        super().invalidate(user_id)
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    name="principal",
+)
@@ -0,0 +1,32 @@
+# app/core/responses.py
+"""
+orjsonによるJSONレスポンス
+
+大きな一覧を返すエンドポイントでは、サービス側で検証済みのデータを
+response_model で再検証・jsonable_encoder で再変換せず、そのまま
+orjsonでシリアライズして返す（json_response）。
+"""
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # orjson未インストール時は標準のjsonで動作させる
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """
+    検証済みのデータをそのままJSONレスポンスにする
+
+    response: エンドポイントで受け取った Response（ETagなど設定済みのヘッダーを引き継ぐ）
+    """
+    headers = dict(response.headers) if response is not None else None
+    if orjson is None:
+        from fastapi.encoders import jsonable_encoder
+        content = jsonable_encoder(content)
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
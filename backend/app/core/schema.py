@@ -0,0 +1,66 @@
+# app/core/schema.py
+"""
+DBスキーマのバージョン確認
+
+テーブルの作成・変更は scripts/migrate.py（Alembic）で起動前に行う。
+アプリの起動時は、DBのリビジョン（alembic_version）がコードの最新リビジョンと
+一致しているかだけを確認する（SCHEMA_VERSION_CHECK: error / warn / off）。
+"""
+import logging
+import os
+from typing import Set, Tuple
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def alembic_config() -> Config:
+    """作業ディレクトリに依存しないAlembicの設定"""
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+
+def expected_revisions() -> Set[str]:
+    """コードに含まれるマイグレーションの最新リビジョン"""
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    """DBに適用済みのリビジョン（未管理のDBは空）"""
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def check_schema_version(engine: Engine) -> Tuple[Set[str], Set[str]]:
+    """
+    DBのリビジョンが最新か確認する（DDLは実行しない）
+    戻り値: (DBのリビジョン, コードの最新リビジョン)
+    """
+    mode = settings.SCHEMA_VERSION_CHECK
+    if mode == "off":
+        return set(), set()
+
+    current = current_revisions(engine)
+    expected = expected_revisions()
+    if current != expected:
+        message = (
+            f"Database schema revision {sorted(current) or 'none'} does not match "
+            f"code revision {sorted(expected)}; run scripts/migrate.py"
+        )
+        if mode == "error":
+            raise SchemaVersionError(message)
+        logger.warning(message)
+    return current, expected
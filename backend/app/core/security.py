@@ -1,11 +1,9 @@
 from datetime import datetime, timedelta
 from typing import Optional, Union
-from passlib.context import CryptContext
 from jose import jwt
 
 from app.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
+from app.services.password_service import password_hasher
 
 
 def create_access_token(
@@ -24,8 +22,8 @@ def create_access_token(
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return password_hasher.hash(password)
\ No newline at end of file
@@ -0,0 +1,95 @@
+# app/core/templating.py
+"""
+HTMLテンプレートの描画
+
+- テンプレートディレクトリは作業ディレクトリに依存しない絶対パス
+- コンパイル結果はバイトコードキャッシュに保存し、ワーカー起動時の再コンパイルを省く
+- 内容が決まった値（対象・質問カタログのバージョンなど）だけで決まるHTMLは
+  FragmentCache に描画済みの文字列を保持して使い回す
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from app.config import settings
+from app.core.etag import CACHE_CONTROL_PUBLIC, is_not_modified, make_etag, not_modified_response
+from app.core.metrics import registry
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "templates"
+)
+
+
+def _bytecode_cache():
+    try:
+        os.makedirs(settings.TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(settings.TEMPLATE_BYTECODE_CACHE_DIR)
+
+
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+# 本番ではテンプレートの更新確認（ファイルのstat）を行わない
+templates.env.auto_reload = settings.TEMPLATE_AUTO_RELOAD
+templates.env.bytecode_cache = _bytecode_cache()
+
+
+class FragmentCache:
+    """描画済みHTMLのLRUキャッシュ（キーに内容を決める値をすべて含めること）"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+        content = render()
+        with self._lock:
+            self._entries[key] = content
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return content
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache(max_entries=settings.TEMPLATE_FRAGMENT_CACHE_MAX_ENTRIES)
+registry.register_cache("template_fragments", lambda: (fragment_cache.hits, fragment_cache.misses))
+
+
+def render_template(template_name: str, context: Dict[str, Any]) -> str:
+    """リクエストに依存しないテンプレートを文字列に描画"""
+    return templates.get_template(template_name).render(context)
+
+
+def cached_page(request: Request, key: Hashable, render: Callable[[], str]) -> Response:
+    """
+    描画済みのHTMLをキャッシュから返す（初回のみ render を呼ぶ）
+    ETagは描画結果から作るため、テンプレートを変更してデプロイすれば変わる
+    """
+    html, etag = fragment_cache.get_or_render(key, lambda: _with_etag(render()))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, CACHE_CONTROL_PUBLIC)
+    return HTMLResponse(html, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL_PUBLIC})
+
+
+def _with_etag(html: str) -> Tuple[str, str]:
+    return html, make_etag(hashlib.sha1(html.encode("utf-8")).hexdigest())
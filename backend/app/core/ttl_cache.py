@@ -0,0 +1,68 @@
+# app/core/ttl_cache.py
+"""
+プロセス内のTTL付きLRUキャッシュ
+
+有効期限を過ぎたエントリは返さず、件数の上限を超えたら最も長く使われていない
+エントリから削除する。name を指定するとメトリクスのキャッシュヒット率に登録する。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from app.core.metrics import registry
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float, max_entries: int, name: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # キー -> (有効期限, 値)。先頭が最も長く使われていない
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if name:
+            registry.register_cache(name, lambda: (self.hits, self.misses))
+
+    def get(self, key: Hashable, valid: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        有効な値を返す（無ければ None）
+        valid: 値がまだ使えるかの追加の判定。False の場合はエントリを削除してミスとする
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] < time.monotonic() or (valid is not None and not valid(entry[1]))):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """ヒット率・使用順を変えずに値を返す（期限切れでも返す）"""
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
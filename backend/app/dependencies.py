@@ -1,10 +1,12 @@
 from typing import Generator, Optional
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.core.principal import Principal, principal_cache
 from app.database import get_db
 from app.models.user import User
 from app.schemas.auth import TokenData
@@ -19,29 +21,70 @@ from app.schemas.error import ErrorDetail
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: Optional[str] = Depends(oauth2_scheme)
-) -> Optional[User]:
-    if token is None:
-        return None
-    
+def _decode_user_id(token: str) -> UUID:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise InvalidCredentials()
         token_data = TokenData(user_id=user_id)
-    except JWTError:
+        return UUID(token_data.user_id)
+    except (JWTError, ValueError):
         raise InvalidCredentials()
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(oauth2_scheme)
+) -> Optional[User]:
+    if token is None:
+        return None
     
-    user = db.query(User).filter(User.user_id == token_data.user_id).first()
+    user_uuid = _decode_user_id(token)
+    user = db.query(User).filter(User.user_id == user_uuid).first()
     if user is None:
         raise InvalidCredentials()
     
+    principal_cache.set(Principal.from_user(user))
     return user
 
 
+def get_current_principal(
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(oauth2_scheme)
+) -> Optional[Principal]:
+    """
+    権限チェック用の認証情報を取得（キャッシュヒット時はDBを読まない）
+    ユーザー行そのものが必要な場合は get_current_user を使用する
+    """
+    if token is None:
+        return None
+    
+    user_uuid = _decode_user_id(token)
+    principal = principal_cache.get(user_uuid)
+    if principal is not None:
+        return principal
+    
+    row = db.query(
+        User.user_id, User.role, User.club_id, User.is_individual,
+        User.parent_function, User.head_coach_function, User.head_parent_function
+    ).filter(User.user_id == user_uuid).first()
+    if row is None:
+        raise InvalidCredentials()
+    
+    principal = Principal.from_user(row)
+    principal_cache.set(principal)
+    return principal
+
+
+def get_current_principal_required(
+    principal: Optional[Principal] = Depends(get_current_principal)
+) -> Principal:
+    if not principal:
+        raise AuthenticationRequired()
+    return principal
+
+
 def get_current_active_user(
     current_user: Optional[User] = Depends(get_current_user)
 ) -> Optional[User]:
@@ -61,6 +104,14 @@ def get_current_active_user_required(
     return current_user
 
 
+def get_head_coach_principal(
+    principal: Principal = Depends(get_current_principal_required)
+) -> Principal:
+    if not principal.head_coach_function:
+        raise HeadCoachRequired()
+    return principal
+
+
 def get_head_coach_user(
     current_user: User = Depends(get_current_active_user_required)
 ) -> User:
@@ -81,8 +132,8 @@ def get_head_parent_user(
 
 
 def get_coach_or_parent_user(
-    current_user: User = Depends(get_current_active_user_required)
-) -> User:
+    current_user: Principal = Depends(get_current_principal_required)
+) -> Principal:
     if not (current_user.role in ["coach", "father", "mother"] or 
             current_user.parent_function or 
             current_user.head_coach_function or
@@ -1,18 +1,32 @@
 # backend/app/main.js
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.instrumentation import RequestTimingMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.metrics import registry as metrics_registry
 from app.api import auth, users, clubs, tests, comparisons, coaching, coach, family, admin, questions, test_interface, athlete_type, export
+from app.core.schema import check_schema_version
 from app.database import engine
-from app.models import Base
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # テーブルの作成・変更は scripts/migrate.py で行い、起動時はリビジョンの確認のみ
+    check_schema_version(engine)
+    yield
+
 
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
+    default_response_class=FastJSONResponse,
     version=settings.APP_VERSION,
     openapi_url="/api/v1/openapi.json",
     docs_url="/docs",
@@ -28,6 +42,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンス圧縮（GZip。SSEは除く）
+app.add_middleware(CompressionMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MINIMUM_SIZE)
+
+# リクエスト単位の処理時間・SQL発行数の計測
+app.add_middleware(RequestTimingMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
@@ -55,4 +75,13 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus形式のメトリクス"""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -3,9 +3,11 @@ from app.models.user import User
 from app.models.club import Club
 from app.models.test_result import TestResult
 from app.models.comparison import ComparisonResult
-from app.models.chat_history import ChatHistory
+from app.models.chat_history import ChatHistory, ChatArchive
 from app.models.family_relation import FamilyRelation
 from app.models.question import Question
+from app.models.admin import AdminUser
+from app.models.score_rollup import ScoreRollup
 
 __all__ = [
     "Base",
@@ -14,6 +16,9 @@ __all__ = [
     "TestResult",
     "ComparisonResult",
     "ChatHistory",
+    "ChatArchive",
     "FamilyRelation",
-    "Question"
+    "Question",
+    "AdminUser",
+    "ScoreRollup"
 ]
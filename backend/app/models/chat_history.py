@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -17,4 +17,31 @@ class ChatHistory(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="chat_history")
\ No newline at end of file
+    user = relationship("User", back_populates="chat_history")
+    
+    __table_args__ = (
+        # 直近の会話の取得・キーセットページング用
+        Index("ix_chat_history_user_id_timestamp", "user_id", "timestamp", "chat_id"),
+    )
+
+
+class ChatArchive(Base):
+    """
+    保存期間を過ぎた会話のアーカイブ（1行 = 1つの会話）
+
+    元のメッセージは zlib 圧縮したJSONで保持し、一覧表示には要約を使う。
+    """
+    __tablename__ = "chat_archives"
+    
+    archive_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    conversation_start = Column(DateTime(timezone=True), nullable=False)
+    conversation_end = Column(DateTime(timezone=True), nullable=False)
+    message_count = Column(Integer, nullable=False)
+    summary = Column(Text, nullable=False)
+    messages = Column(LargeBinary, nullable=False)
+    created_date = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_chat_archives_user_id_conversation_end", "user_id", "conversation_end"),
+    )
@@ -12,8 +12,8 @@ class ComparisonResult(Base):
     __tablename__ = "comparison_results"
     
     comparison_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    participants = Column(JSONB, nullable=False)  # 参加者IDの配列
-    comparison_data = Column(JSONB, nullable=False)  # 比較結果データ
+    participants = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)  # 参加者IDの配列
+    comparison_data = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)  # 比較結果データ
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="SET NULL"))
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     
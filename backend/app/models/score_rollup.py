@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class ScoreRollup(Base):
+    """
+    テスト結果の期間別集計（ユーザー別・クラブ別）
+
+    テスト結果の登録・削除時に加算・減算で更新する。
+    平均値は sum_* / sample_count で求める。
+    """
+    __tablename__ = "score_rollups"
+
+    scope = Column(String(10), primary_key=True)          # "user" または "club"
+    scope_id = Column(String(100), primary_key=True)      # user_id または club_id
+    period = Column(String(10), primary_key=True)         # "week" または "month"
+    period_start = Column(Date, primary_key=True)         # 週の月曜日 / 月の1日
+    sample_count = Column(Integer, nullable=False, default=0)
+
+    # 自己肯定感
+    sum_self_determination = Column(Float, nullable=False, default=0)
+    sum_self_acceptance = Column(Float, nullable=False, default=0)
+    sum_self_worth = Column(Float, nullable=False, default=0)
+    sum_self_efficacy = Column(Float, nullable=False, default=0)
+    sum_self_esteem_total = Column(Float, nullable=False, default=0)
+
+    # アスリートマインド
+    sum_commitment = Column(Float, nullable=False, default=0)
+    sum_result = Column(Float, nullable=False, default=0)
+    sum_steadiness = Column(Float, nullable=False, default=0)
+    sum_devotion = Column(Float, nullable=False, default=0)
+    sum_self_control = Column(Float, nullable=False, default=0)
+    sum_assertion = Column(Float, nullable=False, default=0)
+    sum_sensitivity = Column(Float, nullable=False, default=0)
+    sum_intuition = Column(Float, nullable=False, default=0)
+    sum_introspection = Column(Float, nullable=False, default=0)
+    sum_comparison = Column(Float, nullable=False, default=0)
+
+    # スポーツマンシップ
+    sum_courage = Column(Float, nullable=False, default=0)
+    sum_resilience = Column(Float, nullable=False, default=0)
+    sum_cooperation = Column(Float, nullable=False, default=0)
+    sum_natural_acceptance = Column(Float, nullable=False, default=0)
+    sum_non_rationality = Column(Float, nullable=False, default=0)
+
+    updated_date = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,5 @@
 # app/models/test_result.py
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, String, Index, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -12,7 +12,8 @@ class TestResult(Base):
     __tablename__ = "test_results"
     
     result_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=False)
+    # テスト画面から未認証で提出された結果は NULL（匿名の結果）
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=True)
     target_selection = Column(String(20), nullable=False)
     test_date = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -43,6 +44,10 @@ class TestResult(Base):
     
     # 分析結果用フィールド
     self_esteem_total = Column(Float)
+    # カテゴリ合計（採点時に保存。総合スコア = 自己肯定感合計 + スポーツマンシップ合計）
+    sportsmanship_total = Column(Float)
+    athlete_mind_total = Column(Float)
+    total_score = Column(Float)
     self_esteem_analysis = Column(String(1000))
     self_esteem_improvements = Column(String(2000))
     athlete_type = Column(String(100))
@@ -51,8 +56,20 @@ class TestResult(Base):
     strengths = Column(String(500))
     weaknesses = Column(String(500))
     sportsmanship_balance = Column(String(1000))
+    # ルールベースの結果コメント（JSON）と生成したエンジンのバージョン
+    ai_comment = Column(Text)
+    ai_comment_version = Column(String(20))
     
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     
+    # 再送による重複登録防止用のキー（"{user_id}:{クライアント生成キー}"）
+    submission_key = Column(String(200), unique=True, index=True, nullable=True)
+    
     # Relationships
-    user = relationship("User", back_populates="test_results")
\ No newline at end of file
+    user = relationship("User", back_populates="test_results")
+    
+    __table_args__ = (
+        # 履歴の日付順・スコア順の並び替えとスコア範囲での絞り込み用
+        Index("ix_test_results_user_id_test_date", "user_id", "test_date"),
+        Index("ix_test_results_user_id_total_score", "user_id", "total_score"),
+    )
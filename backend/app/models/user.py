@@ -41,6 +41,7 @@ class User(Base):
     club = relationship("Club", back_populates="users")
     test_results = relationship("TestResult", back_populates="user", cascade="all, delete-orphan")
     chat_history = relationship("ChatHistory", back_populates="user", cascade="all, delete-orphan")
+    chat_archives = relationship("ChatArchive", cascade="all, delete-orphan", passive_deletes=True)
     created_comparisons = relationship("ComparisonResult", back_populates="creator")
     
     # Family relations
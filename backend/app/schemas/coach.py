@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, UUID4
 
@@ -26,6 +26,8 @@ class PlayerTestResult(BaseModel):
     athlete_type: Optional[str] = None
     strengths: Optional[List[str]] = None
     weaknesses: Optional[List[str]] = None
+    # パーセンタイル順位（"club" / "age_band" -> 項目 -> 0〜100）
+    percentile_ranks: Optional[Dict[str, Dict[str, float]]] = None
 
 
 class FamilyMemberInfo(BaseModel):
@@ -21,6 +21,36 @@ class ChatHistory(BaseModel):
     
     class Config:
         from_attributes = True
+        orm_mode = True
+
+
+class ChatHistoryPage(BaseModel):
+    messages: List[ChatHistory]
+    # より古いメッセージを取得する場合に before に指定する値（続きが無い場合は None）
+    next_cursor: Optional[UUID4] = None
+
+
+class ArchivedChatMessage(BaseModel):
+    chat_id: UUID4
+    message: str
+    message_type: str
+    timestamp: datetime
+
+
+class ChatArchiveSummary(BaseModel):
+    archive_id: UUID4
+    conversation_start: datetime
+    conversation_end: datetime
+    message_count: int
+    summary: str
+    
+    class Config:
+        from_attributes = True
+        orm_mode = True
+
+
+class ChatArchiveDetail(ChatArchiveSummary):
+    messages: List[ArchivedChatMessage]
 
 
 class ChatSession(BaseModel):
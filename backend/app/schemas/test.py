@@ -1,9 +1,12 @@
 #backend/app/schemas/test.py
 from typing import Optional, List, Dict, Union
-from datetime import datetime
+from datetime import datetime, date
 from pydantic import BaseModel, UUID4, validator, Field
 import uuid
 
+# 1回のテストで必要な回答数
+REQUIRED_ANSWER_COUNT = 99
+
 
 class TestAnswerCreate(BaseModel):
     question_id: Union[str, UUID4]  # 文字列またはUUID4を受け入れる
@@ -56,12 +59,54 @@ class TestSubmit(BaseModel):
         # デバッグ用：実際の回答数をログ出力
         print(f"回答数検証: 元の回答数={len(v)}, ユニーク回答数={len(unique_answer_list)}")
         
-        if len(unique_answer_list) != 99:
-            raise ValueError(f'Must submit exactly 99 unique answers, got {len(unique_answer_list)}')
+        if len(unique_answer_list) != REQUIRED_ANSWER_COUNT:
+            raise ValueError(f'Must submit exactly {REQUIRED_ANSWER_COUNT} unique answers, got {len(unique_answer_list)}')
         
         return unique_answer_list
 
 
+class TestInterfaceSubmit(TestSubmit):
+    """テスト画面からの提出（未認証の場合は user_id なしの匿名の結果として保存）"""
+    user_id: Optional[Union[str, UUID4]] = None
+
+
+class TestBatchItem(BaseModel):
+    # クライアント（タブレット）で生成する冪等キー。同じユーザー・同じキーの再送は登録されない
+    client_submission_id: str = Field(..., min_length=1, max_length=100)
+    user_id: Optional[Union[str, UUID4]] = None  # 省略時は認証ユーザー
+    test_date: datetime
+    answers: List[TestAnswerCreate]
+    
+    @validator('user_id', pre=True)
+    def validate_user_id(cls, v):
+        if isinstance(v, str):
+            try:
+                return uuid.UUID(v)
+            except ValueError:
+                raise ValueError(f'Invalid UUID format: {v}')
+        return v
+
+
+class TestBatchSubmit(BaseModel):
+    submissions: List[TestBatchItem]
+
+
+class TestBatchItemResult(BaseModel):
+    client_submission_id: str
+    status: str  # created / duplicate / invalid / forbidden
+    result_id: Optional[UUID4] = None
+    user_id: Optional[UUID4] = None
+    athlete_type: Optional[str] = None
+    message: Optional[str] = None
+
+
+class TestBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[TestBatchItemResult]
+
+
 class TestResultBase(BaseModel):
     target_selection: str  # ユーザーの対象選択
     
@@ -97,13 +142,27 @@ class TestResultCreate(TestResultBase):
 
 class TestResult(TestResultBase):
     result_id: UUID4
-    user_id: UUID4
+    user_id: Optional[UUID4] = None  # 匿名の結果は None
     test_date: datetime
     
+    # カテゴリ合計（総合スコア = 自己肯定感合計 + スポーツマンシップ合計）
+    sportsmanship_total: Optional[float] = None
+    athlete_mind_total: Optional[float] = None
+    total_score: Optional[float] = None
+    
     class Config:
         from_attributes = True
 
 
+class ResultComment(BaseModel):
+    summary: str
+    category_comments: List[str]
+    strengths: List[str]
+    growth_points: List[str]
+    next_step: str
+    version: str
+
+
 class TestResultWithAnalysis(TestResult):
     # 自己肯定感分析
     self_esteem_total: int
@@ -121,8 +180,34 @@ class TestResultWithAnalysis(TestResult):
     
     # スポーツマンシップ分析
     sportsmanship_balance: str
+    
+    # パーセンタイル順位（"club" / "age_band" -> 項目 -> 0〜100）
+    percentile_ranks: Optional[Dict[str, Dict[str, float]]] = None
+    
+    # ルールベースの結果コメント
+    ai_comment: Optional[ResultComment] = None
 
 
 class TestHistory(BaseModel):
     results: List[TestResult]
-    total_count: int
\ No newline at end of file
+    total_count: int
+
+class ScoreTrendPoint(BaseModel):
+    period_start: date
+    sample_count: int
+    # 項目名 -> 期間内の平均スコア
+    averages: Dict[str, float]
+    # 前の期間の平均との差（最初の期間は空）
+    deltas: Dict[str, float]
+    # 直近 window 期間の移動平均（件数で加重）
+    moving_averages: Dict[str, float]
+
+
+class ScoreTrend(BaseModel):
+    scope: str  # "user" または "club"
+    scope_id: str
+    period: str  # "week" または "month"
+    window: int
+    points: List[ScoreTrendPoint]
+    # 最初の期間から最後の期間までの変化率（%）。最初の平均が0の項目は含まない
+    improvement_rates: Dict[str, float]
@@ -58,4 +58,36 @@ class User(UserInDBBase):
 
 class UserWithRelations(User):
     children: Optional[List[User]] = []
-    parents: Optional[List[User]] = []
\ No newline at end of file
+    parents: Optional[List[User]] = []
+
+class BulkImportMember(BaseModel):
+    # 行ごとに検証結果を返すため、ここでは型のみ緩く定義する
+    email: str
+    name: str
+    password: str
+    role: str = "player"
+    age: Optional[int] = None
+    # この行のユーザー（父・母）の子供となる選手のメールアドレス
+    children: List[str] = []
+
+
+class BulkImportRequest(BaseModel):
+    members: List[BulkImportMember]
+    create_family_relations: bool = True
+
+
+class BulkImportRowResult(BaseModel):
+    row: int
+    email: str
+    status: str  # created / exists / duplicate / invalid / failed
+    user_id: Optional[UUID4] = None
+    message: Optional[str] = None
+    family_relations: int = 0
+
+
+class BulkImportResponse(BaseModel):
+    club_id: str
+    created: int
+    failed: int
+    family_relations_created: int
+    rows: List[BulkImportRowResult]
@@ -0,0 +1,224 @@
+# app/services/admin_service.py
+"""
+管理者アカウントの保存・取得
+
+admin_usersテーブルを正とし、プロセス内に読み取りキャッシュを持つ。
+他ワーカーでの追加・削除はキャッシュのTTL経過後に反映される。
+last_login はログインのたびに書き込まず、バックグラウンドスレッドで
+まとめて更新する。
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.admin import AdminUser
+from app.services.password_service import password_hasher
+
+logger = logging.getLogger(__name__)
+
+# 旧バージョンで使用していた管理者情報ファイル（初回起動時にテーブルへ取り込む）
+LEGACY_ADMIN_STORAGE_FILE = "admin_users.json"
+
+
+@dataclass(frozen=True)
+class AdminRecord:
+    email: str
+    password_hash: str
+    is_active: bool
+    created_date: Optional[datetime]
+    last_login: Optional[datetime]
+    created_by: Optional[str]
+
+    @classmethod
+    def from_model(cls, admin: AdminUser) -> "AdminRecord":
+        return cls(
+            email=admin.email,
+            password_hash=admin.password_hash,
+            is_active=admin.is_active is not False,
+            created_date=admin.created_date,
+            last_login=admin.last_login,
+            created_by=admin.created_by,
+        )
+
+
+class AdminStore:
+    def __init__(self, session_factory, cache_ttl_seconds: float, flush_interval_seconds: float):
+        self.session_factory = session_factory
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self._cache: Optional[Dict[str, AdminRecord]] = None
+        self._loaded_at = 0.0
+        self._load_lock = threading.Lock()
+        # email -> 未書き込みの最終ログイン日時
+        self._pending_logins: Dict[str, datetime] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # 読み取り（キャッシュ）
+    # ------------------------------------------------------------------
+
+    def _admins(self) -> Dict[str, AdminRecord]:
+        cache = self._cache
+        if cache is not None and time.monotonic() - self._loaded_at < self.cache_ttl_seconds:
+            return cache
+        with self._load_lock:
+            if self._cache is None or time.monotonic() - self._loaded_at >= self.cache_ttl_seconds:
+                self._reload()
+            return self._cache
+
+    def _reload(self):
+        with self.session_factory() as db:
+            admins = db.query(AdminUser).all()
+            if not admins:
+                admins = self._seed(db)
+            self._cache = {admin.email: AdminRecord.from_model(admin) for admin in admins}
+        self._loaded_at = time.monotonic()
+
+    def _seed(self, db) -> List[AdminUser]:
+        """テーブルが空の場合、旧JSONファイルまたは環境変数の管理者を登録する"""
+        admins = []
+        if os.path.exists(LEGACY_ADMIN_STORAGE_FILE):
+            try:
+                with open(LEGACY_ADMIN_STORAGE_FILE, "r") as f:
+                    for email, info in json.load(f).items():
+                        admins.append(AdminUser(
+                            email=email,
+                            password_hash=info["password_hash"],
+                            created_date=_parse_datetime(info.get("created_date")),
+                            last_login=_parse_datetime(info.get("last_login")),
+                        ))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to import {LEGACY_ADMIN_STORAGE_FILE}: {e}")
+                admins = []
+        if not admins:
+            admins = [AdminUser(email=settings.ADMIN_EMAIL, password_hash=password_hasher.hash(settings.ADMIN_PASSWORD))]
+        db.add_all(admins)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 複数のワーカーが空のテーブルに同時に登録した場合は、先に登録された内容を使う
+            db.rollback()
+            return db.query(AdminUser).all()
+        for admin in admins:
+            db.refresh(admin)
+        return admins
+
+    def invalidate(self):
+        self._cache = None
+
+    def get(self, email: str) -> Optional[AdminRecord]:
+        admin = self._admins().get(email)
+        if admin is None or not admin.is_active:
+            return None
+        return admin
+
+    def list_admins(self) -> List[AdminRecord]:
+        with self._pending_lock:
+            pending = dict(self._pending_logins)
+        return [
+            replace(admin, last_login=pending[email]) if email in pending else admin
+            for email, admin in self._admins().items()
+        ]
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+
+    def create(self, email: str, password_hash: str, created_by: Optional[str] = None) -> Optional[AdminRecord]:
+        """管理者を追加（同じメールアドレスが既に登録されている場合は None）"""
+        with self.session_factory() as db:
+            admin = AdminUser(email=email, password_hash=password_hash, created_by=created_by)
+            db.add(admin)
+            try:
+                db.commit()
+            except IntegrityError:
+                # 他のワーカーで同時に作成された場合（一覧はキャッシュのため事前チェックをすり抜ける）
+                db.rollback()
+                self.invalidate()
+                return None
+            db.refresh(admin)
+            record = AdminRecord.from_model(admin)
+        self.invalidate()
+        return record
+
+    def delete(self, email: str) -> bool:
+        with self.session_factory() as db:
+            deleted = db.query(AdminUser).filter(AdminUser.email == email).delete()
+            db.commit()
+        with self._pending_lock:
+            self._pending_logins.pop(email, None)
+        self.invalidate()
+        return bool(deleted)
+
+    def update_password_hash(self, email: str, password_hash: str):
+        with self.session_factory() as db:
+            db.query(AdminUser).filter(AdminUser.email == email).update({"password_hash": password_hash})
+            db.commit()
+        self.invalidate()
+
+    def record_login(self, email: str):
+        """最終ログイン日時を記録（DBへの書き込みはバックグラウンドでまとめて行う）"""
+        with self._pending_lock:
+            self._pending_logins[email] = datetime.now(timezone.utc)
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="admin-last-login", daemon=True)
+                self._flusher.start()
+
+    def flush_logins(self):
+        with self._pending_lock:
+            pending, self._pending_logins = self._pending_logins, {}
+        if not pending:
+            return
+        try:
+            with self.session_factory() as db:
+                db.connection().execute(
+                    update(AdminUser.__table__)
+                    .where(AdminUser.__table__.c.email == bindparam("admin_email"))
+                    .values(last_login=bindparam("login_at")),
+                    [{"admin_email": email, "login_at": at} for email, at in pending.items()],
+                )
+                db.commit()
+        except Exception as e:
+            logger.error(f"Failed to write admin last_login: {e}")
+            # 書き込みに失敗した分は次回に再送する（新しいログインを優先）
+            with self._pending_lock:
+                for email, at in pending.items():
+                    self._pending_logins.setdefault(email, at)
+
+    def _flush_loop(self):
+        while not self._flush_event.wait(self.flush_interval_seconds):
+            self.flush_logins()
+
+    def shutdown(self):
+        self._flush_event.set()
+        self.flush_logins()
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+admin_store = AdminStore(
+    SessionLocal,
+    cache_ttl_seconds=settings.ADMIN_CACHE_TTL_SECONDS,
+    flush_interval_seconds=settings.ADMIN_LAST_LOGIN_FLUSH_SECONDS,
+)
+atexit.register(admin_store.shutdown)
@@ -1,39 +1,184 @@
-import os
-from typing import Optional
-import openai
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import httpx
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.models.test_result import TestResult
 from app.models.chat_history import ChatHistory
 from app.config import settings
+from app.core.metrics import AI_COACHING_SECONDS
+from app.core.ttl_cache import TTLCache
+from app.services.response_cache import ProfileKey, contains_personal_data, profile_key, response_cache
+from app.services.comment_engine import FIELD_LABELS, comment_text, generate_comment, stored_comment
+from app.services.knowledge_index import PROFILE_QUERY_HINTS, profile_hints, search_knowledge
+
+logger = logging.getLogger(__name__)
+
+# コンテキストに保持する直近の会話数
+RECENT_MESSAGE_WINDOW = 10
+
+# モデルを呼び出せなかった場合の応答
+COACHING_UNAVAILABLE_MESSAGE = "申し訳ございません。現在AIコーチング機能が利用できません。しばらくしてから再度お試しください。"
+# モデルを使えない場合は、最新の結果のコメント（ルールベース）を添えて返す
+COACHING_OFFLINE_PREFIX = "現在AIコーチに接続できないため、最新のテスト結果からのアドバイスをお伝えします。"
+
+
+@dataclass
+class CoachingContext:
+    """
+    ユーザーごとのコーチング用コンテキスト（組み立て済みのシステムプロンプトと直近の会話）
+    最新の結果ID・最新の会話ID（チャットのカーソル）が変わったら作り直す
+    """
+    user_id: UUID
+    result_id: UUID
+    chat_cursor: Optional[UUID]
+    system_prompt: str
+    role: str
+    # 本人に固有の語（名前・クラブIDなど。これらを含む応答は共有しない）
+    private_terms: Tuple[str, ...]
+    # 応答キャッシュのキー（カテゴリ合計スコアの帯）
+    profile: ProfileKey
+    # 知識源の検索語（スコアの低い項目。プロンプトが変わるため応答キャッシュのキーにも含める）
+    hints: Tuple[str, ...] = ()
+    # モデルを使えない場合の応答
+    fallback_message: str = COACHING_UNAVAILABLE_MESSAGE
+    # 直近の会話 (message_type, message)。古い順
+    recent_messages: Deque[Tuple[str, str]] = field(default_factory=lambda: deque(maxlen=RECENT_MESSAGE_WINDOW))
+    
+    def cached_response(self, message: str) -> Optional[str]:
+        """同じ役割・スコア帯・検索語でのよくある質問への応答（会話の最初の質問だけ）"""
+        # 会話の続きは、それまでのやり取りを踏まえて答えるため共有の応答を使わない
+        if self.recent_messages:
+            return None
+        return response_cache.get(self.role, self.profile, self.hints, message)
+    
+    def cache_response(self, message: str, response: str):
+        # 会話の続きへの応答は、それまでのやり取りに依存するため保存しない
+        if self.recent_messages:
+            return
+        # プロンプトには本人の情報が含まれるため、それが応答に現れた場合は保存しない
+        if contains_personal_data(response, self.private_terms):
+            return
+        response_cache.set(self.role, self.profile, self.hints, message, response)
+    
+    def build_messages(self, message: str) -> List[Dict[str, str]]:
+        """
+        モデルに渡すメッセージ
+        知識源から関連する文章があれば参考資料として含め、直近の会話を続けて渡す
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+        passages = search_knowledge(message, self.hints)
+        if passages:
+            references = "\n\n".join(f"【{p.title}】\n{p.text}" for p in passages)
+            messages.append({
+                "role": "system",
+                "content": f"回答の参考にしてよい資料です（必要な場合のみ使用してください）:\n\n{references}"
+            })
+        messages.extend(
+            {"role": "assistant" if message_type == "assistant" else "user", "content": text}
+            for message_type, text in list(self.recent_messages)
+        )
+        messages.append({"role": "user", "content": message})
+        return messages
+
+
+class CoachingContextCache(TTLCache):
+    """
+    user_id -> CoachingContext のTTLキャッシュ
+    
+    テスト提出・会話削除時は invalidate() を呼ぶこと。
+    他プロセスでの提出・会話の追加は、get() に渡す最新のID（結果・チャットのカーソル）で検出する。
+    """
+    
+    def get(self, user_id: UUID, result_id: UUID, chat_cursor: Optional[UUID]) -> Optional[CoachingContext]:
+        """最新の結果・会話がキャッシュ作成時（以降の追加を含む）と同じ場合のみ返す"""
+        return super().get(
+            user_id, valid=lambda context: context.result_id == result_id and context.chat_cursor == chat_cursor
+        )
+    
+    def set(self, context: CoachingContext):
+        super().set(context.user_id, context)
+    
+    def append_messages(self, user_id: UUID, chat_cursor: UUID, *messages: Tuple[str, str]):
+        """保存した会話を直近の会話に追加（chat_cursor: 保存した最後のメッセージのID）"""
+        context = self.peek(user_id)
+        if context is not None:
+            context.recent_messages.extend(messages)
+            context.chat_cursor = chat_cursor
+    
+    def invalidate(self, user_id):
+        if not isinstance(user_id, UUID):
+            user_id = UUID(str(user_id))
+        super().invalidate(user_id)
 
 
 class AIService:
     def __init__(self, db: Session):
         self.db = db
-        openai.api_key = settings.OPENAI_API_KEY
     
-    def get_coaching_response(self, user: User, message: str) -> str:
+    def load_context(self, user: User) -> Optional[CoachingContext]:
+        """
+        コーチング用コンテキストをDBから作成（テスト未受検の場合は None）
+        DBの読み取りはここで完結させ、呼び出し側はモデル呼び出し前にセッションを解放できる
+        """
         # Get user's latest test result
         latest_result = self.db.query(TestResult).filter(
             TestResult.user_id == user.user_id
-        ).order_by(TestResult.test_date.desc()).first()
+        ).order_by(TestResult.test_date.desc(), TestResult.result_id.desc()).first()
+        if latest_result is None:
+            return None
         
         # Get recent chat history
         recent_messages = self.db.query(ChatHistory).filter(
             ChatHistory.user_id == user.user_id
-        ).order_by(ChatHistory.timestamp.desc()).limit(10).all()
+        ).order_by(ChatHistory.timestamp.desc(), ChatHistory.chat_id.desc()).limit(RECENT_MESSAGE_WINDOW).all()
         
         # Build context
         context = self._build_context(user, latest_result, recent_messages)
+        comment = stored_comment(latest_result) or generate_comment(
+            {field: getattr(latest_result, field) for field in FIELD_LABELS}, latest_result.athlete_type
+        )
+        role = user.role.value if hasattr(user.role, "value") else user.role
         
-        # Get response from AI
-        try:
-            response = self._get_openai_response(context, message, user.role)
-            return response
-        except Exception as e:
-            return f"申し訳ございません。現在AIコーチング機能が利用できません。しばらくしてから再度お試しください。"
+        coaching_context = CoachingContext(
+            user_id=user.user_id,
+            result_id=latest_result.result_id,
+            chat_cursor=recent_messages[0].chat_id if recent_messages else None,
+            system_prompt=self._build_system_prompt(context, role),
+            role=role,
+            private_terms=tuple(str(term) for term in (user.name, user.club_id) if term),
+            profile=profile_key(
+                latest_result.self_esteem_total,
+                latest_result.athlete_mind_total,
+                latest_result.sportsmanship_total,
+                width=settings.COACHING_RESPONSE_SCORE_BUCKET,
+            ),
+            hints=tuple(profile_hints({field: getattr(latest_result, field) for field in PROFILE_QUERY_HINTS})),
+            fallback_message=f"{COACHING_OFFLINE_PREFIX}\n\n{comment_text(comment)}",
+        )
+        coaching_context.recent_messages.extend(
+            (chat.message_type, chat.message) for chat in reversed(recent_messages)
+        )
+        return coaching_context
+    
+    def latest_ids(self, user_id: UUID) -> Tuple[Optional[UUID], Optional[UUID]]:
+        """最新の結果IDと最新の会話ID（キャッシュの確認用。1回のクエリ）"""
+        latest_result = select(TestResult.result_id).where(
+            TestResult.user_id == user_id
+        ).order_by(TestResult.test_date.desc(), TestResult.result_id.desc()).limit(1).scalar_subquery()
+        latest_chat = select(ChatHistory.chat_id).where(
+            ChatHistory.user_id == user_id
+        ).order_by(ChatHistory.timestamp.desc(), ChatHistory.chat_id.desc()).limit(1).scalar_subquery()
+        return tuple(self.db.execute(select(latest_result, latest_chat)).one())
     
     def _build_context(self, user: User, test_result: Optional[TestResult], recent_messages) -> str:
         context = f"""
@@ -75,7 +220,7 @@ class AIService:
         
         return context
     
-    def _get_openai_response(self, context: str, message: str, user_role: str) -> str:
+    def _build_system_prompt(self, context: str, user_role: str) -> str:
         # Role-specific system prompts
         role_prompts = {
             "player": "あなたは若いアスリートの成長をサポートする優しいコーチです。",
@@ -85,7 +230,7 @@ class AIService:
             "adult": "あなたは社会人アスリートのメンタルコーチです。"
         }
         
-        system_prompt = f"""
+        return f"""
         {role_prompts.get(user_role, "あなたはスポーツメンタルコーチです。")}
         
         以下の原則に従って回答してください：
@@ -98,19 +243,117 @@ class AIService:
         ユーザーのコンテキスト:
         {context}
         """
-        
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                max_tokens=800,
-                temperature=0.7
+
+
+DEFAULT_OPENAI_API_BASE = "https://api.openai.com/v1"
+
+
+class CompletionError(Exception):
+    pass
+
+
+class CompletionClient:
+    """
+    OpenAI互換の Chat Completions API を呼び出す非同期クライアント
+    
+    同時呼び出し数をセマフォで制限し、接続・応答待ちにタイムアウトを設ける。
+    """
+    
+    def __init__(self, base_url: str, api_key: Optional[str], model: str, timeout_seconds: float, max_concurrency: int):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        # APIキー未設定でOpenAIを指している場合は呼び出さない（ルールベースの応答のみ）
+        self.enabled = bool(api_key) or self.base_url != DEFAULT_OPENAI_API_BASE
+        # AsyncClientとSemaphoreはイベントループごとに作成する
+        self._clients: Dict[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]] = {}
+    
+    def _client(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(loop)
+        if entry is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=min(5.0, self.timeout_seconds)),
+                limits=httpx.Limits(max_connections=self.max_concurrency),
             )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            raise e
\ No newline at end of file
+            entry = self._clients[loop] = (client, asyncio.Semaphore(self.max_concurrency))
+        return entry
+    
+    def _payload(self, messages: List[Dict[str, str]], stream: bool) -> Dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 800,
+            "temperature": 0.7,
+            "stream": stream,
+        }
+    
+    async def _acquire(self, semaphore: asyncio.Semaphore):
+        # 混雑時は応答待ちの上限までしか待たない
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise CompletionError("Too many concurrent coaching requests")
+    
+    async def complete(self, messages: List[Dict[str, str]]) -> str:
+        client, semaphore = self._client()
+        await self._acquire(semaphore)
+        started = time.perf_counter()
+        try:
+            response = await client.post("/chat/completions", json=self._payload(messages, stream=False))
+            response.raise_for_status()
+            content = response.json()["choices"][0]["message"]["content"]
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            AI_COACHING_SECONDS.observe(time.perf_counter() - started, outcome="error")
+            logger.error(f"Completion API error: {e!r}")
+            raise CompletionError(str(e)) from e
+        finally:
+            semaphore.release()
+        AI_COACHING_SECONDS.observe(time.perf_counter() - started, outcome="success")
+        return content
+    
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """応答をトークン（差分テキスト）単位で返す"""
+        client, semaphore = self._client()
+        await self._acquire(semaphore)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with client.stream("POST", "/chat/completions", json=self._payload(messages, stream=True)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+            outcome = "success"
+        except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+            logger.error(f"Completion API stream error: {e!r}")
+            raise CompletionError(str(e)) from e
+        finally:
+            semaphore.release()
+            AI_COACHING_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+
+completion_client = CompletionClient(
+    base_url=settings.OPENAI_API_BASE,
+    api_key=settings.OPENAI_API_KEY,
+    model=settings.OPENAI_MODEL,
+    timeout_seconds=settings.AI_COACHING_TIMEOUT_SECONDS,
+    max_concurrency=settings.AI_COACHING_MAX_CONCURRENCY,
+)
+
+coaching_context_cache = CoachingContextCache(
+    ttl_seconds=settings.COACHING_CONTEXT_TTL_SECONDS,
+    max_entries=settings.COACHING_CONTEXT_MAX_ENTRIES,
+    name="coaching_context",
+)
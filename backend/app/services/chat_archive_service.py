@@ -0,0 +1,157 @@
+# app/services/chat_archive_service.py
+"""
+コーチングの会話履歴の保存期間管理
+
+chat_history には直近の会話だけを残し、保存期間を過ぎたメッセージは
+会話（一定時間以上あいたら別の会話とみなす）ごとに要約を付けて
+chat_archives へ圧縮して移す。履歴の取得はキーセットページングで行う。
+"""
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.chat_history import ChatArchive, ChatHistory
+
+# 要約に含めるユーザーの発言の数と長さ
+SUMMARY_MESSAGE_COUNT = 3
+SUMMARY_MESSAGE_LENGTH = 40
+DELETE_CHUNK_SIZE = 500
+
+
+def _excerpt(text: str, length: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[:length] + "…"
+
+
+def summarize_conversation(messages: List[ChatHistory]) -> str:
+    """会話の要約（日時・件数・ユーザーの主な発言）"""
+    start = messages[0].timestamp
+    user_messages = [m.message for m in messages if m.message_type == "user"]
+    summary = f"{start:%Y/%m/%d %H:%M} 〜 {len(messages)}件のやり取り"
+    if user_messages:
+        topics = " / ".join(_excerpt(m, SUMMARY_MESSAGE_LENGTH) for m in user_messages[:SUMMARY_MESSAGE_COUNT])
+        summary += f"。相談内容: {topics}"
+    return summary
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def split_conversations(messages: List[ChatHistory], gap: timedelta) -> List[List[ChatHistory]]:
+    """時刻順のメッセージを、gap 以上あいたところで会話に分ける"""
+    conversations: List[List[ChatHistory]] = []
+    for message in messages:
+        if conversations and _utc(message.timestamp) - _utc(conversations[-1][-1].timestamp) < gap:
+            conversations[-1].append(message)
+        else:
+            conversations.append([message])
+    return conversations
+
+
+class ChatArchiveService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def recent_messages(
+        self, user_id: UUID, limit: int, before: Optional[UUID] = None
+    ) -> Tuple[List[ChatHistory], Optional[UUID]]:
+        """
+        新しい順に limit 件（返す一覧は時系列順）と、続きを取得するためのカーソルを返す
+        before: 前回の応答の next_cursor（それより古いメッセージを返す）
+        """
+        query = self.db.query(ChatHistory).filter(ChatHistory.user_id == user_id)
+        if before is not None:
+            anchor = self.db.query(ChatHistory.timestamp, ChatHistory.chat_id).filter(
+                ChatHistory.user_id == user_id, ChatHistory.chat_id == before
+            ).first()
+            if anchor is None:
+                return [], None
+            query = query.filter(
+                tuple_(ChatHistory.timestamp, ChatHistory.chat_id) < tuple_(anchor.timestamp, anchor.chat_id)
+            )
+
+        rows = query.order_by(ChatHistory.timestamp.desc(), ChatHistory.chat_id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = rows[-1].chat_id if has_more else None
+        return rows[::-1], next_cursor
+
+    def archives(self, user_id: UUID, limit: int, before: Optional[datetime] = None) -> List[ChatArchive]:
+        """アーカイブ済みの会話（新しい順）。before より前に終わった会話のみ"""
+        query = self.db.query(ChatArchive).filter(ChatArchive.user_id == user_id)
+        if before is not None:
+            query = query.filter(ChatArchive.conversation_end < before)
+        return query.order_by(ChatArchive.conversation_end.desc()).limit(limit).all()
+
+    def archived_messages(self, archive: ChatArchive) -> List[Dict]:
+        return json.loads(zlib.decompress(archive.messages).decode("utf-8"))
+
+    def compact(self, cutoff: Optional[datetime] = None, gap: Optional[timedelta] = None) -> Tuple[int, int]:
+        """
+        cutoff より古いメッセージを会話ごとにアーカイブへ移す（ユーザーごとにコミット）
+        戻り値: (作成した会話の数, 移したメッセージの数)
+        """
+        if cutoff is None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=settings.CHAT_ARCHIVE_AFTER_DAYS)
+        if gap is None:
+            gap = timedelta(minutes=settings.CHAT_CONVERSATION_GAP_MINUTES)
+
+        user_ids = [
+            user_id for (user_id,) in
+            self.db.query(ChatHistory.user_id).filter(ChatHistory.timestamp < cutoff).distinct().all()
+        ]
+        conversations = messages = 0
+        for user_id in user_ids:
+            archived, moved = self._compact_user(user_id, cutoff, gap)
+            conversations += archived
+            messages += moved
+        return conversations, messages
+
+    def _compact_user(self, user_id: UUID, cutoff: datetime, gap: timedelta) -> Tuple[int, int]:
+        rows = self.db.query(ChatHistory).filter(
+            ChatHistory.user_id == user_id, ChatHistory.timestamp < cutoff
+        ).order_by(ChatHistory.timestamp, ChatHistory.chat_id).all()
+        if not rows:
+            return 0, 0
+
+        conversations = split_conversations(rows, gap)
+        for conversation in conversations:
+            payload = [
+                {
+                    "chat_id": str(m.chat_id),
+                    "message_type": m.message_type,
+                    "message": m.message,
+                    "timestamp": _utc(m.timestamp).isoformat(),
+                }
+                for m in conversation
+            ]
+            self.db.add(ChatArchive(
+                user_id=user_id,
+                conversation_start=conversation[0].timestamp,
+                conversation_end=conversation[-1].timestamp,
+                message_count=len(conversation),
+                summary=summarize_conversation(conversation),
+                messages=zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8")),
+            ))
+
+        chat_ids = [m.chat_id for m in rows]
+        for start in range(0, len(chat_ids), DELETE_CHUNK_SIZE):
+            self.db.query(ChatHistory).filter(
+                ChatHistory.chat_id.in_(chat_ids[start:start + DELETE_CHUNK_SIZE])
+            ).delete(synchronize_session=False)
+        self.db.commit()
+        self.db.expunge_all()
+        return len(conversations), len(rows)
+
+    def clear(self, user_id: UUID):
+        """会話履歴とアーカイブをすべて削除"""
+        self.db.query(ChatHistory).filter(ChatHistory.user_id == user_id).delete(synchronize_session=False)
+        self.db.query(ChatArchive).filter(ChatArchive.user_id == user_id).delete(synchronize_session=False)
+        self.db.commit()
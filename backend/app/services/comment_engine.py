@@ -0,0 +1,182 @@
+# app/services/comment_engine.py
+"""
+ルールとテンプレートによる結果コメントの生成
+
+19項目のスコアとアスリートタイプだけから、決まったルールでコメントを組み立てる
+（DB・外部APIは使わない）。結果ページの標準のコメントと、AIコーチに接続できない
+場合の応答に使う。ルールやテンプレートを変えたら COMMENT_ENGINE_VERSION を上げ、
+scripts/pregenerate_comments.py で保存済みのコメントを作り直すこと。
+"""
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+COMMENT_ENGINE_VERSION = "1"
+
+CATEGORIES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("self_esteem", "自己肯定感", ("self_determination", "self_acceptance", "self_worth", "self_efficacy")),
+    ("athlete_mind", "アスリートマインド", (
+        "commitment", "result", "steadiness", "devotion", "self_control",
+        "assertion", "sensitivity", "intuition", "introspection", "comparison",
+    )),
+    ("sportsmanship", "スポーツマンシップ", (
+        "courage", "resilience", "cooperation", "natural_acceptance", "non_rationality",
+    )),
+)
+
+FIELD_LABELS = {
+    "self_determination": "自己決定感",
+    "self_acceptance": "自己受容感",
+    "self_worth": "自己有用感",
+    "self_efficacy": "自己効力感",
+    "commitment": "こだわり",
+    "result": "結果",
+    "steadiness": "堅実",
+    "devotion": "献身",
+    "self_control": "克己",
+    "assertion": "主張",
+    "sensitivity": "繊細",
+    "intuition": "直感",
+    "introspection": "内省",
+    "comparison": "比較",
+    "courage": "勇気",
+    "resilience": "打たれ強さ",
+    "cooperation": "協調性",
+    "natural_acceptance": "自然体",
+    "non_rationality": "非合理性",
+}
+
+# 高い項目をどう活かせるか
+STRENGTH_TEMPLATES = {
+    "self_determination": "自分で決めて動ける力があります。目標や練習メニューを自分で選ぶ場面で力を発揮できそうです。",
+    "self_acceptance": "ありのままの自分を受け止める力があります。うまくいかない日も落ち着いて次に向かえるでしょう。",
+    "self_worth": "チームの中での自分の役割を実感できています。周りへの貢献がさらに自信につながりそうです。",
+    "self_efficacy": "「自分ならできる」という感覚が育っています。新しい技術への挑戦でも前向きに取り組めそうです。",
+    "commitment": "細部までこだわって丁寧に取り組めます。基礎練習の質の高さが大きな武器です。",
+    "result": "結果にこだわる強い気持ちがあります。勝負所で集中力を高められるタイプです。",
+    "steadiness": "コツコツと積み重ねる堅実さがあります。安定したプレーでチームを支えられます。",
+    "devotion": "チームのために動ける献身性があります。仲間からの信頼を集めやすい強みです。",
+    "self_control": "自分を律する力があります。苦しい場面でもやるべきことをやり切れるでしょう。",
+    "assertion": "自分の考えを言葉にできます。プレー中の声かけでチームを動かせる力です。",
+    "sensitivity": "周りの変化によく気づけます。相手や仲間の様子を読み取る力はプレーの判断にも活きます。",
+    "intuition": "直感的にひらめく力があります。とっさの場面での思い切ったプレーにつながります。",
+    "introspection": "自分を振り返る力があります。練習や試合の後の気づきが成長を後押しします。",
+    "comparison": "周りを意識して自分を高められます。良いライバルの存在が大きな刺激になりそうです。",
+    "courage": "失敗を恐れず挑戦する勇気があります。難しい場面でも一歩を踏み出せる強みです。",
+    "resilience": "うまくいかないことがあっても立ち直る力があります。長いシーズンを戦い抜く土台です。",
+    "cooperation": "相手の立場に立って考えられます。チームワークを生み出す大切な力です。",
+    "natural_acceptance": "自然体でプレーに臨めます。大事な場面でも普段どおりの力を出しやすいでしょう。",
+    "non_rationality": "理屈を超えて「好き」「楽しい」を原動力にできます。その気持ちが続ける力になります。",
+}
+
+# 低い項目を伸ばすための提案
+GROWTH_TEMPLATES = {
+    "self_determination": "日々の小さな選択（練習で意識するポイントなど）を自分で決めてみましょう。",
+    "self_acceptance": "うまくいかなかった日も「今日できたこと」を1つ書き出してみましょう。",
+    "self_worth": "チームの中で自分が役に立てた場面を振り返り、言葉にしてみましょう。",
+    "self_efficacy": "少し頑張れば届く小さな目標を立て、達成体験を積み重ねていきましょう。",
+    "commitment": "1つの技術を選び、動きの細部を意識しながら丁寧に繰り返してみましょう。",
+    "result": "試合ごとに具体的な目標を1つ決め、終わった後に振り返ってみましょう。",
+    "steadiness": "毎日続けられる短い練習メニューを決め、記録をつけてみましょう。",
+    "devotion": "仲間のために自分ができることを1つ見つけて実行してみましょう。",
+    "self_control": "苦しい場面で意識する合言葉を決めておくと、気持ちを立て直しやすくなります。",
+    "assertion": "練習中に一言、自分の考えや気づきを仲間に伝えることから始めてみましょう。",
+    "sensitivity": "試合前に深呼吸で心と体を落ち着ける習慣をつくると、周りの変化にも気づきやすくなります。",
+    "intuition": "成功したプレーをイメージトレーニングで思い出し、体の感覚を確かめてみましょう。",
+    "introspection": "練習後に「良かったこと・次に試すこと」を短く振り返る時間をつくりましょう。",
+    "comparison": "目標にしたい選手を見つけ、良いところを1つ真似してみましょう。",
+    "courage": "失敗してもよい練習の場で、普段はしないプレーに挑戦してみましょう。",
+    "resilience": "ミスの後に気持ちを切り替える自分なりの動作（深呼吸など）を決めておきましょう。",
+    "cooperation": "仲間の話を最後まで聞き、気持ちを受け止めることを意識してみましょう。",
+    "natural_acceptance": "試合前のルーティンを決めておくと、普段どおりの自分で臨みやすくなります。",
+    "non_rationality": "なぜこのスポーツが好きなのかを思い出し、楽しいと感じる練習を取り入れてみましょう。",
+}
+
+TYPE_COMMENTS = {
+    "ストライカー": "ストライカータイプのあなたは、明確なゴールに向かって素早く行動できるのが持ち味です。",
+    "アタッカー": "アタッカータイプのあなたは、自ら動いて状況を切り開く力が持ち味です。",
+    "ゲームメイカー": "ゲームメイカータイプのあなたは、全体を見渡して判断する力が持ち味です。",
+    "アンカー": "アンカータイプのあなたは、困難な場面でも冷静にチームを支える安定感が持ち味です。",
+    "ディフェンダー": "ディフェンダータイプのあなたは、堅実さと協調性でチームの基盤を守れるのが持ち味です。",
+}
+
+# (平均点の下限, 表現)
+LEVELS = (
+    (40.0, "とても高い水準にあります"),
+    (35.0, "良い水準にあります"),
+    (30.0, "標準的な水準にあります"),
+    (0.0, "これから伸ばしていける段階にあります"),
+)
+
+STRENGTH_COUNT = 2
+GROWTH_COUNT = 2
+
+
+def _level(average: float) -> str:
+    for threshold, text in LEVELS:
+        if average >= threshold:
+            return text
+    return LEVELS[-1][1]
+
+
+def _ranked(scores: Mapping[str, float]) -> List[Tuple[float, int, str]]:
+    """(スコア, 項目の順番, 項目) の昇順（同点は項目の順番で決める）"""
+    return sorted((scores[field], i, field) for i, field in enumerate(FIELD_LABELS))
+
+
+def generate_comment(scores: Mapping[str, Optional[float]], athlete_type: Optional[str]) -> Dict[str, Any]:
+    """
+    19項目のスコア（0〜50）とアスリートタイプからコメントを作成
+
+    戻り値: summary（全体）/ category_comments / strengths / growth_points / next_step / version
+    """
+    values = {field: float(scores.get(field) or 0) for field in FIELD_LABELS}
+
+    category_comments = [
+        f"{label}は{_level(sum(values[field] for field in fields) / len(fields))}。"
+        for _, label, fields in CATEGORIES
+    ]
+
+    ranked = _ranked(values)
+    top = [field for _, _, field in reversed(ranked[-STRENGTH_COUNT:])]
+    bottom = [field for _, _, field in ranked[:GROWTH_COUNT]]
+
+    overall = sum(values.values()) / len(values)
+    summary = _level(overall)
+    type_comment = TYPE_COMMENTS.get(athlete_type or "", "")
+    summary_text = (
+        f"{type_comment}全体としては{summary}。"
+        f"特に{FIELD_LABELS[top[0]]}（{values[top[0]]:.1f}点）が光っています。"
+    )
+
+    strengths = [f"{FIELD_LABELS[field]}: {STRENGTH_TEMPLATES[field]}" for field in top]
+    growth_points = [f"{FIELD_LABELS[field]}: {GROWTH_TEMPLATES[field]}" for field in bottom]
+    next_step = (
+        f"次のテストまでは{FIELD_LABELS[bottom[0]]}を意識して過ごし、"
+        f"変化を振り返ってみましょう。"
+    )
+
+    return {
+        "summary": summary_text,
+        "category_comments": category_comments,
+        "strengths": strengths,
+        "growth_points": growth_points,
+        "next_step": next_step,
+        "version": COMMENT_ENGINE_VERSION,
+    }
+
+
+def comment_text(comment: Mapping[str, Any]) -> str:
+    """コメントを1つの文章にする（チャットの応答用）"""
+    lines = [comment["summary"], "".join(comment["category_comments"]), "", "【強み】"]
+    lines.extend(f"・{item}" for item in comment["strengths"])
+    lines.append("【伸ばしていけるところ】")
+    lines.extend(f"・{item}" for item in comment["growth_points"])
+    lines.extend(["", comment["next_step"]])
+    return "\n".join(lines)
+
+
+def stored_comment(test_result) -> Optional[Dict[str, Any]]:
+    """保存済みのコメント（現在のバージョンで生成されたもののみ）"""
+    if not getattr(test_result, "ai_comment", None) or test_result.ai_comment_version != COMMENT_ENGINE_VERSION:
+        return None
+    return json.loads(test_result.ai_comment)
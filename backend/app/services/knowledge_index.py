@@ -0,0 +1,151 @@
+# app/services/knowledge_index.py
+"""
+知識源（docs/knowledge_sources）の検索インデックス
+
+scripts/build_knowledge_index.py で事前に作成したTF-IDF行列（CSC形式の .npy）を
+起動時にメモリマップで読み込み、メッセージとスコアプロフィールに近い文章を返す。
+検索はnumpyだけで行い、外部サービスは呼ばない。インデックスが無い場合は何も返さない。
+"""
+import json
+import logging
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.config import settings
+from app.services.response_cache import normalize_message
+
+try:
+    import numpy as np
+except ImportError:  # numpy未インストール時は検索を無効にする
+    np = None
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+ARRAY_FILES = ("indptr", "indices", "data", "idf")
+
+# 低い項目ごとの検索語（知識源の用語に合わせる）
+PROFILE_QUERY_HINTS = {
+    "self_determination": "自己決定 目標設定 内発的動機づけ",
+    "self_acceptance": "自己受容 感情の承認 無条件の受容",
+    "self_worth": "自己有用感 承認 信頼関係",
+    "self_efficacy": "自己効力感 達成感 成功体験 自信",
+    "commitment": "こだわり 技術向上 練習",
+    "result": "結果 目標 進捗の可視化",
+    "steadiness": "堅実 継続 定期的な練習",
+    "devotion": "献身 チーム 協力",
+    "self_control": "克己 集中 感情のコントロール",
+    "assertion": "主張 コミュニケーション 自己開示",
+    "sensitivity": "繊細 緊張緩和 リラクゼーション",
+    "intuition": "直感 イメージトレーニング",
+    "introspection": "内省 気づき 自己評価",
+    "comparison": "比較 競争 外発的動機づけ",
+    "courage": "勇気 挑戦 自信の向上",
+    "resilience": "打たれ強さ ストレス軽減 リラクゼーション",
+    "cooperation": "協調性 傾聴 共感",
+    "natural_acceptance": "自然体 マインドフルネス 現在の瞬間への集中",
+    "non_rationality": "非合理性 楽しさ 内発的動機づけ",
+}
+
+
+def passage_terms(text: str) -> List[str]:
+    """正規化した文字列の文字2-gram・3-gram（インデックス作成時と検索時で共通）"""
+    normalized = normalize_message(text)
+    terms = []
+    for n in (2, 3):
+        terms.extend(normalized[i:i + n] for i in range(len(normalized) - n + 1))
+    return terms
+
+
+def profile_hints(scores: Dict[str, Optional[float]], count: int = 3) -> List[str]:
+    """スコアの低い項目の検索語"""
+    known = [(value, field) for field, value in scores.items() if value is not None and field in PROFILE_QUERY_HINTS]
+    return [PROFILE_QUERY_HINTS[field] for _, field in sorted(known)[:count]]
+
+
+@dataclass(frozen=True)
+class Passage:
+    source: str
+    title: str
+    text: str
+    score: float
+
+
+class KnowledgeIndex:
+    def __init__(self, vocabulary: Dict[str, int], passages: List[dict], arrays: Dict[str, "np.ndarray"]):
+        self.vocabulary = vocabulary
+        self.passages = passages
+        # 語 -> 文章 の疎行列（CSC形式。各行はL2正規化済みのTF-IDF）
+        self.indptr = arrays["indptr"]
+        self.indices = arrays["indices"]
+        self.data = arrays["data"]
+        self.idf = arrays["idf"]
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["KnowledgeIndex"]:
+        """インデックスを読み込む（行列はメモリマップ）。無い場合は None"""
+        if np is None or not os.path.exists(os.path.join(directory, META_FILE)):
+            return None
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in ARRAY_FILES
+        }
+        return cls(meta["vocabulary"], meta["passages"], arrays)
+
+    def _query_vector(self, weighted_texts: Iterable[tuple]) -> Dict[int, float]:
+        counts: Counter = Counter()
+        for text, weight in weighted_texts:
+            for term in passage_terms(text):
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    counts[column] += weight
+        vector = {column: count * float(self.idf[column]) for column, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {column: value / norm for column, value in vector.items()} if norm else {}
+
+    def search(
+        self,
+        message: str,
+        hints: Sequence[str] = (),
+        top_k: int = 3,
+        min_score: float = 0.0,
+    ) -> List[Passage]:
+        """メッセージ（とスコアの低い項目の検索語）に近い文章を上位 top_k 件返す"""
+        vector = self._query_vector([(message, 1.0)] + [(hint, settings.KNOWLEDGE_HINT_WEIGHT) for hint in hints])
+        if not vector or top_k <= 0:
+            return []
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for column, weight in vector.items():
+            start, end = self.indptr[column], self.indptr[column + 1]
+            scores[self.indices[start:end]] += weight * self.data[start:end]
+
+        top_k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        passages = []
+        for row in sorted(candidates, key=lambda i: -scores[i]):
+            if scores[row] <= min_score:
+                break
+            passage = self.passages[row]
+            passages.append(Passage(passage["source"], passage["title"], passage["text"], round(float(scores[row]), 4)))
+        return passages
+
+
+knowledge_index = KnowledgeIndex.load(settings.KNOWLEDGE_INDEX_DIR)
+if knowledge_index is None:
+    logger.warning(
+        "Knowledge index not found at %s; run scripts/build_knowledge_index.py to enable grounded coaching",
+        settings.KNOWLEDGE_INDEX_DIR,
+    )
+
+
+def search_knowledge(message: str, hints: Sequence[str] = ()) -> List[Passage]:
+    if knowledge_index is None:
+        return []
+    return knowledge_index.search(
+        message, hints, top_k=settings.KNOWLEDGE_TOP_K, min_score=settings.KNOWLEDGE_MIN_SCORE
+    )
@@ -0,0 +1,68 @@
+# app/services/password_service.py
+"""
+パスワードハッシュ化サービス
+
+bcryptの計算は専用の有限スレッドプールで実行し、同時実行数を制限する
+（bcryptはGILを解放するため、スレッドでもコア数分の並列性が得られる）。
+コストファクターは設定値で変更でき、異なるコストのハッシュは
+ログイン成功時に新しいコストで再ハッシュされる。
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import settings
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int, max_workers: int):
+        self.rounds = rounds
+        self.max_workers = max(1, max_workers)
+        # min/maxを同じ値にすることで、コスト変更時に needs_update が True になる
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        self._semaphores = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Semaphoreはイベントループごとに作成する
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_workers)
+        return semaphore
+
+    # 同期API（同期エンドポイント・スクリプト用）。計算はプール上で行い完了を待つ
+    def hash(self, password: str) -> str:
+        return self._executor.submit(self.context.hash, password).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self.verify_and_update(password, hashed_password)[0]
+
+    def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(検証結果, 再ハッシュ後の値またはNone) を返す"""
+        return self._executor.submit(self.context.verify_and_update, password, hashed_password).result()
+
+    # 非同期API（イベントループをブロックしない）
+    async def ahash(self, password: str) -> str:
+        async with self._semaphore():
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self.context.hash, password)
+
+    async def averify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        async with self._semaphore():
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.context.verify_and_update, password, hashed_password
+            )
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+)
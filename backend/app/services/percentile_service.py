@@ -0,0 +1,211 @@
+# app/services/percentile_service.py
+"""
+クラブ内・同じ役割と年齢帯の中でのパーセンタイル順位
+
+母集団は各ユーザーの最新のテスト結果。グループ（クラブ、役割×年齢帯）ごとに
+項目別のソート済み配列をプロセス内に持ち、順位は二分探索（O(log n)）で求める。
+グループは初回参照時にDBから読み込み、テスト提出時は読み込み済みのグループだけを
+更新する。他プロセスでの提出はTTL経過後の再読み込みで反映される。
+"""
+import hashlib
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import registry
+from app.models.test_result import TestResult
+from app.models.user import User
+
+# 順位を求める19項目
+QUALITY_FIELDS = (
+    "self_determination", "self_acceptance", "self_worth", "self_efficacy",
+    "commitment", "result", "steadiness", "devotion", "self_control",
+    "assertion", "sensitivity", "intuition", "introspection", "comparison",
+    "courage", "resilience", "cooperation", "natural_acceptance", "non_rationality",
+)
+
+GroupKey = Tuple[str, str]
+
+
+def _role_value(role) -> str:
+    return role.value if hasattr(role, "value") else role
+
+
+def age_band(age: Optional[int], width: int) -> Optional[Tuple[int, int]]:
+    """年齢帯（下限, 上限）。年齢未登録の場合は None"""
+    if age is None or width <= 0:
+        return None
+    lower = age // width * width
+    return lower, lower + width - 1
+
+
+def group_keys(club_id: Optional[str], role, age: Optional[int]) -> Dict[str, GroupKey]:
+    """順位の種類 -> グループキー"""
+    keys = {}
+    if club_id:
+        keys["club"] = ("club", club_id)
+    band = age_band(age, settings.PERCENTILE_AGE_BAND_YEARS)
+    band_label = f"{band[0]}-{band[1]}" if band else "unknown"
+    keys["age_band"] = ("age_band", f"{_role_value(role)}:{band_label}")
+    return keys
+
+
+def _sort_key(test_date: Optional[datetime]) -> datetime:
+    if test_date is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    if test_date.tzinfo is None:
+        return test_date.replace(tzinfo=timezone.utc)
+    return test_date
+
+
+class _Group:
+    __slots__ = ("loaded_at", "values", "members", "_digest")
+
+    def __init__(self):
+        self.loaded_at = time.monotonic()
+        self._digest: Optional[str] = None
+        # 項目 -> ソート済みのスコア
+        self.values: Dict[str, List[float]] = {field: [] for field in QUALITY_FIELDS}
+        # user_id -> (テスト日時, 項目順のスコア)
+        self.members: Dict = {}
+
+    def put(self, user_id, test_date: Optional[datetime], scores: Tuple[float, ...]):
+        """ユーザーの最新結果を登録（既存より古い結果は無視）"""
+        current = self.members.get(user_id)
+        if current is not None:
+            if _sort_key(test_date) < _sort_key(current[0]):
+                return
+            for field, value in zip(QUALITY_FIELDS, current[1]):
+                values = self.values[field]
+                del values[bisect_left(values, value)]
+        for field, value in zip(QUALITY_FIELDS, scores):
+            insort(self.values[field], value)
+        self.members[user_id] = (test_date, scores)
+        self._digest = None
+
+    @property
+    def digest(self) -> str:
+        """メンバーと各自の最新結果から決まる値（プロセス間で同じ内容なら同じ値）"""
+        if self._digest is None:
+            members = sorted(
+                (str(user_id), str(_sort_key(test_date)), scores)
+                for user_id, (test_date, scores) in self.members.items()
+            )
+            self._digest = hashlib.sha1(repr(members).encode("utf-8")).hexdigest()[:16]
+        return self._digest
+
+    def rank(self, field: str, value: float) -> float:
+        """value未満の件数 + 同点の半数 を母数で割った百分率"""
+        values = self.values[field]
+        if not values:
+            return 0.0
+        below = bisect_left(values, value)
+        equal = bisect_right(values, value) - below
+        return round((below + equal / 2) / len(values) * 100, 1)
+
+
+def _scores(result) -> Tuple[float, ...]:
+    return tuple(float(getattr(result, field) or 0) for field in QUALITY_FIELDS)
+
+
+class PercentileIndex:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._groups: Dict[GroupKey, _Group] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, group: Optional[_Group]) -> bool:
+        return group is not None and time.monotonic() - group.loaded_at < self.ttl_seconds
+
+    def _group(self, db: Session, key: GroupKey) -> _Group:
+        group = self._groups.get(key)
+        if self._fresh(group):
+            self.hits += 1
+            return group
+        self.misses += 1
+        group = self._load(db, key)
+        with self._lock:
+            self._groups[key] = group
+        return group
+
+    def _load(self, db: Session, key: GroupKey) -> _Group:
+        """グループに属するユーザーの最新結果を読み込む"""
+        kind, value = key
+        users = db.query(User.user_id)
+        if kind == "club":
+            users = users.filter(User.club_id == value)
+        else:
+            role, band_label = value.split(":", 1)
+            users = users.filter(User.role == role)
+            if band_label == "unknown":
+                users = users.filter(User.age.is_(None))
+            else:
+                lower, upper = (int(v) for v in band_label.split("-"))
+                users = users.filter(User.age >= lower, User.age <= upper)
+        user_ids = users.subquery()
+
+        latest = db.query(
+            TestResult.user_id, func.max(TestResult.test_date).label("latest_date")
+        ).filter(TestResult.user_id.in_(user_ids.select())).group_by(TestResult.user_id).subquery()
+        rows = db.query(
+            TestResult.user_id, TestResult.test_date, *[getattr(TestResult, f) for f in QUALITY_FIELDS]
+        ).join(
+            latest,
+            (TestResult.user_id == latest.c.user_id) & (TestResult.test_date == latest.c.latest_date)
+        ).all()
+
+        group = _Group()
+        for row in rows:
+            group.put(row.user_id, row.test_date, _scores(row))
+        return group
+
+    def record(self, user_id, club_id: Optional[str], role, age: Optional[int], result):
+        """提出された結果を読み込み済みのグループに反映"""
+        scores = _scores(result)
+        with self._lock:
+            for key in group_keys(club_id, role, age).values():
+                group = self._groups.get(key)
+                if group is not None:
+                    group.put(user_id, result.test_date, scores)
+
+    def ranks(self, db: Session, club_id: Optional[str], role, age: Optional[int], result) -> Dict[str, Dict[str, float]]:
+        """順位の種類（club / age_band） -> 項目 -> パーセンタイル順位"""
+        ranks = {}
+        for kind, key in group_keys(club_id, role, age).items():
+            group = self._group(db, key)
+            with self._lock:
+                if not group.members:
+                    continue
+                ranks[kind] = {field: group.rank(field, getattr(result, field) or 0) for field in QUALITY_FIELDS}
+        return ranks
+
+    def fingerprint(self, db: Session, club_id: Optional[str], role, age: Optional[int]) -> str:
+        """順位の母集団が変わると変わる値（ETag用）"""
+        parts = []
+        for key in group_keys(club_id, role, age).values():
+            group = self._group(db, key)
+            with self._lock:
+                parts.append(group.digest)
+        return ":".join(parts)
+
+    def ranks_for_user(self, db: Session, user_id, result) -> Dict[str, Dict[str, float]]:
+        user = db.query(User.club_id, User.role, User.age).filter(User.user_id == user_id).first()
+        if user is None:
+            return {}
+        return self.ranks(db, user.club_id, user.role, user.age, result)
+
+    def invalidate(self):
+        with self._lock:
+            self._groups.clear()
+
+
+percentile_index = PercentileIndex(ttl_seconds=settings.PERCENTILE_INDEX_TTL_SECONDS)
+registry.register_cache("percentile_index", lambda: (percentile_index.hits, percentile_index.misses))
@@ -0,0 +1,120 @@
+# app/services/question_catalog.py
+"""
+有効な質問の共有カタログ
+
+質問は管理画面からしか変更されないため、プロセス内で一度だけ読み込み、
+採点や質問一覧の取得で使い回す。質問の作成・更新・削除時は invalidate() で
+再読み込みする（他プロセスにはTTL経過後に反映される）。
+version は内容から計算するため、プロセス間で同じ内容なら同じ値になる。
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.metrics import registry
+from app.models.question import Question
+
+
+@dataclass(frozen=True)
+class CatalogQuestion:
+    question_id: str
+    question_number: int
+    question_text: str
+    category: str
+    subcategory: str
+    target: str
+    is_reverse_score: bool
+    created_date: Optional[datetime]
+    updated_date: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, question: Question) -> "CatalogQuestion":
+        target = question.target.value if hasattr(question.target, "value") else question.target
+        return cls(
+            question_id=str(question.question_id),
+            question_number=question.question_number,
+            question_text=question.question_text,
+            category=question.category,
+            subcategory=question.subcategory,
+            target=target,
+            is_reverse_score=bool(question.is_reverse_score),
+            created_date=question.created_date,
+            updated_date=question.updated_date,
+        )
+
+
+class QuestionCatalog:
+    """ある時点の有効な質問のスナップショット（読み取り専用）"""
+
+    def __init__(self, questions: Tuple[CatalogQuestion, ...]):
+        self.questions = tuple(sorted(questions, key=lambda q: q.question_number))
+        digest = hashlib.sha1()
+        for q in self.questions:
+            digest.update(repr((q.question_id, q.question_number, q.question_text, q.category, q.subcategory,
+                                q.target, q.is_reverse_score, q.updated_date)).encode("utf-8"))
+        self.version = digest.hexdigest()[:16]
+        self._by_target: Dict[str, Tuple[CatalogQuestion, ...]] = {}
+        self._maps: Dict[str, Dict[str, CatalogQuestion]] = {}
+
+    def for_target(self, target: str) -> Tuple[CatalogQuestion, ...]:
+        """対象者向けの質問（sportsmanshipは対象を問わず全件、それ以外は all または対象者向け）"""
+        questions = self._by_target.get(target)
+        if questions is None:
+            questions = tuple(
+                q for q in self.questions
+                if q.category == "sportsmanship" or q.target in ("all", target)
+            )
+            self._by_target[target] = questions
+        return questions
+
+    def scoring_map(self, target: str) -> Dict[str, CatalogQuestion]:
+        """質問ID（文字列）から質問へのマッピング"""
+        mapping = self._maps.get(target)
+        if mapping is None:
+            mapping = {q.question_id: q for q in self.for_target(target)}
+            self._maps[target] = mapping
+        return mapping
+
+
+class QuestionCatalogCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._catalog: Optional[QuestionCatalog] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, catalog: Optional[QuestionCatalog]) -> bool:
+        return catalog is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def get(self, db: Session) -> QuestionCatalog:
+        catalog = self._catalog
+        if self._fresh(catalog):
+            self.hits += 1
+            return catalog
+        with self._lock:
+            catalog = self._catalog
+            if self._fresh(catalog):
+                self.hits += 1
+                return catalog
+            self.misses += 1
+            questions = db.query(Question).filter(Question.is_active == True).all()
+            catalog = QuestionCatalog(tuple(CatalogQuestion.from_model(q) for q in questions))
+            self._catalog = catalog
+            self._loaded_at = time.monotonic()
+            return catalog
+
+    def invalidate(self):
+        """質問の作成・更新・削除後に呼び出す"""
+        self._catalog = None
+
+
+question_catalog = QuestionCatalogCache(ttl_seconds=settings.QUESTION_CATALOG_TTL_SECONDS)
+registry.register_cache("question_catalog", lambda: (question_catalog.hits, question_catalog.misses))
@@ -0,0 +1,159 @@
+# app/services/response_cache.py
+"""
+よくあるコーチング質問への応答キャッシュ
+
+キーは（役割, スコアプロフィールの帯, 知識源の検索語）ごとのバケットと、正規化した質問文。
+質問文は文字バイグラムのベクトルにしてコサイン類似度で比較し、
+しきい値以上の既存の応答があればモデルを呼ばずに返す。
+"""
+import math
+import time
+import unicodedata
+from collections import Counter as TermCounter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.core.metrics import registry
+
+ProfileKey = Tuple[int, ...]
+BucketKey = Tuple[str, ProfileKey, Tuple[str, ...]]
+
+COACHING_RESPONSE_CACHE_LOOKUPS = registry.counter(
+    "app_coaching_response_cache_lookups_total",
+    "Coaching response cache lookups by result",
+    labelnames=("result",),
+)
+
+
+def normalize_message(message: str) -> str:
+    """全角/半角・大文字/小文字・空白・記号の違いを吸収"""
+    text = unicodedata.normalize("NFKC", message).lower()
+    return "".join(
+        ch for ch in text
+        if unicodedata.category(ch)[0] not in ("P", "S", "Z", "C")
+    )
+
+
+def message_vector(normalized: str) -> Dict[str, int]:
+    """文字バイグラムの出現数（1文字の場合はその文字）"""
+    if len(normalized) < 2:
+        return dict(TermCounter(normalized))
+    return dict(TermCounter(normalized[i:i + 2] for i in range(len(normalized) - 1)))
+
+
+def _norm(vector: Dict[str, int]) -> float:
+    return math.sqrt(sum(count * count for count in vector.values()))
+
+
+def contains_personal_data(response: str, private_terms: Tuple[str, ...]) -> bool:
+    """
+    他のユーザーに返せない内容を含むか
+    数字（年齢・スコアなど）か、名前・クラブIDなど本人に固有の語を含む応答は共有しない
+    """
+    text = unicodedata.normalize("NFKC", response)
+    if any(ch.isdigit() for ch in text):
+        return True
+    return any(term and term in text for term in private_terms)
+
+
+def profile_key(*totals: Optional[float], width: float) -> ProfileKey:
+    """カテゴリ合計スコアを width ごとの帯に丸める"""
+    return tuple(int((total or 0) // width) for total in totals)
+
+
+@dataclass
+class _Entry:
+    vector: Dict[str, int]
+    norm: float
+    response: str
+    expires_at: float
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float, max_entries: int, similarity: float, max_scan: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        # 1バケットあたりの比較件数の上限（類似検索のコストを抑える）
+        self.max_scan = max_scan
+        # バケット -> 正規化した質問文 -> エントリ。いずれも先頭が最も古い
+        self._buckets: "OrderedDict[BucketKey, OrderedDict[str, _Entry]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, role: str, profile: ProfileKey, hints: Tuple[str, ...], message: str) -> Optional[str]:
+        if self.ttl_seconds <= 0:
+            return None
+        normalized = normalize_message(message)
+        bucket = self._buckets.get((role, profile, hints))
+        entry, result = None, "miss"
+        if bucket is not None and normalized:
+            now = time.monotonic()
+            entry = bucket.get(normalized)
+            if entry is not None and entry.expires_at >= now:
+                result = "exact"
+                bucket.move_to_end(normalized)
+            else:
+                entry = self._most_similar(bucket, normalized, now)
+                if entry is not None:
+                    result = "similar"
+        COACHING_RESPONSE_CACHE_LOOKUPS.inc(result=result)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._buckets.move_to_end((role, profile, hints))
+        return entry.response
+
+    def _most_similar(self, bucket: "OrderedDict[str, _Entry]", normalized: str, now: float) -> Optional[_Entry]:
+        vector = message_vector(normalized)
+        norm = _norm(vector)
+        best, best_score = None, self.similarity
+        # 新しいものから max_scan 件を比較
+        for key in list(reversed(bucket))[:self.max_scan]:
+            entry = bucket[key]
+            if entry.expires_at < now:
+                continue
+            dot = sum(count * entry.vector.get(term, 0) for term, count in vector.items())
+            score = dot / (norm * entry.norm) if norm and entry.norm else 0.0
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def set(self, role: str, profile: ProfileKey, hints: Tuple[str, ...], message: str, response: str):
+        if self.ttl_seconds <= 0:
+            return
+        normalized = normalize_message(message)
+        if not normalized:
+            return
+        vector = message_vector(normalized)
+        bucket = self._buckets.setdefault((role, profile, hints), OrderedDict())
+        if bucket.pop(normalized, None) is None:
+            self._size += 1
+        bucket[normalized] = _Entry(vector, _norm(vector), response, time.monotonic() + self.ttl_seconds)
+        self._buckets.move_to_end((role, profile, hints))
+        self._evict()
+
+    def _evict(self):
+        """件数上限を超えたら、最も使われていないバケットの最も古い応答から削除"""
+        while self._size > self.max_entries and self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            bucket.popitem(last=False)
+            self._size -= 1
+            if not bucket:
+                del self._buckets[key]
+
+    def clear(self):
+        self._buckets.clear()
+        self._size = 0
+
+
+response_cache = ResponseCache(
+    ttl_seconds=settings.COACHING_RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=settings.COACHING_RESPONSE_CACHE_MAX_ENTRIES,
+    similarity=settings.COACHING_RESPONSE_CACHE_SIMILARITY,
+    max_scan=settings.COACHING_RESPONSE_CACHE_MAX_SCAN,
+)
+registry.register_cache("coaching_response", lambda: (response_cache.hits, response_cache.misses))
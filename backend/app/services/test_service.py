@@ -1,42 +1,142 @@
 # app/services/test_service.py 完全修正版
 # 統合データローダーの標準化に完全対応
 
-from typing import Dict, List
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
+import uuid
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.models.test_result import TestResult
-from app.models.question import Question
-from app.schemas.test import TestSubmit, TestResultWithAnalysis
+from app.models.user import User
+from app.models.family_relation import FamilyRelation
+from app.schemas.test import (
+    REQUIRED_ANSWER_COUNT,
+    TestSubmit,
+    TestResultWithAnalysis,
+    TestBatchItem,
+    TestBatchItemResult,
+)
+from app.services.question_catalog import QuestionCatalog, question_catalog
+from app.services.trend_service import ScoreTrendService
+from app.services.percentile_service import percentile_index
+from app.services.ai_service import coaching_context_cache
+from app.services.comment_engine import COMMENT_ENGINE_VERSION, FIELD_LABELS, generate_comment, stored_comment
+
+
+SELF_ESTEEM_FIELDS = ("self_efficacy", "self_determination", "self_acceptance", "self_worth")
+SPORTSMANSHIP_FIELDS = ("courage", "resilience", "cooperation", "natural_acceptance", "non_rationality")
+ATHLETE_MIND_FIELDS = (
+    "commitment", "result", "steadiness", "devotion", "self_control",
+    "assertion", "sensitivity", "intuition", "introspection", "comparison",
+)
+
+# アスリートタイプと特性スコアの算出に使う項目（同点の場合は先のタイプ）
+ATHLETE_TYPE_TRAITS = (
+    ("ストライカー", ("result", "assertion", "comparison")),
+    ("アタッカー", ("result", "assertion", "intuition")),
+    ("ゲームメイカー", ("steadiness", "introspection", "devotion")),
+    ("アンカー", ("steadiness", "devotion", "introspection")),
+    ("ディフェンダー", ("steadiness", "devotion", "sensitivity")),
+)
+
+
+def category_totals(scores: Dict[str, float]) -> Dict[str, float]:
+    """19項目のスコアからカテゴリ合計と総合スコア（自己肯定感合計 + スポーツマンシップ合計）を計算"""
+    totals = {
+        "self_esteem_total": round(sum(scores[key] for key in SELF_ESTEEM_FIELDS), 1),
+        "sportsmanship_total": round(sum(scores[key] for key in SPORTSMANSHIP_FIELDS), 1),
+        "athlete_mind_total": round(sum(scores[key] for key in ATHLETE_MIND_FIELDS), 1),
+    }
+    # 総合スコア（履歴のスコア範囲フィルタ・スコア順ソートに使用）
+    totals["total_score"] = round(totals["self_esteem_total"] + totals["sportsmanship_total"], 1)
+    return totals
+
+
+def make_submission_key(user_id, client_key: str) -> str:
+    """冪等キーはユーザーごとに区別する（他ユーザーの結果を返さないため）"""
+    return f"{user_id}:{client_key}"
 
 
 class TestService:
     def __init__(self, db: Session):
         self.db = db
     
-    def process_test_submission(self, user_id: UUID, test_data: TestSubmit, target_selection: str) -> TestResultWithAnalysis:
-        """テスト提出を処理して結果を生成"""
+    def process_test_submission(
+        self,
+        user_id: Optional[UUID],
+        test_data: TestSubmit,
+        target_selection: str,
+        submission_key: Optional[str] = None
+    ) -> TestResultWithAnalysis:
+        """
+        テスト提出を処理して結果を生成（採点・分析後に1回のコミットで保存）
+        user_id が None の場合は匿名の結果として保存し、ユーザー単位の集計・キャッシュは更新しない
+        """
+        test_result, analysis = self.build_test_result(
+            user_id, test_data.test_date, test_data.answers, target_selection, submission_key
+        )
+        
+        self.db.add(test_result)
+        try:
+            self.db.flush()
+            ScoreTrendService(self.db).record_results([test_result])
+            self.db.commit()
+        except IntegrityError:
+            # 同じキーの並行送信と競合した場合は、先に登録された結果を返す
+            self.db.rollback()
+            existing = self.find_submission(submission_key) if submission_key else None
+            if existing is None:
+                raise
+            return existing
+        if user_id is None:
+            return analysis
+        coaching_context_cache.invalidate(user_id)
+        
+        user = self.db.query(User.club_id, User.role, User.age).filter(User.user_id == user_id).first()
+        if user is not None:
+            percentile_index.record(user_id, user.club_id, user.role, user.age, test_result)
+            analysis.percentile_ranks = percentile_index.ranks(
+                self.db, user.club_id, user.role, user.age, test_result
+            )
+        
+        return analysis
+    
+    def find_submission(self, submission_key: str) -> Optional[TestResultWithAnalysis]:
+        """冪等キーで登録済みの結果を取得（採点・登録は行わない）"""
+        existing = self.db.query(TestResult).filter(TestResult.submission_key == submission_key).first()
+        if existing is None:
+            return None
+        return self.analyze_test_result(existing)
+    
+    def build_test_result(
+        self,
+        user_id: UUID,
+        test_date: datetime,
+        answers: List,
+        target_selection: str,
+        submission_key: Optional[str] = None,
+        catalog: Optional[QuestionCatalog] = None
+    ) -> Tuple[TestResult, TestResultWithAnalysis]:
+        """採点と分析を行い、未保存のTestResultと分析結果を返す"""
         
         # 回答からスコアを計算
-        scores = self._calculate_scores(test_data.answers, target_selection)
+        scores = self._calculate_scores(answers, target_selection, catalog)
         
-        # テスト結果をデータベースに保存
         test_result = TestResult(
+            result_id=uuid.uuid4(),
             user_id=user_id,
             target_selection=target_selection,
-            test_date=test_data.test_date,
+            test_date=test_date,
+            submission_key=submission_key,
             **scores
         )
         
-        self.db.add(test_result)
-        self.db.commit()
-        self.db.refresh(test_result)
-        
-        # 分析結果を生成
+        # 分析結果を生成して保存用フィールドに設定
         analysis = self.analyze_test_result(test_result)
-        
-        # 分析結果をデータベースに保存
         test_result.athlete_type = analysis.athlete_type
         test_result.athlete_type_description = analysis.athlete_type_description
         test_result.athlete_type_percentages = str(analysis.athlete_type_percentages)
@@ -45,35 +145,163 @@ class TestService:
         test_result.strengths = str(analysis.strengths)
         test_result.weaknesses = str(analysis.weaknesses)
         test_result.sportsmanship_balance = analysis.sportsmanship_balance
+        test_result.ai_comment = json.dumps(analysis.ai_comment.dict(), ensure_ascii=False)
+        test_result.ai_comment_version = COMMENT_ENGINE_VERSION
         
-        # 更新をコミット
-        self.db.commit()
-        
-        return analysis
-
+        return test_result, analysis
+    
+    def process_batch_submission(self, current_user, submissions: List[TestBatchItem]) -> List[TestBatchItemResult]:
+        """
+        複数の回答を一括で採点・保存（1トランザクション）
+        同じユーザー・同じ client_submission_id の再送は duplicate として既存の結果を返す
+        """
+        try:
+            return self._process_batch(current_user, submissions)
+        except IntegrityError:
+            # 同じキーの並行送信と競合した場合は、登録済みのものを除いて再実行
+            self.db.rollback()
+            return self._process_batch(current_user, submissions)
+    
+    def _process_batch(self, current_user, submissions: List[TestBatchItem]) -> List[TestBatchItemResult]:
+        results = [
+            TestBatchItemResult(
+                client_submission_id=item.client_submission_id,
+                status="pending",
+                user_id=item.user_id or current_user.user_id
+            )
+            for item in submissions
+        ]
+        
+        # 対象ユーザーを1回のクエリで取得し、提出権限を確認
+        user_ids = {result.user_id for result in results}
+        users = {
+            row.user_id: row for row in self.db.query(User.user_id, User.role, User.club_id, User.age).filter(
+                User.user_id.in_(user_ids)
+            ).all()
+        }
+        children = set()
+        if user_ids - {current_user.user_id}:
+            children = {
+                child_id for (child_id,) in self.db.query(FamilyRelation.child_id).filter(
+                    FamilyRelation.parent_id == current_user.user_id
+                ).all()
+            }
+        for result in results:
+            user = users.get(result.user_id)
+            if user is None:
+                result.status, result.message = "invalid", "ユーザーが見つかりません"
+            elif not (
+                user.user_id == current_user.user_id
+                or user.user_id in children
+                or (current_user.head_coach_function and user.club_id and user.club_id == current_user.club_id)
+            ):
+                result.status, result.message = "forbidden", "このユーザーの回答を提出する権限がありません"
+        
+        # 登録済みのキーを1回のクエリで確認
+        keys = {
+            id(result): make_submission_key(result.user_id, result.client_submission_id)
+            for result in results if result.status == "pending"
+        }
+        existing = {}
+        if keys:
+            existing = {
+                key: (result_id, athlete_type)
+                for key, result_id, athlete_type in self.db.query(
+                    TestResult.submission_key, TestResult.result_id, TestResult.athlete_type
+                ).filter(TestResult.submission_key.in_(set(keys.values()))).all()
+            }
+        
+        catalog = question_catalog.get(self.db)
+        new_results = []
+        for item, result in zip(submissions, results):
+            if result.status != "pending":
+                continue
+            key = keys[id(result)]
+            if key in existing:
+                result.status = "duplicate"
+                result.result_id, result.athlete_type = existing[key]
+                continue
+            
+            # 重複回答を除いた回答数を確認
+            answers = list({str(answer.question_id): answer for answer in reversed(item.answers)}.values())
+            if len(answers) != REQUIRED_ANSWER_COUNT:
+                result.status = "invalid"
+                result.message = f"Must submit exactly {REQUIRED_ANSWER_COUNT} unique answers, got {len(answers)}"
+                continue
+            
+            role = users[result.user_id].role
+            target_selection = role.value if hasattr(role, "value") else role
+            test_result, analysis = self.build_test_result(
+                result.user_id, item.test_date, answers, target_selection, key, catalog
+            )
+            new_results.append(test_result)
+            existing[key] = (test_result.result_id, analysis.athlete_type)
+            result.status = "created"
+            result.result_id, result.athlete_type = test_result.result_id, analysis.athlete_type
+        
+        if new_results:
+            self.db.add_all(new_results)
+            ScoreTrendService(self.db).record_results(
+                new_results, {user_id: user.club_id for user_id, user in users.items()}
+            )
+            self.db.commit()
+            for test_result in new_results:
+                coaching_context_cache.invalidate(test_result.user_id)
+                user = users[test_result.user_id]
+                percentile_index.record(test_result.user_id, user.club_id, user.role, user.age, test_result)
+        
+        return results
 
-    def _calculate_scores(self, answers: List, target_selection: str) -> Dict[str, float]:
+    def pregenerate_comments(self, batch_size: int = 1000, force: bool = False) -> int:
+        """
+        保存済みの結果のコメントを一括作成（未作成・古いバージョンのもの。force=True で全件）
+        batch_size 件ごとにコミットする。作成した件数を返す
+        """
+        columns = [TestResult.result_id, TestResult.athlete_type, *[getattr(TestResult, f) for f in FIELD_LABELS]]
+        query = self.db.query(*columns)
+        if not force:
+            query = query.filter(
+                (TestResult.ai_comment_version.is_(None)) | (TestResult.ai_comment_version != COMMENT_ENGINE_VERSION)
+            )
+        
+        count = 0
+        last_id = None
+        while True:
+            # result_id順のキーセットで読み進める（更新した行は条件から外れるため）
+            page = query if last_id is None else query.filter(TestResult.result_id > last_id)
+            rows = page.order_by(TestResult.result_id).limit(batch_size).all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                athlete_type = row.athlete_type or self._analyze_athlete_type(row)['athlete_type']
+                comment = generate_comment({field: getattr(row, field) for field in FIELD_LABELS}, athlete_type)
+                updates.append({
+                    'result_id': row.result_id,
+                    'ai_comment': json.dumps(comment, ensure_ascii=False),
+                    'ai_comment_version': COMMENT_ENGINE_VERSION,
+                })
+            self.db.bulk_update_mappings(TestResult, updates)
+            self.db.commit()
+            count += len(rows)
+            last_id = rows[-1].result_id
+        return count
+    
+    def _calculate_scores(
+        self,
+        answers: List,
+        target_selection: str,
+        catalog: Optional[QuestionCatalog] = None
+    ) -> Dict[str, float]:
         """回答からスコアを計算（標準化されたsubcategory名に対応）"""
         
-        # APIと同じロジックで質問を取得
+        # APIと同じ条件の質問を共有カタログから取得
         # sportsmanshipはtargetを問わず全件、それ以外はtargetでフィルタ
-        sportsmanship_questions = self.db.query(Question).filter(
-            Question.category == 'sportsmanship',
-            Question.is_active == True
-        ).all()
-        
-        other_questions = self.db.query(Question).filter(
-            Question.category != 'sportsmanship',
-            Question.is_active == True,
-            ((Question.target == 'all') | (Question.target == target_selection))
-        ).all()
+        if catalog is None:
+            catalog = question_catalog.get(self.db)
         
-        # 結合して番号順に並べる
-        questions = sportsmanship_questions + other_questions
-        questions.sort(key=lambda q: q.question_number)
-        
-        # 質問IDから質問オブジェクトへのマッピング
-        question_map = {str(q.question_id): q for q in questions}
+        # 質問IDから質問へのマッピング
+        question_map = catalog.scoring_map(target_selection)
         
         # 回答データを質問IDをキーとした辞書に変換
         answer_map = {str(answer.question_id): answer.answer_value for answer in answers}
@@ -134,13 +362,8 @@ class TestService:
         result['self_acceptance'] = final_scores.get('self_acceptance', 0)
         result['self_worth'] = final_scores.get('self_worth', 0)
         
-        # 自己肯定感合計
-        result['self_esteem_total'] = round(
-            result['self_efficacy'] + 
-            result['self_determination'] + 
-            result['self_acceptance'] + 
-            result['self_worth'], 1
-        )
+        # カテゴリ合計・総合スコア
+        result.update(category_totals(result))
         
         return result
     
@@ -160,6 +383,12 @@ class TestService:
         # スポーツマンシップバランス分析
         sportsmanship_balance = self._generate_sportsmanship_balance(test_result)
         
+        # 結果コメント（保存済みで同じバージョンのものがあればそれを使う）
+        ai_comment = stored_comment(test_result) or generate_comment(
+            {field: getattr(test_result, field) for field in FIELD_LABELS},
+            athlete_analysis['athlete_type']
+        )
+        
         # TestResultの基本データを辞書として取得
         result_dict = {
             'result_id': test_result.result_id,
@@ -194,6 +423,9 @@ class TestService:
             
             # 計算値
             'self_esteem_total': test_result.self_esteem_total,
+            'sportsmanship_total': test_result.sportsmanship_total,
+            'athlete_mind_total': test_result.athlete_mind_total,
+            'total_score': test_result.total_score,
         }
         
         # 分析結果を追加（重複を避けるため、個別に設定）
@@ -205,7 +437,8 @@ class TestService:
             'athlete_type_percentages': athlete_analysis['athlete_type_percentages'],
             'strengths': strengths_weaknesses['strengths'],
             'weaknesses': strengths_weaknesses['weaknesses'],
-            'sportsmanship_balance': sportsmanship_balance
+            'sportsmanship_balance': sportsmanship_balance,
+            'ai_comment': ai_comment
         })
     
         return TestResultWithAnalysis(**result_dict)
@@ -215,31 +448,8 @@ class TestService:
         
         # 特性スコアの計算（提供資料の優先順位に基づく）
         type_scores = {
-            'ストライカー': (
-                getattr(test_result, 'result', 0) + 
-                getattr(test_result, 'assertion', 0) + 
-                getattr(test_result, 'comparison', 0)
-            ) / 3,
-            'アタッカー': (
-                getattr(test_result, 'result', 0) + 
-                getattr(test_result, 'assertion', 0) + 
-                getattr(test_result, 'intuition', 0)
-            ) / 3,
-            'ゲームメイカー': (
-                getattr(test_result, 'steadiness', 0) + 
-                getattr(test_result, 'introspection', 0) + 
-                getattr(test_result, 'devotion', 0)
-            ) / 3,
-            'アンカー': (
-                getattr(test_result, 'steadiness', 0) + 
-                getattr(test_result, 'devotion', 0) + 
-                getattr(test_result, 'introspection', 0)
-            ) / 3,
-            'ディフェンダー': (
-                getattr(test_result, 'steadiness', 0) + 
-                getattr(test_result, 'devotion', 0) + 
-                getattr(test_result, 'sensitivity', 0)
-            ) / 3
+            athlete_type: sum(getattr(test_result, field, 0) for field in fields) / len(fields)
+            for athlete_type, fields in ATHLETE_TYPE_TRAITS
         }
         
         # 最高スコアのタイプを決定
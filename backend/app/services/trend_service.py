@@ -0,0 +1,302 @@
+# app/services/trend_service.py
+"""
+スコア推移（時系列）の集計
+
+テスト結果の登録・削除時に score_rollups（ユーザー別・クラブ別 × 週・月）を
+加算・減算で更新し、推移の取得時は集計テーブルだけを読む。
+クラブ別の集計は登録時点の所属クラブに加算される。所属変更後の削除などで
+ずれた場合は scripts/rebuild_score_rollups.py で再集計できる。
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, String, and_, bindparam, cast, func, literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from app.models.score_rollup import ScoreRollup
+from app.models.test_result import TestResult
+from app.models.user import User
+from app.schemas.test import ScoreTrend, ScoreTrendPoint
+
+# 集計対象の項目（TestResultの列名）
+SCORE_FIELDS = (
+    "self_determination", "self_acceptance", "self_worth", "self_efficacy", "self_esteem_total",
+    "commitment", "result", "steadiness", "devotion", "self_control",
+    "assertion", "sensitivity", "intuition", "introspection", "comparison",
+    "courage", "resilience", "cooperation", "natural_acceptance", "non_rationality",
+)
+PERIODS = ("week", "month")
+SCOPES = ("user", "club")
+
+RollupKey = Tuple[str, str, str, date]
+
+
+def period_start(value: Optional[datetime], period: str) -> date:
+    """日時が属する期間の開始日（週は月曜日、月は1日。タイムゾーンはUTC）"""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    day = value.date()
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _period_start_sql(value, period: str, dialect: str):
+    """period_start() と同じ期間の開始日を求めるSQL式（PostgreSQLはUTCで切り捨て）"""
+    if dialect == "sqlite":
+        if period == "week":
+            # 次の日曜日（当日が日曜日なら当日）の6日前 = 月曜日
+            return func.date(value, "weekday 0", "-6 days")
+        return func.date(value, "start of month")
+    return cast(func.date_trunc(period, func.timezone("UTC", value)), Date)
+
+
+def _uuid_text_sql(column, dialect: str):
+    """str(uuid) と同じ形式（ハイフン区切り）の文字列にするSQL式"""
+    if dialect == "sqlite":
+        # SQLiteでは32桁の16進数で保存されている
+        parts = [func.substr(column, start, length, type_=String) for start, length in ((1, 8), (9, 4), (13, 4), (17, 4), (21, 12))]
+        text = parts[0]
+        for part in parts[1:]:
+            text = text + "-" + part
+        return func.lower(text)
+    return cast(column, String)
+
+
+def _rollup_keys(result: TestResult, club_id: Optional[str]) -> List[RollupKey]:
+    keys = []
+    for period in PERIODS:
+        start = period_start(result.test_date, period)
+        keys.append(("user", str(result.user_id), period, start))
+        if club_id:
+            keys.append(("club", club_id, period, start))
+    return keys
+
+
+def _aggregate(results: Iterable[TestResult], club_ids: Dict, sign: int = 1) -> Dict[RollupKey, Dict[str, float]]:
+    """結果を集計キーごとの増分（sample_count と sum_*）にまとめる"""
+    increments: Dict[RollupKey, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for result in results:
+        if result.user_id is None:
+            continue
+        for key in _rollup_keys(result, club_ids.get(result.user_id)):
+            values = increments[key]
+            values["sample_count"] += sign
+            for field in SCORE_FIELDS:
+                values[f"sum_{field}"] += sign * (getattr(result, field) or 0)
+    return increments
+
+
+class ScoreTrendService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # 集計テーブルの更新（呼び出し側のトランザクション内で実行し、コミットは呼び出し側）
+    # ------------------------------------------------------------------
+
+    def record_results(self, results: Iterable[TestResult], club_ids: Optional[Dict] = None):
+        """
+        登録するテスト結果を集計に加算
+
+        club_ids: user_id -> 登録時点の club_id（省略時はusersから取得）
+        """
+        results = [r for r in results if r.user_id is not None]
+        if not results:
+            return
+        if club_ids is None:
+            club_ids = self._club_ids({r.user_id for r in results})
+        increments = _aggregate(results, club_ids)
+        rows = [
+            {"scope": scope, "scope_id": scope_id, "period": period, "period_start": start, **values}
+            for (scope, scope_id, period, start), values in increments.items()
+        ]
+        self._upsert(rows)
+
+    def remove_results(self, results: Iterable[TestResult]):
+        """削除するテスト結果を集計から減算（クラブ別は現在の所属クラブから減算）"""
+        results = [r for r in results if r.user_id is not None]
+        if not results:
+            return
+        increments = _aggregate(results, self._club_ids({r.user_id for r in results}), sign=-1)
+        table = ScoreRollup.__table__
+        columns = ["sample_count"] + [f"sum_{field}" for field in SCORE_FIELDS]
+        stmt = (
+            update(table)
+            .where(and_(
+                table.c.scope == bindparam("b_scope"),
+                table.c.scope_id == bindparam("b_scope_id"),
+                table.c.period == bindparam("b_period"),
+                table.c.period_start == bindparam("b_period_start"),
+            ))
+            .values({column: table.c[column] + bindparam(f"d_{column}") for column in columns})
+        )
+        params = [
+            {
+                "b_scope": scope, "b_scope_id": scope_id, "b_period": period, "b_period_start": start,
+                **{f"d_{column}": values[column] for column in columns},
+            }
+            for (scope, scope_id, period, start), values in increments.items()
+        ]
+        self.db.connection().execute(stmt, params)
+        # 件数が0になった期間は削除
+        self.db.query(ScoreRollup).filter(ScoreRollup.sample_count <= 0).delete(synchronize_session=False)
+
+    def rebuild(self) -> int:
+        """
+        全テスト結果から集計テーブルを作り直す（コミットは呼び出し側）
+        集計はDB側で1回の INSERT ... SELECT ... GROUP BY として実行し、集計元の件数を返す
+        """
+        self.db.query(ScoreRollup).delete(synchronize_session=False)
+        connection = self.db.connection()
+        dialect = connection.dialect.name
+        results = TestResult.__table__
+        users = User.__table__
+
+        # 1件のテスト結果を (スコープ × 期間) の行に展開し、外側でまとめて集計する
+        test_date = func.coalesce(results.c.test_date, func.current_timestamp())
+        scores = [results.c[field].label(field) for field in SCORE_FIELDS]
+        expanded = []
+        for period in PERIODS:
+            start = _period_start_sql(test_date, period, dialect).label("period_start")
+            expanded.append(
+                select(
+                    literal("user").label("scope"),
+                    _uuid_text_sql(results.c.user_id, dialect).label("scope_id"),
+                    literal(period).label("period"),
+                    start,
+                    *scores,
+                ).where(results.c.user_id.isnot(None))
+            )
+            expanded.append(
+                select(
+                    literal("club").label("scope"),
+                    users.c.club_id.label("scope_id"),
+                    literal(period).label("period"),
+                    start,
+                    *scores,
+                )
+                .select_from(results.join(users, users.c.user_id == results.c.user_id))
+                .where(users.c.club_id.isnot(None))
+            )
+        rows = union_all(*expanded).subquery()
+        keys = [rows.c.scope, rows.c.scope_id, rows.c.period, rows.c.period_start]
+        aggregated = select(
+            *keys,
+            func.count(),
+            *[func.coalesce(func.sum(rows.c[field]), 0) for field in SCORE_FIELDS],
+        ).group_by(*keys)
+        connection.execute(ScoreRollup.__table__.insert().from_select(
+            ["scope", "scope_id", "period", "period_start", "sample_count"]
+            + [f"sum_{field}" for field in SCORE_FIELDS],
+            aggregated,
+        ))
+        return connection.execute(
+            select(func.count()).select_from(results).where(results.c.user_id.isnot(None))
+        ).scalar()
+
+    def _club_ids(self, user_ids) -> Dict:
+        return {
+            user_id: club_id for user_id, club_id in self.db.query(User.user_id, User.club_id).filter(
+                User.user_id.in_(user_ids)
+            ).all()
+        }
+
+    def _upsert(self, rows: List[Dict]):
+        """集計キーが既にあれば加算、なければ追加"""
+        if not rows:
+            return
+        table = ScoreRollup.__table__
+        columns = ["sample_count"] + [f"sum_{field}" for field in SCORE_FIELDS]
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            self._upsert_generic(rows)
+            return
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.scope_id, table.c.period, table.c.period_start],
+            set_={column: table.c[column] + stmt.excluded[column] for column in columns},
+        )
+        self.db.connection().execute(stmt, rows)
+
+    def _upsert_generic(self, rows: List[Dict]):
+        for row in rows:
+            key = (row["scope"], row["scope_id"], row["period"], row["period_start"])
+            rollup = self.db.get(ScoreRollup, key)
+            if rollup is None:
+                self.db.add(ScoreRollup(**row))
+                continue
+            for column, value in row.items():
+                if column.startswith("sum_") or column == "sample_count":
+                    setattr(rollup, column, getattr(rollup, column) + value)
+        self.db.flush()
+
+    # ------------------------------------------------------------------
+    # 推移の取得
+    # ------------------------------------------------------------------
+
+    def user_trend(self, user_id, period: str = "month", limit: int = 12, window: int = 3) -> ScoreTrend:
+        return self._trend("user", str(user_id), period, limit, window)
+
+    def club_trend(self, club_id: str, period: str = "month", limit: int = 12, window: int = 3) -> ScoreTrend:
+        return self._trend("club", club_id, period, limit, window)
+
+    def _trend(self, scope: str, scope_id: str, period: str, limit: int, window: int) -> ScoreTrend:
+        # 移動平均の計算用に、表示する期間より前の window-1 期間も取得する
+        rollups = self.db.query(ScoreRollup).filter(
+            ScoreRollup.scope == scope,
+            ScoreRollup.scope_id == scope_id,
+            ScoreRollup.period == period,
+            ScoreRollup.sample_count > 0,
+        ).order_by(ScoreRollup.period_start.desc()).limit(limit + window - 1).all()
+        rollups.reverse()
+
+        points = []
+        previous = None
+        for index, rollup in enumerate(rollups):
+            averages = {
+                field: round(getattr(rollup, f"sum_{field}") / rollup.sample_count, 2)
+                for field in SCORE_FIELDS
+            }
+            recent = rollups[max(0, index - window + 1):index + 1]
+            recent_count = sum(r.sample_count for r in recent)
+            moving_averages = {
+                field: round(sum(getattr(r, f"sum_{field}") for r in recent) / recent_count, 2)
+                for field in SCORE_FIELDS
+            }
+            deltas = {}
+            if previous is not None:
+                deltas = {field: round(averages[field] - previous[field], 2) for field in SCORE_FIELDS}
+            previous = averages
+            points.append(ScoreTrendPoint(
+                period_start=rollup.period_start,
+                sample_count=rollup.sample_count,
+                averages=averages,
+                deltas=deltas,
+                moving_averages=moving_averages,
+            ))
+        points = points[-limit:]
+
+        improvement_rates = {}
+        if len(points) >= 2:
+            first, last = points[0].averages, points[-1].averages
+            improvement_rates = {
+                field: round((last[field] - first[field]) / first[field] * 100, 1)
+                for field in SCORE_FIELDS if first[field]
+            }
+
+        return ScoreTrend(
+            scope=scope,
+            scope_id=scope_id,
+            period=period,
+            window=window,
+            points=points,
+            improvement_rates=improvement_rates,
+        )
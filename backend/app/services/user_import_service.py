@@ -0,0 +1,277 @@
+# app/services/user_import_service.py
+"""
+クラブメンバーの一括登録
+
+- パスワードのハッシュ化は複数のワーカープロセスで並列に実行
+- メールアドレスは登録・ログインと同じく入力どおり（前後の空白のみ除去）に扱う
+- メールアドレスの重複チェックは1回のIN句クエリ
+- ユーザー・家族関係はそれぞれ1回のバッチINSERTで登録
+- 結果は行ごとのステータスとして返す
+"""
+import csv
+import io
+import json
+import multiprocessing
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from pydantic import ValidationError as PydanticValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.exceptions import ValidationError
+from app.models.club import Club
+from app.models.family_relation import FamilyRelation
+from app.models.user import User
+from app.schemas.error import ErrorDetail
+from app.schemas.user import BulkImportMember, BulkImportRequest, BulkImportResponse, BulkImportRowResult
+from app.services.password_service import password_hasher
+
+VALID_ROLES = ["player", "coach", "father", "mother", "adult"]
+PARENT_ROLES = ["father", "mother"]
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# この件数未満はプロセスを起動せずに現在のプロセスでハッシュ化する
+PROCESS_POOL_MIN_PASSWORDS = 8
+
+
+def _hash_chunk(passwords: List[str], rounds: int) -> List[str]:
+    """ワーカープロセスで実行（pickle可能なトップレベル関数）"""
+    from passlib.hash import bcrypt
+    hasher = bcrypt.using(rounds=rounds)
+    return [hasher.hash(password) for password in passwords]
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """パスワードを並列にハッシュ化（入力と同じ順序で返す）"""
+    if len(passwords) < PROCESS_POOL_MIN_PASSWORDS:
+        return [password_hasher.hash(password) for password in passwords]
+    
+    workers = min(settings.PASSWORD_HASH_WORKERS, len(passwords))
+    chunk_size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    # サーバーのスレッド状態を引き継がないよう spawn で起動する
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = executor.map(_hash_chunk, chunks, [settings.BCRYPT_ROUNDS] * len(chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+
+def parse_members_csv(text: str) -> List[dict]:
+    """
+    CSVをメンバー情報に変換
+    列: email, name, password, role, age, children（子供のメールアドレスを ; 区切り）
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip("﻿")))
+    members = []
+    for row in reader:
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        members.append({
+            "email": row.get("email", ""),
+            "name": row.get("name", ""),
+            "password": row.get("password", ""),
+            "role": row.get("role") or "player",
+            "age": int(row["age"]) if row.get("age", "").isdigit() else None,
+            "children": [email.strip() for email in row.get("children", "").split(";") if email.strip()],
+        })
+    return members
+
+
+async def read_import_request(request: Request) -> BulkImportRequest:
+    """
+    リクエスト本文を読み込む
+    Content-Type が text/csv の場合はCSV、それ以外はJSON（BulkImportRequest）として扱う
+    家族関係の作成はCSVではクエリパラメータ create_family_relations で指定する
+    """
+    body = (await request.body()).decode("utf-8-sig")
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "csv" in content_type:
+            flag = request.query_params.get("create_family_relations", "true").lower()
+            payload = BulkImportRequest(
+                members=parse_members_csv(body),
+                create_family_relations=flag not in ("false", "0", "no"),
+            )
+        else:
+            payload = BulkImportRequest.parse_obj(json.loads(body or "{}"))
+    except (ValueError, PydanticValidationError) as e:
+        raise ValidationError(details=[ErrorDetail(message=f"インポートデータを読み込めません: {e}")])
+    
+    if not payload.members:
+        raise ValidationError(details=[ErrorDetail(message="メンバーが含まれていません", field="members")])
+    if len(payload.members) > settings.BULK_IMPORT_MAX_ROWS:
+        raise ValidationError(details=[ErrorDetail(
+            message=f"一度に登録できるのは{settings.BULK_IMPORT_MAX_ROWS}件までです", field="members"
+        )])
+    return payload
+
+
+class UserImportService:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def club_exists(self, club_id: str) -> bool:
+        return self.db.query(Club.club_id).filter(Club.club_id == club_id).first() is not None
+    
+    def import_for_club(self, club_id: str, payload: BulkImportRequest) -> BulkImportResponse:
+        rows, relations_created = self.import_members(club_id, payload.members, payload.create_family_relations)
+        created = sum(1 for row in rows if row.status == "created")
+        return BulkImportResponse(
+            club_id=club_id,
+            created=created,
+            failed=len(rows) - created,
+            family_relations_created=relations_created,
+            rows=rows,
+        )
+    
+    def import_members(
+        self,
+        club_id: str,
+        members: List[BulkImportMember],
+        create_family_relations: bool = True,
+    ) -> Tuple[List[BulkImportRowResult], int]:
+        """メンバーを一括登録し、(行ごとの結果, 作成した家族関係数) を返す"""
+        results = [
+            BulkImportRowResult(row=index + 1, email=member.email.strip(), status="pending")
+            for index, member in enumerate(members)
+        ]
+        
+        # 行単位の検証とファイル内の重複チェック
+        seen = set()
+        for member, result in zip(members, results):
+            error = self._validate(member, result.email)
+            if error:
+                result.status, result.message = "invalid", error
+            elif result.email in seen:
+                result.status, result.message = "duplicate", "ファイル内でメールアドレスが重複しています"
+            seen.add(result.email)
+        
+        # 既存メールアドレスを1回のクエリで確認
+        pending = [(member, result) for member, result in zip(members, results) if result.status == "pending"]
+        to_create = self._exclude_existing(pending)
+        if not to_create:
+            return results, 0
+        
+        hashes = hash_passwords([member.password for member, _ in to_create])
+        now = datetime.now(timezone.utc)
+        user_rows = {}
+        for (member, result), password_hash in zip(to_create, hashes):
+            result.user_id = uuid.uuid4()
+            user_rows[result.row] = dict(
+                user_id=result.user_id,
+                club_id=club_id,
+                email=result.email,
+                password_hash=password_hash,
+                name=member.name.strip(),
+                age=member.age,
+                role=member.role,
+                is_individual=False,
+                parent_function=False,
+                head_coach_function=False,
+                head_parent_function=False,
+                created_date=now,
+                updated_date=now,
+            )
+        
+        # 確認後に別の登録で同じメールアドレスが使われた場合は、その行を exists にして残りを登録し直す
+        while to_create:
+            try:
+                self.db.execute(insert(User.__table__), [user_rows[result.row] for _, result in to_create])
+                relations_created = 0
+                if create_family_relations:
+                    relations_created = self._create_family_relations(club_id, to_create, now)
+                self.db.commit()
+            except IntegrityError:
+                self.db.rollback()
+                for _, result in to_create:
+                    result.family_relations, result.message = 0, None
+                remaining = self._exclude_existing(to_create)
+                if len(remaining) == len(to_create):
+                    for _, result in to_create:
+                        result.user_id = None
+                        result.status, result.message = "failed", "他の登録と競合したため登録できませんでした"
+                    return results, 0
+                to_create = remaining
+                continue
+            for _, result in to_create:
+                result.status = "created"
+            return results, relations_created
+        return results, 0
+    
+    def _exclude_existing(
+        self, rows: List[Tuple[BulkImportMember, BulkImportRowResult]]
+    ) -> List[Tuple[BulkImportMember, BulkImportRowResult]]:
+        """登録済みのメールアドレスの行を exists にし、残りの行を返す"""
+        emails = [result.email for _, result in rows]
+        existing = set()
+        if emails:
+            existing = {
+                email for (email,) in self.db.query(User.email).filter(User.email.in_(emails)).all()
+            }
+        remaining = []
+        for member, result in rows:
+            if result.email in existing:
+                result.user_id = None
+                result.status, result.message = "exists", "既に登録されているメールアドレスです"
+            else:
+                remaining.append((member, result))
+        return remaining
+    
+    def _validate(self, member: BulkImportMember, email: str) -> Optional[str]:
+        if not EMAIL_PATTERN.match(email):
+            return "メールアドレスの形式が正しくありません"
+        if not member.name.strip():
+            return "名前は必須です"
+        if not member.password:
+            return "パスワードは必須です"
+        if member.role not in VALID_ROLES:
+            return f"無効な役割です。有効な値: {VALID_ROLES}"
+        if member.children and member.role not in PARENT_ROLES:
+            return "子供を登録できるのは父・母のみです"
+        return None
+    
+    def _create_family_relations(
+        self,
+        club_id: str,
+        created: List[Tuple[BulkImportMember, BulkImportRowResult]],
+        now: datetime,
+    ) -> int:
+        """今回登録した親と、今回登録した選手またはクラブ内の既存選手をひも付ける"""
+        players: Dict[str, uuid.UUID] = {
+            result.email: result.user_id for member, result in created if member.role == "player"
+        }
+        wanted = {
+            email.strip()
+            for member, _ in created for email in member.children
+        } - set(players)
+        if wanted:
+            players.update({
+                email: user_id
+                for email, user_id in self.db.query(User.email, User.user_id).filter(
+                    User.email.in_(wanted),
+                    User.club_id == club_id,
+                    User.role == "player"
+                ).all()
+            })
+        
+        relation_rows = []
+        for member, result in created:
+            missing = []
+            for child_email in dict.fromkeys(email.strip() for email in member.children):
+                child_id = players.get(child_email)
+                if child_id is None:
+                    missing.append(child_email)
+                    continue
+                relation_rows.append(dict(parent_id=result.user_id, child_id=child_id, created_date=now))
+                result.family_relations += 1
+            if missing:
+                result.message = f"クラブ内に選手として見つからない子供: {', '.join(missing)}"
+        
+        if relation_rows:
+            self.db.execute(insert(FamilyRelation.__table__), relation_rows)
+        return len(relation_rows)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+APIベンチマークスクリプト
+
+合成データ（scripts/generate_synthetic_data.py）をSQLiteまたはローカルPostgreSQLに投入し、
+主要エンドポイントをASGIアプリに対してhttpxで並行実行して
+p50/p95/p99レイテンシとスループットをJSONで出力する。
+
+使い方:
+    python scripts/benchmark_api.py --database-url sqlite:///./benchmark.db \\
+        --clubs 20 --users-per-club 150 --results-per-user 10 \\
+        --requests 200 --concurrency 16 --output benchmark_result.json
+
+    # 既存データで再計測する場合
+    python scripts/benchmark_api.py --database-url sqlite:///./benchmark.db --skip-seed
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sportsmanship API benchmark")
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--clubs", type=int, default=10)
+    parser.add_argument("--users-per-club", type=int, default=100)
+    parser.add_argument("--results-per-user", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="シナリオごとのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", default="all", help="カンマ区切りのシナリオ名（既定: all）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="既存データを使用する")
+    parser.add_argument("--output", default=None, help="結果JSONの出力先")
+    return parser.parse_args()
+
+
+# ---------------------------------------------------------------------------
+# シナリオ
+# ---------------------------------------------------------------------------
+
+class Fixtures:
+    """シナリオが使う既存データ（トークン・ID）"""
+
+    def __init__(self, session_factory, rng: random.Random):
+        from app.core.security import create_access_token
+        from app.models import User, TestResult, FamilyRelation, Question
+
+        with session_factory() as db:
+            players = db.query(User.user_id, User.club_id).filter(User.role == "player").limit(2000).all()
+            coaches = db.query(User.user_id, User.club_id).filter(User.head_coach_function == True).all()
+            head_parents = db.query(User.user_id).join(
+                FamilyRelation, FamilyRelation.parent_id == User.user_id
+            ).filter(User.head_parent_function == True).distinct().all()
+            result_ids = [row[0] for row in db.query(TestResult.result_id).limit(2000).all()]
+            questions = db.query(Question.question_id, Question.category, Question.target).filter(
+                Question.is_active == True
+            ).all()
+
+        if not players or not coaches:
+            raise SystemExit("ベンチマーク用データがありません（--skip-seed を外して実行してください）")
+
+        self.rng = rng
+        self.player_tokens = [(create_access_token(p.user_id), p.user_id) for p in players]
+        self.players_by_club: Dict[str, List[uuid.UUID]] = {}
+        for p in players:
+            self.players_by_club.setdefault(p.club_id, []).append(p.user_id)
+        self.coach_tokens = [(create_access_token(c.user_id), c.club_id) for c in coaches]
+        self.head_parent_tokens = [create_access_token(p.user_id) for p in head_parents]
+        self.result_ids = result_ids
+        self.player_question_ids = [
+            str(q.question_id) for q in questions
+            if q.category == "sportsmanship" or q.target in ("all", "player")
+        ]
+
+    def auth(self, token: str) -> dict:
+        return {"Authorization": f"Bearer {token}"}
+
+
+def build_scenarios(fx: Fixtures) -> Dict[str, Callable[[], dict]]:
+    """シナリオ名 -> リクエスト生成関数"""
+    rng = fx.rng
+
+    def submit():
+        token, user_id = rng.choice(fx.player_tokens)
+        return dict(method="POST", url="/api/v1/tests/submit", headers=fx.auth(token), json={
+            "user_id": str(user_id),
+            "test_date": datetime.utcnow().isoformat(),
+            "answers": [{"question_id": qid, "answer_value": rng.randint(0, 10)} for qid in fx.player_question_ids],
+        })
+
+    def submit_batch():
+        # ヘッドコーチがクラブの選手の回答200件をまとめて同期する
+        token, club_id = rng.choice(fx.coach_tokens)
+        members = fx.players_by_club.get(club_id) or [uuid.uuid4()]
+        return dict(method="POST", url="/api/v1/tests/submit-batch", headers=fx.auth(token), json={
+            "submissions": [{
+                "client_submission_id": str(uuid.uuid4()),
+                "user_id": str(rng.choice(members)),
+                "test_date": datetime.utcnow().isoformat(),
+                "answers": [{"question_id": qid, "answer_value": rng.randint(0, 10)} for qid in fx.player_question_ids],
+            } for _ in range(200)],
+        })
+
+    def history():
+        token, _ = rng.choice(fx.player_tokens)
+        return dict(method="GET", url="/api/v1/tests/history?limit=20", headers=fx.auth(token))
+
+    def history_by_score():
+        token, _ = rng.choice(fx.player_tokens)
+        return dict(method="GET", url="/api/v1/tests/history?limit=20&sort_by=score&score_min=100",
+                    headers=fx.auth(token))
+
+    def coach_players():
+        token, _ = rng.choice(fx.coach_tokens)
+        return dict(method="GET", url="/api/v1/coach/players", headers=fx.auth(token))
+
+    def coach_player_results():
+        token, club_id = rng.choice(fx.coach_tokens)
+        player_id = rng.choice(fx.players_by_club.get(club_id) or [uuid.uuid4()])
+        return dict(method="GET", url=f"/api/v1/coach/players/{player_id}/results", headers=fx.auth(token))
+
+    def family_members():
+        token = rng.choice(fx.head_parent_tokens)
+        return dict(method="GET", url="/api/v1/family/members", headers=fx.auth(token))
+
+    def comparison():
+        token, club_id = rng.choice(fx.coach_tokens)
+        members = fx.players_by_club.get(club_id, [])
+        participants = rng.sample(members, 2) if len(members) >= 2 else members
+        return dict(method="POST", url="/api/v1/comparisons/create", headers=fx.auth(token),
+                    json={"participant_ids": [str(p) for p in participants]})
+
+    def export_csv():
+        result_id = rng.choice(fx.result_ids)
+        return dict(method="GET", url=f"/api/v1/export/csv/{result_id}")
+
+    def history_export():
+        token, _ = rng.choice(fx.player_tokens)
+        return dict(method="GET", url="/api/v1/tests/export?format=csv", headers=fx.auth(token))
+
+    scenarios = {
+        "submit": submit,
+        "submit_batch": submit_batch,
+        "history": history,
+        "history_by_score": history_by_score,
+        "coach_players": coach_players,
+        "coach_player_results": coach_player_results,
+        "comparison": comparison,
+        "export_csv": export_csv,
+        "history_export": history_export,
+    }
+    if fx.head_parent_tokens:
+        scenarios["family_members"] = family_members
+    return scenarios
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+async def run_scenario(client, make_request: Callable[[], dict], total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    status_counts: Dict[str, int] = {}
+
+    async def one():
+        request = make_request()
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append((time.perf_counter() - started) * 1000)
+        status_counts[str(response.status_code)] = status_counts.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for code, count in status_counts.items() if not code.startswith("2"))
+    return {
+        "requests": total,
+        "errors": errors,
+        "status_counts": status_counts,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "mean": round(statistics.mean(latencies), 2) if latencies else 0.0,
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+async def run_benchmark(app, scenarios: Dict[str, Callable[[], dict]], total: int, concurrency: int) -> dict:
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, make_request in scenarios.items():
+            print(f"▶ {name}: {total} requests, concurrency {concurrency}")
+            results[name] = await run_scenario(client, make_request, total, concurrency)
+            latency = results[name]["latency_ms"]
+            print(f"   p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                  f"rps={results[name]['throughput_rps']} errors={results[name]['errors']}")
+    return results
+
+
+def main():
+    args = parse_args()
+    # アプリのimport前にデータベースURLを設定する
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.models import Base
+    from generate_synthetic_data import generate_dataset
+
+    Base.metadata.create_all(bind=engine)
+
+    dataset = None
+    if not args.skip_seed:
+        print("🔄 合成データを投入中...")
+        seed_started = time.perf_counter()
+        with engine.begin() as connection:
+            dataset = generate_dataset(
+                connection, args.clubs, args.users_per_club, args.results_per_user,
+                seed=args.seed, prefix="BENCH"
+            )
+        dataset["seed_seconds"] = round(time.perf_counter() - seed_started, 2)
+        print(f"✅ 投入完了: {dataset}")
+
+    fixtures = Fixtures(SessionLocal, random.Random(args.seed))
+    scenarios = build_scenarios(fixtures)
+    if args.scenarios != "all":
+        selected = [name.strip() for name in args.scenarios.split(",")]
+        scenarios = {name: scenarios[name] for name in selected if name in scenarios}
+
+    results = asyncio.run(run_benchmark(app, scenarios, args.requests, args.concurrency))
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "database": engine.dialect.name,
+        "dataset": dataset,
+        "requests_per_scenario": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"📄 結果を保存しました: {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
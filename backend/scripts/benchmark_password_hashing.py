@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+パスワード検証（ログイン）のベンチマークスクリプト
+
+bcryptのコストファクターとワーカー数ごとに、password_service と同じ
+有限スレッドプールでパスワード検証を並行実行し、
+ログイン/秒 と ログイン/秒/コア を出力する。
+BCRYPT_ROUNDS / PASSWORD_HASH_WORKERS を決める際の目安に使用する。
+
+使い方:
+    python scripts/benchmark_password_hashing.py --rounds 10,11,12 --logins 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Password hashing benchmark")
+    parser.add_argument("--rounds", default="10,11,12", help="カンマ区切りのコストファクター")
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, cpu_count})),
+                        help="カンマ区切りのワーカー数")
+    parser.add_argument("--logins", type=int, default=100, help="計測ごとのログイン数")
+    parser.add_argument("--output", default=None, help="結果JSONの出力先")
+    return parser.parse_args()
+
+
+async def measure(hasher, hashed: str, logins: int) -> float:
+    """同時にlogins件の検証を投入し、完了までの秒数を返す"""
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        hasher.averify_and_update("benchmark-password", hashed) for _ in range(logins)
+    ))
+    elapsed = time.perf_counter() - started
+    assert all(valid for valid, _ in results)
+    return elapsed
+
+
+def main():
+    args = parse_args()
+    from app.services.password_service import PasswordHasher
+
+    cpu_count = os.cpu_count() or 1
+    results = []
+    for rounds in [int(r) for r in args.rounds.split(",")]:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            hasher = PasswordHasher(rounds=rounds, max_workers=workers)
+            hashed = hasher.hash("benchmark-password")
+            elapsed = asyncio.run(measure(hasher, hashed, args.logins))
+            per_second = args.logins / elapsed
+            used_cores = min(workers, cpu_count)
+            results.append({
+                "rounds": rounds,
+                "workers": workers,
+                "logins": args.logins,
+                "seconds": round(elapsed, 3),
+                "logins_per_second": round(per_second, 2),
+                "logins_per_second_per_core": round(per_second / used_cores, 2),
+                "mean_verify_ms": round(elapsed / args.logins * workers * 1000, 2),
+            })
+            print(f"rounds={rounds:>2} workers={workers:>2}: {per_second:8.2f} logins/s "
+                  f"({per_second / used_cores:.2f} /s/core)")
+
+    report = {"cpu_count": cpu_count, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 結果を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+一覧レスポンスのシリアライズ時間のベンチマークスクリプト
+
+コーチ向けの選手結果一覧（PlayerTestResult）を指定件数分生成し、
+- before: FastAPIの標準経路（response_model で再検証 → jsonable_encoder → json）
+- after : 検証済みモデルを dict 化して orjson でシリアライズ（app.core.responses.json_response）
+の所要時間を比較する。DBには接続しない。
+
+使い方:
+    python scripts/benchmark_serialization.py --results 1000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 19項目（自己肯定感4 / アスリートマインド10 / スポーツマンシップ5）
+QUALITY_FIELDS = (
+    "self_determination", "self_acceptance", "self_worth", "self_efficacy",
+    "commitment", "result", "steadiness", "devotion", "self_control",
+    "assertion", "sensitivity", "intuition", "introspection", "comparison",
+    "courage", "resilience", "cooperation", "natural_acceptance", "non_rationality",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serialization benchmark")
+    parser.add_argument("--results", type=int, default=1000, help="1レスポンスあたりの結果件数")
+    parser.add_argument("--repeat", type=int, default=20, help="計測回数")
+    parser.add_argument("--output", default=None, help="結果JSONの出力先")
+    return parser.parse_args()
+
+
+def build_results(count: int):
+    from app.schemas.coach import PlayerTestResult
+
+    rng = random.Random(0)
+    user_id = str(uuid.uuid4())
+    started = datetime(2024, 1, 1)
+    results = []
+    for i in range(count):
+        scores = {field: round(rng.uniform(10, 50), 1) for field in QUALITY_FIELDS}
+        results.append(PlayerTestResult(
+            result_id=str(uuid.uuid4()),
+            user_id=user_id,
+            test_date=started + timedelta(days=i),
+            player_name="ベンチマーク選手",
+            self_esteem_total=round(sum(scores[f] for f in QUALITY_FIELDS[:4]), 1),
+            sportsmanship_total=round(sum(scores[f] for f in QUALITY_FIELDS[-5:]), 1),
+            athlete_type="ストライカー",
+            strengths=["結果", "主張", "比較", "直感", "こだわり"],
+            weaknesses=["繊細", "内省", "献身", "堅実", "克己"],
+            percentile_ranks={
+                "club": {field: round(rng.uniform(0, 100), 1) for field in QUALITY_FIELDS},
+                "age_band": {field: round(rng.uniform(0, 100), 1) for field in QUALITY_FIELDS},
+            },
+            **scores,
+        ))
+    return results
+
+
+def measure(func, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    args = parse_args()
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app.core.responses import json_response
+    from app.schemas.coach import PlayerTestResult
+
+    results = build_results(args.results)
+    field = create_response_field(name="Response_benchmark", type_=List[PlayerTestResult])
+
+    def before() -> bytes:
+        content = asyncio.run(serialize_response(field=field, response_content=results))
+        return JSONResponse(content).body
+
+    def after() -> bytes:
+        return json_response([result.dict() for result in results]).body
+
+    assert json.loads(before()) == json.loads(after()), "出力が一致しません"
+
+    report = {"results": args.results, "repeat": args.repeat, "body_bytes": len(after())}
+    for name, func in (("before", before), ("after", after)):
+        timings = measure(func, args.repeat)
+        report[name] = {
+            "median_ms": round(statistics.median(timings), 2),
+            "min_ms": round(min(timings), 2),
+        }
+        print(f"{name:>6}: median {report[name]['median_ms']:8.2f} ms  (min {report[name]['min_ms']:.2f} ms)")
+    print(f"speedup: {report['before']['median_ms'] / report['after']['median_ms']:.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 結果を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+知識源（docs/knowledge_sources）の検索インデックス作成スクリプト
+
+知識源のファイルを文章単位（JSONは項目、Markdownは見出し、TXTは段落）に分割し、
+scikit-learn の TfidfVectorizer で TF-IDF 行列を作成して .npy（CSC形式）と
+meta.json（語彙・文章）に保存する。アプリは起動時にこれをメモリマップで読み込む。
+知識源を更新したら再実行すること。
+
+使い方:
+    python scripts/build_knowledge_index.py
+    python scripts/build_knowledge_index.py --source ../docs/knowledge_sources --output data/knowledge_index
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Iterator, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SOURCE = os.path.join(REPO_ROOT, "docs", "knowledge_sources")
+
+
+def parse_args():
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Build knowledge retrieval index")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="知識源のディレクトリ")
+    parser.add_argument("--output", default=settings.KNOWLEDGE_INDEX_DIR, help="インデックスの出力先")
+    return parser.parse_args()
+
+
+def _flatten(value) -> List[str]:
+    """JSONの値を文字列の一覧にする"""
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in _flatten(item)]
+    if isinstance(value, list):
+        return [text for item in value for text in _flatten(item)]
+    return [str(value)]
+
+
+def json_passages(data: dict) -> Iterator[Tuple[str, str]]:
+    """トップレベルの説明と、一覧の各項目を1文章にする"""
+    title = str(data.get("theory_name") or data.get("technique_name") or data.get("title") or "")
+    summary = [str(value) for value in data.values() if isinstance(value, str)]
+    yield title, "\n".join(summary)
+    for key, value in data.items():
+        if not isinstance(value, list):
+            continue
+        if all(isinstance(item, str) for item in value):
+            yield f"{title} {key}", "\n".join(value)
+            continue
+        for item in value:
+            item_title = next((v for v in item.values() if isinstance(v, str)), key) if isinstance(item, dict) else key
+            yield f"{title} {item_title}", "\n".join(_flatten(item))
+
+
+def markdown_passages(text: str) -> Iterator[Tuple[str, str]]:
+    """見出し（#〜###）ごとに分割。見出しは親見出しとつなげてタイトルにする"""
+    headings: List[str] = []
+    lines: List[str] = []
+    for line in text.splitlines() + ["# "]:
+        match = re.match(r"^(#{1,6})\s*(.*)$", line)
+        if not match:
+            lines.append(line)
+            continue
+        body = "\n".join(lines).strip()
+        if body:
+            yield " ".join(headings), body
+        lines = []
+        level = len(match.group(1))
+        headings = headings[:level - 1] + [match.group(2).strip()]
+
+
+def text_passages(text: str, title: str) -> Iterator[Tuple[str, str]]:
+    """空行で区切られた段落ごとに分割（先頭行が見出しのみの段落は次の段落のタイトルにする）"""
+    blocks = [block.strip() for block in re.split(r"\n\s*\n", text) if block.strip()]
+    if blocks and "\n" not in blocks[0]:
+        title = blocks.pop(0)
+    for block in blocks:
+        yield title, block
+
+
+def load_passages(source: str) -> List[dict]:
+    passages = []
+    for root, _, files in sorted(os.walk(source)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, source)
+            extension = os.path.splitext(name)[1].lower()
+            with open(path, encoding="utf-8") as f:
+                content = f.read()
+            if extension == ".json":
+                chunks = json_passages(json.loads(content))
+            elif extension == ".md":
+                if name.lower() == "readme.md":
+                    continue
+                chunks = markdown_passages(content)
+            elif extension == ".txt":
+                chunks = text_passages(content, os.path.splitext(name)[0])
+            else:
+                continue
+            for title, text in chunks:
+                if text.strip():
+                    passages.append({"source": relative, "title": title.strip(), "text": text.strip()})
+    return passages
+
+
+def main():
+    args = parse_args()
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    from app.services.knowledge_index import ARRAY_FILES, META_FILE, passage_terms
+
+    passages = load_passages(args.source)
+    if not passages:
+        print(f"❌ 知識源が見つかりません: {args.source}")
+        sys.exit(1)
+
+    vectorizer = TfidfVectorizer(analyzer=passage_terms, norm="l2", dtype=np.float32)
+    # タイトルも検索対象に含める
+    matrix = vectorizer.fit_transform(f"{p['title']}\n{p['text']}" for p in passages).tocsc()
+    matrix.sort_indices()
+
+    os.makedirs(args.output, exist_ok=True)
+    arrays = {
+        "indptr": matrix.indptr.astype(np.int32),
+        "indices": matrix.indices.astype(np.int32),
+        "data": matrix.data.astype(np.float32),
+        "idf": vectorizer.idf_.astype(np.float32),
+    }
+    for name in ARRAY_FILES:
+        np.save(os.path.join(args.output, f"{name}.npy"), arrays[name])
+    vocabulary = {term: int(column) for term, column in vectorizer.vocabulary_.items()}
+    with open(os.path.join(args.output, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"vocabulary": vocabulary, "passages": passages}, f, ensure_ascii=False)
+
+    print(f"✅ {len(passages)}件の文章・{len(vocabulary)}語でインデックスを作成しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
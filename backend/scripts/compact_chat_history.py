@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+保存期間を過ぎたコーチングの会話履歴をアーカイブへ移すスクリプト
+
+CHAT_ARCHIVE_AFTER_DAYS より古いメッセージを会話ごとに要約・圧縮して
+chat_archives に移し、chat_history から削除する。定期実行（Heroku Scheduler など）を想定。
+
+使い方:
+    python scripts/compact_chat_history.py
+    python scripts/compact_chat_history.py --older-than-days 90
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.chat_archive_service import ChatArchiveService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive old chat history")
+    parser.add_argument(
+        "--older-than-days", type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+        help="この日数より古いメッセージをアーカイブする"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    with SessionLocal() as db:
+        conversations, messages = ChatArchiveService(db).compact(cutoff)
+    print(
+        f"✅ {messages}件のメッセージを{conversations}件の会話としてアーカイブしました"
+        f"（{time.perf_counter() - started:.1f}秒）"
+    )
+
+
+if __name__ == "__main__":
+    main()
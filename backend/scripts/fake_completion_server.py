@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+OpenAI互換の Chat Completions API の代替サーバー（ローカル開発・負荷試験用）
+
+実際のモデルを呼ばずに、指定した遅延で固定の応答を返す。stream=true の場合は
+OpenAIと同じ形式（data: {...} / data: [DONE]）でトークンを逐次送信する。
+
+使い方:
+    python scripts/fake_completion_server.py --port 8090 --latency 2.0 --token-delay 0.05
+    OPENAI_API_BASE=http://127.0.0.1:8090/v1 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+REPLY = (
+    "お話ししてくれてありがとうございます。最近の練習で、うまくいったと感じた場面は"
+    "どんなときでしたか？その時の気持ちを思い出してみると、次の一歩のヒントが見つかるかもしれません。"
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fake chat completion server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=1.0, help="最初のトークンまでの遅延（秒）")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="トークン間の遅延（秒）")
+    parser.add_argument("--token-size", type=int, default=4, help="1トークンあたりの文字数")
+    return parser.parse_args()
+
+
+def create_app(latency: float, token_delay: float, token_size: int) -> FastAPI:
+    app = FastAPI()
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + token_delay * (len(REPLY) / token_size))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": REPLY},
+                    "finish_reason": "stop",
+                }],
+            })
+
+        async def events():
+            await asyncio.sleep(latency)
+            yield chunk(completion_id, model, {"role": "assistant"})
+            for start in range(0, len(REPLY), token_size):
+                yield chunk(completion_id, model, {"content": REPLY[start:start + token_size]})
+                await asyncio.sleep(token_delay)
+            yield chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    app = create_app(args.latency, args.token_delay, args.token_size)
+    print(f"🤖 Fake completion server: http://{args.host}:{args.port}/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
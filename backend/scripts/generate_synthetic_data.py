@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+スケールテスト用の合成データ生成スクリプト
+
+N クラブ × M ユーザー（現実的な役割構成・家族関係付き）× K テスト結果を生成し、
+PostgreSQLでは COPY、それ以外では insert() のexecutemanyバッチで一括投入する。
+テスト結果のスコア・カテゴリ合計・アスリートタイプはクラブ単位にnumpyでまとめて計算する。
+
+使い方:
+    # 100クラブ × 200ユーザー × 50件 = 100万件のテスト結果
+    python scripts/generate_synthetic_data.py --clubs 100 --users-per-club 200 --results-per-user 50
+
+    # SQLiteに小さなデータセットを作成
+    python scripts/generate_synthetic_data.py --database-url sqlite:///./synthetic.db --clubs 5
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SUBSCALES = {
+    "self_affirmation": ["self_determination", "self_acceptance", "self_worth", "self_efficacy"],
+    "athlete_mind": ["introspection", "self_control", "devotion", "intuition", "sensitivity",
+                     "steadiness", "comparison", "result", "assertion", "commitment"],
+    "sportsmanship": ["courage", "resilience", "cooperation", "natural_acceptance", "non_rationality"],
+}
+
+# クラブ内の役割構成（先頭のヘッドコーチ・ヘッド親を除いた残りの比率）
+ROLE_MIX = [("player", 0.60), ("father", 0.16), ("mother", 0.16), ("coach", 0.05), ("adult", 0.03)]
+AGE_RANGES = {"player": (8, 18), "father": (32, 55), "mother": (30, 52), "coach": (25, 65), "adult": (20, 60)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic clubs, users and test results")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--clubs", type=int, default=10)
+    parser.add_argument("--users-per-club", type=int, default=100)
+    parser.add_argument("--results-per-user", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--prefix", default="SYN", help="クラブID・メールアドレスの接頭辞（再実行時の重複回避）")
+    parser.add_argument("--no-copy", action="store_true", help="PostgreSQLでもCOPYを使わずINSERTで投入する")
+    return parser.parse_args()
+
+
+# ---------------------------------------------------------------------------
+# 一括投入
+# ---------------------------------------------------------------------------
+
+class BulkWriter:
+    """
+    テーブルごとに行（列順のタプル）をバッファし、COPY または複数行INSERTで書き込む
+    値はCSVにそのまま書ける型（文字列・数値・bool・日時・UUID・None）にすること
+    """
+
+    def __init__(self, connection, batch_size: int, use_copy: bool):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.buffers: Dict[str, List[tuple]] = {}
+        self.columns: Dict[str, List[str]] = {}
+        self.tables = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, table, row: dict):
+        self.add_many(table, list(row.keys()), [tuple(row.values())])
+
+    def add_many(self, table, columns: Sequence[str], rows: Iterable[tuple]):
+        """同じ列順の行をまとめて追加"""
+        buffer = self.buffers.setdefault(table.name, [])
+        self.tables[table.name] = table
+        self.columns[table.name] = list(columns)
+        buffer.extend(rows)
+        if len(buffer) >= self.batch_size:
+            # 外部キー制約のため、先に登録されたテーブル（親）から順に書き込む
+            self.flush()
+
+    def flush(self):
+        for name in list(self.buffers.keys()):
+            rows = self.buffers.get(name)
+            if not rows:
+                continue
+            table = self.tables[name]
+            columns = self.columns[name]
+            if self.use_copy:
+                self._copy(table, columns, rows)
+            else:
+                # executemany形式: PostgreSQLでは複数行VALUESにまとめて送信される
+                self.connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+            self.counts[name] = self.counts.get(name, 0) + len(rows)
+            self.buffers[name] = []
+
+    def _copy(self, table, columns: List[str], rows: List[tuple]):
+        # None は空欄（COPYのCSV形式ではNULL）、bool は True/False として書き出される
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+
+# ---------------------------------------------------------------------------
+# データ生成
+# ---------------------------------------------------------------------------
+
+def question_rows() -> List[dict]:
+    """正式質問データ（スポーツマンシップ共通 + 対象別）をINSERT用の行に変換"""
+    from update_athlete_mind_questions import ATHLETE_MIND_QUESTIONS
+    from update_self_affirmation_questions import SELF_AFFIRMATION_QUESTIONS
+    from update_sportsmanship_questions import SPORTSMANSHIP_QUESTIONS
+
+    rows = []
+    number = 1
+    for subcategory, texts in SPORTSMANSHIP_QUESTIONS.items():
+        for text in texts:
+            rows.append(dict(question_id=uuid.uuid4(), question_number=number, question_text=text,
+                             category="sportsmanship", subcategory=subcategory, target="all",
+                             is_reverse_score=True, is_active=True))
+            number += 1
+    for category, catalogue in (("athlete_mind", ATHLETE_MIND_QUESTIONS),
+                                ("self_affirmation", SELF_AFFIRMATION_QUESTIONS)):
+        for target, subcategories in catalogue.items():
+            for subcategory, texts in subcategories.items():
+                for text in texts:
+                    rows.append(dict(question_id=uuid.uuid4(), question_number=number, question_text=text,
+                                     category=category, subcategory=subcategory, target=target,
+                                     is_reverse_score=False, is_active=True))
+                    number += 1
+    return rows
+
+
+def _pick_role(rng: random.Random) -> str:
+    threshold = rng.random()
+    cumulative = 0.0
+    for role, weight in ROLE_MIX:
+        cumulative += weight
+        if threshold <= cumulative:
+            return role
+    return ROLE_MIX[0][0]
+
+
+class ScoreModel:
+    """
+    ユーザーごとの潜在傾向 + 受検回数に応じた成長 + 測定ノイズでスコアを生成
+    （ユーザー数 × 受検回数分をnumpyでまとめて計算）
+    """
+
+    def __init__(self, rng: np.random.Generator):
+        self.rng = rng
+
+    def scores(self, users: int, tests: int) -> Dict[str, np.ndarray]:
+        """
+        スコア・カテゴリ合計・アスリートタイプの列
+        各列は長さ users × tests の配列（ユーザーごとに受検順）
+        """
+        rng = self.rng
+        drift = rng.normal(0.4, 0.6, size=(users, 1)) * np.arange(tests)
+        columns = {}
+        for names in SUBSCALES.values():
+            category_base = rng.normal(30, 6, size=(users, 1))
+            for name in names:
+                latent = category_base + rng.normal(0, 5, size=(users, 1))
+                value = latent + drift + rng.normal(0, 3, size=(users, tests))
+                columns[name] = np.round(np.clip(value, 0.0, 50.0), 1).ravel()
+        columns.update(bulk_category_totals(columns))
+        columns["athlete_type"] = bulk_athlete_types(columns)
+        return columns
+
+    def test_dates(self, first_test: datetime, users: int, tests: int) -> List[datetime]:
+        """約30日間隔の受検日時（ユーザーごとに受検順）"""
+        rng = self.rng
+        days = np.arange(tests) * 30 + rng.integers(0, 21, size=(users, tests))
+        minutes = rng.integers(0, 1440, size=(users, tests))
+        dates = np.datetime64(first_test, "us") + days.astype("timedelta64[D]") + minutes.astype("timedelta64[m]")
+        return dates.ravel().tolist()
+
+
+def bulk_category_totals(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """test_service.category_totals と同じ規則で、配列のまま合計を計算"""
+    from app.services.test_service import ATHLETE_MIND_FIELDS, SELF_ESTEEM_FIELDS, SPORTSMANSHIP_FIELDS
+
+    totals = {
+        "self_esteem_total": np.round(sum(columns[key] for key in SELF_ESTEEM_FIELDS), 1),
+        "sportsmanship_total": np.round(sum(columns[key] for key in SPORTSMANSHIP_FIELDS), 1),
+        "athlete_mind_total": np.round(sum(columns[key] for key in ATHLETE_MIND_FIELDS), 1),
+    }
+    totals["total_score"] = np.round(totals["self_esteem_total"] + totals["sportsmanship_total"], 1)
+    return totals
+
+
+def bulk_athlete_types(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """TestService._analyze_athlete_type と同じ規則（特性スコア最大、同点は先のタイプ）"""
+    from app.services.test_service import ATHLETE_TYPE_TRAITS
+
+    type_scores = np.stack([
+        sum(columns[field] for field in fields) / len(fields) for _, fields in ATHLETE_TYPE_TRAITS
+    ])
+    names = np.array([athlete_type for athlete_type, _ in ATHLETE_TYPE_TRAITS], dtype=object)
+    return names[type_scores.argmax(axis=0)]
+
+
+def generate_dataset(
+    connection,
+    clubs: int,
+    users_per_club: int,
+    results_per_user: int,
+    seed: int = 42,
+    batch_size: int = 20000,
+    prefix: str = "SYN",
+    use_copy: Optional[bool] = None,
+) -> dict:
+    """合成データを生成して一括投入し、テーブルごとの件数を返す（コミットは呼び出し側）"""
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+    from app.core.security import get_password_hash
+    from app.models import Club, User, TestResult, FamilyRelation, Question, ScoreRollup
+    from app.services.trend_service import ScoreTrendService
+
+    if use_copy is None:
+        use_copy = connection.dialect.name == "postgresql"
+
+    rng = random.Random(seed)
+    model = ScoreModel(np.random.default_rng(seed))
+    password_hash = get_password_hash("password123")
+    now = datetime.utcnow()
+    writer = BulkWriter(connection, batch_size, use_copy)
+
+    result_columns = ["result_id", "user_id", "target_selection", "test_date", "created_date"]
+    first_test = now - timedelta(days=results_per_user * 30)
+
+    if connection.execute(select(func.count()).select_from(Question.__table__)).scalar() == 0:
+        for row in question_rows():
+            writer.add(Question.__table__, row)
+
+    for c in range(clubs):
+        club_id = f"{prefix}{c:05d}"
+        writer.add(Club.__table__, dict(club_id=club_id, club_name=f"{prefix}クラブ{c}", created_date=now))
+
+        members = []
+        for u in range(users_per_club):
+            if u == 0:
+                role = "coach"
+            elif u == 1:
+                role = rng.choice(["father", "mother"])
+            else:
+                role = _pick_role(rng)
+            user_id = uuid.uuid4()
+            writer.add(User.__table__, dict(
+                user_id=user_id, club_id=club_id, email=f"{prefix.lower()}{c}_{u}@example.com",
+                password_hash=password_hash, name=f"{prefix}ユーザー{c}-{u}",
+                age=rng.randint(*AGE_RANGES[role]), role=role, is_individual=False,
+                parent_function=role in ("father", "mother"),
+                head_coach_function=u == 0,
+                head_parent_function=u == 1,
+                created_date=now, updated_date=now,
+            ))
+            members.append((user_id, role))
+
+        # テスト結果はクラブ単位でまとめて生成（列ごとの配列からタプルの行にする）
+        scores = model.scores(users_per_club, results_per_user)
+        test_dates = model.test_dates(first_test, users_per_club, results_per_user)
+        score_columns = list(scores.keys())
+        writer.add_many(TestResult.__table__, result_columns + score_columns, zip(
+            [uuid.uuid4() for _ in test_dates],
+            [user_id for user_id, _ in members for _ in range(results_per_user)],
+            [role for _, role in members for _ in range(results_per_user)],
+            test_dates,
+            test_dates,
+            *[scores[column].tolist() for column in score_columns],
+        ))
+
+        # 親を1〜2人の選手にひも付ける（同じ子を持つ父母のペアも作る）
+        players = [user_id for user_id, role in members if role == "player"]
+        parents = [user_id for user_id, role in members if role in ("father", "mother")]
+        if players:
+            linked = set()
+            for i, parent_id in enumerate(parents):
+                if i % 2 == 1 and rng.random() < 0.7:
+                    children = previous_children
+                else:
+                    children = rng.sample(players, min(len(players), rng.choice([1, 1, 2])))
+                for child_id in children:
+                    if (parent_id, child_id) not in linked:
+                        linked.add((parent_id, child_id))
+                        writer.add(FamilyRelation.__table__, dict(
+                            parent_id=parent_id, child_id=child_id, created_date=now
+                        ))
+                previous_children = children
+
+    writer.flush()
+
+    # スコア推移の集計（通常は登録時に加算されるが、一括投入では最後にDB側の GROUP BY でまとめて作成）
+    with Session(bind=connection) as session:
+        ScoreTrendService(session).rebuild()
+        session.flush()
+        writer.counts["score_rollups"] = session.query(ScoreRollup).count()
+    return writer.counts
+
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from app.database import engine
+    from app.models import Base
+
+    Base.metadata.create_all(bind=engine)
+
+    total_results = args.clubs * args.users_per_club * args.results_per_user
+    print(f"🔄 合成データを生成中: {args.clubs}クラブ × {args.users_per_club}ユーザー × "
+          f"{args.results_per_user}件 = テスト結果{total_results:,}件")
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        counts = generate_dataset(
+            connection,
+            clubs=args.clubs,
+            users_per_club=args.users_per_club,
+            results_per_user=args.results_per_user,
+            seed=args.seed,
+            batch_size=args.batch_size,
+            prefix=args.prefix,
+            use_copy=False if args.no_copy else None,
+        )
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"   {table}: {count:,}件")
+    print(f"✅ 完了: {elapsed:.1f}秒（テスト結果 {counts.get('test_results', 0) / elapsed:,.0f}件/秒）")
+
+
+if __name__ == "__main__":
+    main()
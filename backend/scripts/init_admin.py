@@ -6,33 +6,20 @@
 
 import sys
 import os
-import json
 import getpass
-from datetime import datetime
-from passlib.context import CryptContext
 
 # プロジェクトのルートディレクトリをPythonパスに追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# パスワードハッシュ化の設定
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# 管理者情報を保存するファイル
-ADMIN_STORAGE_FILE = "admin_users.json"
+from app.database import SessionLocal
+from app.models.admin import AdminUser
+from app.services.password_service import password_hasher
 
 
 def create_initial_admin():
-    """初期管理者を作成"""
+    """初期管理者を作成（admin_usersテーブルに保存）"""
     print("=== 初期管理者ユーザー作成 ===")
     
-    # 既存のファイルチェック
-    if os.path.exists(ADMIN_STORAGE_FILE):
-        print(f"\n警告: {ADMIN_STORAGE_FILE} が既に存在します。")
-        response = input("上書きしますか？ (y/N): ")
-        if response.lower() != 'y':
-            print("処理を中止しました。")
-            return
-    
     # メールアドレスの入力
     while True:
         email = input("\n管理者のメールアドレスを入力してください: ").strip()
@@ -52,22 +39,22 @@ def create_initial_admin():
         else:
             print("パスワードは8文字以上で入力してください。")
     
-    # 管理者情報の作成
-    admin_users = {
-        email: {
-            "password_hash": pwd_context.hash(password),
-            "created_date": datetime.utcnow().isoformat(),
-            "last_login": None
-        }
-    }
-    
-    # ファイルに保存
-    with open(ADMIN_STORAGE_FILE, 'w') as f:
-        json.dump(admin_users, f, indent=2)
+    with SessionLocal() as db:
+        admin = db.query(AdminUser).filter(AdminUser.email == email).first()
+        if admin:
+            print(f"\n警告: {email} は既に登録されています。")
+            response = input("パスワードを上書きしますか？ (y/N): ")
+            if response.lower() != 'y':
+                print("処理を中止しました。")
+                return
+            admin.password_hash = password_hasher.hash(password)
+            admin.is_active = True
+        else:
+            db.add(AdminUser(email=email, password_hash=password_hasher.hash(password)))
+        db.commit()
     
     print(f"\n✅ 初期管理者が作成されました！")
     print(f"メールアドレス: {email}")
-    print(f"ファイル: {ADMIN_STORAGE_FILE}")
     print("\n以下の情報でログインできます：")
     print(f"URL: http://your-domain/admin/login")
     print(f"メールアドレス: {email}")
@@ -75,11 +62,8 @@ def create_initial_admin():
     
     # セキュリティ推奨事項
     print("\n🔒 セキュリティ推奨事項:")
-    print("1. admin_users.json ファイルのアクセス権限を制限してください")
-    print("   chmod 600 admin_users.json")
-    print("2. 本番環境ではデータベースでの管理を検討してください")
-    print("3. 定期的にパスワードを変更してください")
-    print("4. 不要な管理者アカウントは削除してください")
+    print("1. 定期的にパスワードを変更してください")
+    print("2. 不要な管理者アカウントは削除してください")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+DBスキーマのマイグレーションスクリプト（デプロイ時のリリースフェーズで実行）
+
+- マイグレーション管理下のDB: alembic upgrade head
+- 空のDB: モデルからテーブルを作成し、最新リビジョンとして記録
+  （最初のマイグレーションは既存のテーブルを前提にしているため）
+- マイグレーション導入前に create_all で作成されたDB（usersとtest_resultsがあり、
+  admin_users・test_results.submission_key が無い）: add_head_parent_function として
+  記録してから alembic upgrade head
+- それ以外のテーブルはあるがマイグレーション履歴が無いDB: 何もせず終了する
+  （適用済みのリビジョンを確認して alembic stamp <revision> を実行してから再実行）
+
+使い方:
+    python scripts/migrate.py
+    python scripts/migrate.py --check   # 最新か確認するだけ（最新でなければ終了コード1）
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VERSION_TABLE = "alembic_version"
+# マイグレーション導入前のDB（create_all で作成）が相当するリビジョン
+BASELINE_REVISION = "add_head_parent_function"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply database migrations")
+    parser.add_argument("--check", action="store_true", help="最新リビジョンか確認するだけ")
+    return parser.parse_args()
+
+
+def is_baseline_schema(engine) -> bool:
+    """マイグレーション履歴が無く、BASELINE_REVISION 時点のテーブル構成か"""
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    if not {"users", "test_results"} <= tables or "admin_users" in tables:
+        return False
+    user_columns = {column["name"] for column in inspector.get_columns("users")}
+    result_columns = {column["name"] for column in inspector.get_columns("test_results")}
+    return "head_parent_function" in user_columns and "submission_key" not in result_columns
+
+
+def main():
+    args = parse_args()
+    from alembic import command
+    from sqlalchemy import inspect
+
+    from app.core.schema import alembic_config, current_revisions, expected_revisions
+    from app.database import engine
+    from app.models import Base
+
+    current = current_revisions(engine)
+    expected = expected_revisions()
+    if args.check:
+        if current != expected:
+            print(f"❌ スキーマが最新ではありません: DB={sorted(current) or 'なし'} / 最新={sorted(expected)}")
+            sys.exit(1)
+        print(f"✅ スキーマは最新です: {sorted(current)}")
+        return
+
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if VERSION_TABLE in tables:
+        command.upgrade(config, "head")
+    elif not tables & set(Base.metadata.tables):
+        Base.metadata.create_all(bind=engine)
+        command.stamp(config, "head")
+        print("✅ テーブルを作成しました")
+    elif is_baseline_schema(engine):
+        print(f"ℹ️  マイグレーション導入前のスキーマのため、{BASELINE_REVISION} として記録してから更新します")
+        command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+    else:
+        print(
+            "❌ テーブルはありますがマイグレーション履歴（alembic_version）がありません。\n"
+            "   適用済みのリビジョンを確認して `alembic stamp <revision>` を実行してから再実行してください。"
+        )
+        sys.exit(1)
+
+    print(f"✅ スキーマは最新です: {sorted(current_revisions(engine))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+保存済みのテスト結果に結果コメントを一括作成するスクリプト
+
+コメントはテスト提出時に作成されるため、通常は移行時（既存の結果）と
+コメントのルール・テンプレートを変更して COMMENT_ENGINE_VERSION を上げた後に実行する。
+
+使い方:
+    python scripts/pregenerate_comments.py
+    python scripts/pregenerate_comments.py --force --batch-size 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.test_service import TestService
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-generate result comments")
+    parser.add_argument("--batch-size", type=int, default=1000, help="1回のコミットで更新する件数")
+    parser.add_argument("--force", action="store_true", help="作成済みのコメントも作り直す")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        count = TestService(db).pregenerate_comments(batch_size=args.batch_size, force=args.force)
+    print(f"✅ {count}件のテスト結果のコメントを作成しました（{time.perf_counter() - started:.1f}秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+スコア推移の集計テーブル（score_rollups）を全テスト結果から作り直すスクリプト
+
+通常は登録・削除時に自動で更新されるため不要。選手のクラブ移籍後に
+クラブ別の集計を現在の所属で揃えたい場合などに使用する。
+
+使い方:
+    python scripts/rebuild_score_rollups.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.trend_service import ScoreTrendService
+
+
+def main():
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        count = ScoreTrendService(db).rebuild()
+        db.commit()
+    print(f"✅ {count}件のテスト結果から集計を作成しました（{time.perf_counter() - started:.1f}秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+テスト共通の設定
+
+- DBは一時ディレクトリのSQLite（app のインポート前に DATABASE_URL を設定する）
+- AIコーチングのモデルは scripts/fake_completion_server.py をローカルで起動して代用する
+"""
+import importlib.util
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DB_DIR = tempfile.mkdtemp(prefix="sportsmanship-test-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'test.db')}"
+os.environ["SCHEMA_VERSION_CHECK"] = "off"
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _load_fake_completion_server():
+    path = os.path.join(BACKEND_DIR, "scripts", "fake_completion_server.py")
+    spec = importlib.util.spec_from_file_location("fake_completion_server", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+fake_completion_server = _load_fake_completion_server()
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.database import engine
+    from app.main import app
+    from app.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clear_coaching_caches():
+    from app.services.ai_service import coaching_context_cache
+    from app.services.response_cache import response_cache
+
+    coaching_context_cache.clear()
+    response_cache.clear()
+    yield
+
+
+@pytest.fixture
+def athlete(app):
+    """テスト受検済みの選手と、そのアクセストークン"""
+    from app.core.security import create_access_token
+    from app.database import SessionLocal
+    from app.models import TestResult, User
+    from app.services.comment_engine import FIELD_LABELS
+    from app.services.test_service import category_totals
+
+    user_id = uuid.uuid4()
+    scores = {field: 30.0 for field in FIELD_LABELS}
+    with SessionLocal() as db:
+        db.add(User(
+            user_id=user_id, email=f"{user_id.hex}@example.com", password_hash="x",
+            name="テスト選手", age=15, role="player",
+        ))
+        db.add(TestResult(user_id=user_id, target_selection="player", **scores, **category_totals(scores)))
+        db.commit()
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+@pytest.fixture
+def fake_completion_api():
+    """
+    代替サーバーを起動する関数を返す（テスト終了時に停止）
+    戻り値の関数: (latency, token_delay, token_size) -> OpenAI互換APIのベースURL
+    """
+    import uvicorn
+
+    servers = []
+
+    def start(latency: float = 0.0, token_delay: float = 0.0, token_size: int = 8) -> str:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(
+            fake_completion_server.create_app(latency, token_delay, token_size), log_level="warning"
+        ))
+        thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("fake completion server did not start")
+            time.sleep(0.01)
+        servers.append((server, thread))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+
+    yield start
+
+    for server, thread in servers:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+@pytest.fixture
+def use_completion_client(monkeypatch):
+    """コーチングAPIが使う CompletionClient を差し替える関数を返す"""
+    from app.api import coaching
+    from app.services.ai_service import CompletionClient
+
+    def use(base_url: str, timeout_seconds: float = 5.0, max_concurrency: int = 4) -> CompletionClient:
+        client = CompletionClient(
+            base_url=base_url, api_key=None, model="fake-model",
+            timeout_seconds=timeout_seconds, max_concurrency=max_concurrency,
+        )
+        monkeypatch.setattr(coaching, "completion_client", client)
+        return client
+
+    return use
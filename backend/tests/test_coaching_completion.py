@@ -0,0 +1,96 @@
+"""AIコーチングAPI（ローカルの代替サーバーをモデルとして使用）"""
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.ai_service import COACHING_OFFLINE_PREFIX
+from conftest import fake_completion_server
+
+REPLY = fake_completion_server.REPLY
+
+
+def parse_sse(body: str):
+    """Server-Sent Events の本文を (event, data) の一覧にする"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        events.append((fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+def test_chat_returns_model_reply(app, athlete, fake_completion_api, use_completion_client):
+    use_completion_client(fake_completion_api())
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/coaching/chat", json={"message": "緊張しない方法は？"}, headers=athlete)
+
+    assert response.status_code == 200
+    assert response.json()["message"] == REPLY
+
+
+def test_chat_stream_emits_delta_and_done(app, athlete, fake_completion_api, use_completion_client):
+    use_completion_client(fake_completion_api(token_size=8))
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/coaching/chat/stream", json={"message": "試合前の準備は？"}, headers=athlete)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    deltas = [data["content"] for event, data in events if event == "delta"]
+    assert len(deltas) > 1
+    assert "".join(deltas) == REPLY
+    assert events[-1] == ("done", {"message": REPLY})
+
+
+def test_chat_timeout_falls_back(app, athlete, fake_completion_api, use_completion_client):
+    use_completion_client(fake_completion_api(latency=2.0), timeout_seconds=0.3)
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/coaching/chat", json={"message": "練習が続きません"}, headers=athlete)
+
+    assert response.status_code == 200
+    assert response.json()["message"].startswith(COACHING_OFFLINE_PREFIX)
+
+
+def test_chat_stream_timeout_falls_back(app, athlete, fake_completion_api, use_completion_client):
+    use_completion_client(fake_completion_api(latency=2.0), timeout_seconds=0.3)
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/coaching/chat/stream", json={"message": "練習が続きません"}, headers=athlete)
+
+    assert response.status_code == 200
+    event, data = parse_sse(response.text)[-1]
+    assert event == "error"
+    assert data["message"].startswith(COACHING_OFFLINE_PREFIX)
+
+
+def test_follow_up_is_not_answered_from_shared_cache(app, athlete, fake_completion_api, use_completion_client):
+    use_completion_client(fake_completion_api())
+    with TestClient(app) as client:
+        first = client.post("/api/v1/coaching/chat", json={"message": "どうすれば？"}, headers=athlete)
+        assert first.json()["message"] == REPLY
+
+        # 会話の続きでは、同じ質問でも保存済みの応答を使わずモデルに問い合わせる
+        use_completion_client(fake_completion_api(latency=2.0), timeout_seconds=0.3)
+        follow_up = client.post("/api/v1/coaching/chat", json={"message": "どうすれば？"}, headers=athlete)
+
+    assert follow_up.json()["message"].startswith(COACHING_OFFLINE_PREFIX)
+
+
+@pytest.mark.asyncio
+async def test_chat_concurrency_limit_falls_back(app, athlete, fake_completion_api, use_completion_client):
+    completion_client = use_completion_client(fake_completion_api(), timeout_seconds=0.3, max_concurrency=1)
+    # 同時呼び出し枠をすべて使用中にする（アプリと同じイベントループのセマフォ）
+    _, semaphore = completion_client._client()
+    await semaphore.acquire()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+            response = await client.post("/api/v1/coaching/chat", json={"message": "緊張しない方法は？"}, headers=athlete)
+    finally:
+        semaphore.release()
+
+    assert response.status_code == 200
+    assert response.json()["message"].startswith(COACHING_OFFLINE_PREFIX)